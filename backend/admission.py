@@ -0,0 +1,305 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from starlette.responses import StreamingResponse
+
+class AdmissionRejected(Exception):
+    """Solicitud rechazada por sobrecarga; status_code es 429 (cola llena) o 503 (espera agotada)"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class SharedBudget:
+    """
+    Uso del presupuesto de admisión compartido por los trabajadores del supervisor
+    El supervisor crea un multiprocessing.Array con una ranura (comparaciones activas, bytes
+    reservados) por trabajador; la suma de las ranuras es el uso de todo el servidor y se
+    consulta y modifica bajo el bloqueo del Array, así dos procesos no se admiten a la vez
+    por encima del presupuesto
+    """
+
+    # Valores por ranura: comparaciones activas y bytes reservados
+    FIELDS = 2
+
+    def __init__(self, ledger, slot: int):
+        self.ledger = ledger
+        self.slot = slot
+
+    @classmethod
+    def create_ledger(cls, context, slots: int):
+        """Array compartido (con bloqueo) para slots trabajadores, creado por el supervisor"""
+        return context.Array('q', cls.FIELDS * slots)
+
+    @classmethod
+    def clear_slot(cls, ledger, slot: int):
+        """Libera lo que tenía reservado un trabajador que terminó sin liberarlo (caído o detenido)"""
+        with ledger.get_lock():
+            for field in range(cls.FIELDS):
+                ledger[cls.FIELDS * slot + field] = 0
+
+    def _totals(self):
+        values = self.ledger.get_obj()
+        return sum(values[0::self.FIELDS]), sum(values[1::self.FIELDS])
+
+    def totals(self) -> Dict[str, int]:
+        with self.ledger.get_lock():
+            active, reserved_bytes = self._totals()
+        return {'active': active, 'reserved_bytes': reserved_bytes}
+
+    def try_reserve(self, cost: int, max_concurrent: int, memory_budget: int) -> bool:
+        """Reserva una plaza y cost bytes si caben en el uso de todos los trabajadores"""
+        with self.ledger.get_lock():
+            active, reserved_bytes = self._totals()
+            if active >= max_concurrent:
+                return False
+            # Como en un solo proceso: una solicitud mayor que el presupuesto se ejecuta sola
+            if active and reserved_bytes + cost > memory_budget:
+                return False
+            self.ledger[self.FIELDS * self.slot] += 1
+            self.ledger[self.FIELDS * self.slot + 1] += cost
+            return True
+
+    def release(self, cost: int):
+        with self.ledger.get_lock():
+            self.ledger[self.FIELDS * self.slot] -= 1
+            self.ledger[self.FIELDS * self.slot + 1] -= cost
+
+class Reservation:
+    """
+    Plaza concedida por AdmissionController.reserve que dura más que la llamada al endpoint
+    (un reporte que se genera mientras se descarga); release() la libera una sola vez, así
+    pueden llamarla tanto el endpoint si falla como la respuesta al terminar
+    """
+
+    def __init__(self, controller: 'AdmissionController', cost: int):
+        self.controller = controller
+        self.cost = cost
+        self.start = time.perf_counter()
+        self.released = False
+
+    async def release(self, completed: bool = True):
+        """
+        Libera la plaza; la duración solo cuenta para las indicaciones de reintento si se completó
+        Es asíncrona porque la cola se despierta en el bucle de eventos y no en un hilo
+        """
+        if self.released:
+            return
+        self.released = True
+        duration = time.perf_counter() - self.start if completed else None
+        self.controller.release(self.cost, duration)
+
+class ReservedStreamingResponse(StreamingResponse):
+    """
+    Respuesta por partes que conserva una plaza de admisión mientras se envía
+    La plaza se libera al terminar la respuesta, también si el cliente se desconecta o el envío
+    falla antes de empezar la descarga (entonces el generador del reporte ni siquiera arranca)
+    """
+
+    def __init__(self, content, reservation: Reservation, **kwargs):
+        super().__init__(content, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.reservation.release()
+
+class AdmissionController:
+    """
+    Control de admisión de las comparaciones
+    Cada solicitud declara un coste estimado de memoria y se admite si caben ella y las que ya
+    se ejecutan dentro del presupuesto de memoria y de concurrencia; las demás esperan en una
+    cola FIFO acotada durante un tiempo máximo
+    Con shared (SharedBudget), el presupuesto es el de todo el servidor y no el de cada proceso:
+    la cola es local, pero la admisión cuenta lo que ejecutan los demás trabajadores
+    """
+
+    # Memoria pico aproximada por byte de archivo, según el formato (medida con tracemalloc)
+    EXPANSION_FACTORS = {
+        'csv': 8, 'xls': 8, 'xlsx': 16,
+        'parquet': 14, 'arrow': 10, 'feather': 10, 'ipc': 10
+    }
+    DEFAULT_EXPANSION = 10
+
+    # Memoria pico por byte del DataFrame de una referencia perfilada (como DataProfiler.COMPARISON_MEMORY_FACTOR)
+    PROFILE_FACTOR = 3
+
+    # Coste fijo de los modos por bloques (escaneo rápido), cuya memoria no crece con el archivo
+    STREAMING_COST = 256 * 1024 * 1024
+
+    # Peso de la última duración en la media móvil usada para las indicaciones de reintento
+    DURATION_SMOOTHING = 0.2
+
+    # Con presupuesto compartido, cada cuánto se reintenta admitir la cola: otro proceso no avisa al liberar
+    SHARED_POLL_INTERVAL = 0.25
+
+    def __init__(self, memory_budget: int, max_concurrent: int, max_queue: int, max_wait: float,
+                 shared: Optional[SharedBudget] = None):
+        self.memory_budget = memory_budget
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.shared = shared
+        self.active = 0
+        self.reserved_bytes = 0
+        self._waiters: deque = deque()
+        self._average_duration = 10.0
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0}
+        self._total_wait = 0.0
+
+    def estimate(self, *files: Dict[str, Any]) -> int:
+        """
+        Memoria pico estimada de una comparación
+        Cada archivo es {'filename', 'size'} o {'profile'} (referencia ya perfilada)
+        """
+        total = 0
+        for file in files:
+            profile = file.get('profile')
+            if profile and profile.get('memory_bytes'):
+                total += profile['memory_bytes'] * self.PROFILE_FACTOR
+                continue
+            extension = (file.get('filename') or '').lower().split('.')[-1]
+            total += (file.get('size') or 0) * self.EXPANSION_FACTORS.get(extension, self.DEFAULT_EXPANSION)
+        return int(total)
+
+    def _fits(self, cost: int) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        # Una solicitud mayor que todo el presupuesto se ejecuta sola en lugar de rechazarse
+        return self.active == 0 or self.reserved_bytes + cost <= self.memory_budget
+
+    def _try_grant(self, cost: int) -> bool:
+        """Admite la solicitud si cabe en el presupuesto (el del servidor si es compartido)"""
+        if self.shared is not None:
+            if not self.shared.try_reserve(cost, self.max_concurrent, self.memory_budget):
+                return False
+        elif not self._fits(cost):
+            return False
+        self.active += 1
+        self.reserved_bytes += cost
+        self._stats['admitted'] += 1
+        return True
+
+    def _wake(self):
+        # FIFO estricto: la primera de la cola pasa antes que las siguientes aunque estas quepan
+        while self._waiters:
+            cost, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+            elif self._try_grant(cost):
+                self._waiters.popleft()
+                future.set_result(None)
+            else:
+                break
+
+    def _server_active(self) -> int:
+        return self.shared.totals()['active'] if self.shared is not None else self.active
+
+    def retry_after(self) -> int:
+        """Segundos sugeridos antes de reintentar, según la cola y la duración media"""
+        rounds = (len(self._waiters) + self._server_active()) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(self._average_duration * max(rounds, 1)))
+
+    async def acquire(self, cost: int) -> float:
+        """Espera hasta ser admitida; retorna los segundos de espera o lanza AdmissionRejected"""
+        if not self._waiters and self._try_grant(cost):
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats['rejected_queue_full'] += 1
+            raise AdmissionRejected(
+                429, "Demasiadas comparaciones en curso, inténtelo de nuevo más tarde", self.retry_after()
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (cost, future)
+        self._waiters.append(entry)
+        self._stats['queued'] += 1
+        start = time.perf_counter()
+        deadline = start + self.max_wait
+        try:
+            while not future.done():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._waiters.remove(entry)
+                    # Si era la primera de la cola, las que esperaban detrás quizá ya caben
+                    self._wake()
+                    self._stats['rejected_timeout'] += 1
+                    raise AdmissionRejected(
+                        503, "El servidor está ocupado, inténtelo de nuevo más tarde", self.retry_after()
+                    )
+                if self.shared is not None:
+                    remaining = min(remaining, self.SHARED_POLL_INTERVAL)
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    # Otro trabajador pudo liberar su parte del presupuesto
+                    self._wake()
+        except asyncio.CancelledError:
+            # Cliente desconectado: liberar la plaza si ya se había concedido
+            if future.done():
+                self.release(cost)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                self._wake()
+            raise
+        waited = time.perf_counter() - start
+        self._total_wait += waited
+        return waited
+
+    def release(self, cost: int, duration: Optional[float] = None):
+        self.active -= 1
+        self.reserved_bytes -= cost
+        if self.shared is not None:
+            self.shared.release(cost)
+        if duration is not None:
+            self._average_duration += self.DURATION_SMOOTHING * (duration - self._average_duration)
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, cost: int):
+        """Reserva memoria y una plaza durante el bloque; se libera al salir"""
+        await self.acquire(cost)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(cost, time.perf_counter() - start)
+
+    async def reserve(self, cost: int) -> Reservation:
+        """
+        Como acquire, pero retorna la reserva para liberarla fuera del bloque que la pidió,
+        por ejemplo al terminar de enviar una ReservedStreamingResponse
+        """
+        await self.acquire(cost)
+        return Reservation(self, cost)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de este proceso; con presupuesto compartido, también el uso de todo el servidor"""
+        admitted = self._stats['admitted']
+        metrics = dict(
+            self._stats,
+            active=self.active,
+            waiting=len(self._waiters),
+            reserved_bytes=self.reserved_bytes,
+            memory_budget=self.memory_budget,
+            max_concurrent=self.max_concurrent,
+            max_queue=self.max_queue,
+            max_wait_seconds=self.max_wait,
+            average_wait_seconds=round(self._total_wait / admitted, 4) if admitted else 0.0,
+            average_duration_seconds=round(self._average_duration, 4),
+            retry_after_seconds=self.retry_after(),
+            shared=self.shared is not None
+        )
+        if self.shared is not None:
+            totals = self.shared.totals()
+            metrics.update(server_active=totals['active'], server_reserved_bytes=totals['reserved_bytes'])
+        return metrics
@@ -0,0 +1,118 @@
+import bisect
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+def longest_increasing_subsequence(values: np.ndarray) -> np.ndarray:
+    """
+    Posiciones de la subsecuencia estrictamente creciente más larga (patience sorting)
+    O(n log n); si los valores ya están ordenados se resuelve sin recorrerlos
+    """
+    if len(values) == 0 or np.all(np.diff(values) > 0):
+        return np.arange(len(values))
+
+    tails: List[int] = []
+    tails_positions: List[int] = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values.tolist()):
+        pile = bisect.bisect_left(tails, value)
+        if pile:
+            previous[position] = tails_positions[pile - 1]
+        if pile == len(tails):
+            tails.append(value)
+            tails_positions.append(position)
+        else:
+            tails[pile] = value
+            tails_positions[pile] = position
+
+    result = []
+    position = tails_positions[-1]
+    while position != -1:
+        result.append(position)
+        position = previous[position]
+    return np.array(result[::-1], dtype=np.int64)
+
+def _pair_by_rank(keys1: np.ndarray, keys2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Empareja la k-ésima aparición de cada clave en un lado con la k-ésima del otro
+    Retorna las posiciones emparejadas (ordenadas según el primer lado)
+    """
+    left = pd.DataFrame({'key': keys1, 'rank': pd.Series(keys1).groupby(keys1).cumcount().to_numpy(),
+                         'left': np.arange(len(keys1))})
+    right = pd.DataFrame({'key': keys2, 'rank': pd.Series(keys2).groupby(keys2).cumcount().to_numpy(),
+                          'right': np.arange(len(keys2))})
+    pairs = left.merge(right, on=['key', 'rank'], how='inner').sort_values('left')
+    return pairs['left'].to_numpy(dtype=np.int64), pairs['right'].to_numpy(dtype=np.int64)
+
+def _common_prefix(hashes1: np.ndarray, hashes2: np.ndarray) -> int:
+    size = min(len(hashes1), len(hashes2))
+    mismatches = np.flatnonzero(hashes1[:size] != hashes2[:size])
+    return int(mismatches[0]) if len(mismatches) else size
+
+def align_rows(hashes1: np.ndarray, hashes2: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Alinea dos secuencias de hashes de fila
+    - unchanged: filas iguales que conservan el orden relativo (subsecuencia común más larga)
+    - moved: filas iguales que cambiaron de posición relativa
+    - modified: filas distintas que ocupan el mismo hueco entre filas sin cambios
+    - deleted / inserted: filas sin pareja en el otro archivo
+    Los pares se devuelven como matrices (n, 2) de posiciones (referencia, comparación)
+    """
+    # El prefijo y el sufijo comunes se resuelven sin emparejar fila por fila
+    prefix = _common_prefix(hashes1, hashes2)
+    suffix = _common_prefix(hashes1[prefix:][::-1], hashes2[prefix:][::-1])
+    middle1 = hashes1[prefix:len(hashes1) - suffix]
+    middle2 = hashes2[prefix:len(hashes2) - suffix]
+
+    # Emparejar filas idénticas (la k-ésima copia con la k-ésima copia)
+    codes, _ = pd.factorize(np.concatenate([middle1, middle2]))
+    equal1, equal2 = _pair_by_rank(codes[:len(middle1)], codes[len(middle1):])
+
+    # Las que mantienen el orden son las anclas; el resto se movió
+    in_order = np.zeros(len(equal1), dtype=bool)
+    in_order[longest_increasing_subsequence(equal2)] = True
+    anchors1, anchors2 = equal1[in_order], equal2[in_order]
+
+    # Filas sin pareja idéntica: se agrupan por el hueco entre anclas que ocupan
+    free1 = np.ones(len(middle1), dtype=bool)
+    free1[equal1] = False
+    free2 = np.ones(len(middle2), dtype=bool)
+    free2[equal2] = False
+    rows1, rows2 = np.flatnonzero(free1), np.flatnonzero(free2)
+    gaps1 = np.searchsorted(anchors1, rows1)
+    gaps2 = np.searchsorted(anchors2, rows2)
+
+    # Dentro de cada hueco, la n-ésima fila eliminada con la n-ésima insertada es una modificación
+    modified1, modified2 = _pair_by_rank(gaps1, gaps2)
+    modified1, modified2 = rows1[modified1], rows2[modified2]
+    deleted = np.setdiff1d(rows1, modified1, assume_unique=True)
+    inserted = np.setdiff1d(rows2, modified2, assume_unique=True)
+
+    common = np.arange(prefix, dtype=np.int64)
+    tail1 = np.arange(len(hashes1) - suffix, len(hashes1), dtype=np.int64)
+    tail2 = np.arange(len(hashes2) - suffix, len(hashes2), dtype=np.int64)
+
+    def pairs(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        return np.column_stack([left, right]).astype(np.int64).reshape(-1, 2)
+
+    return {
+        'unchanged': pairs(np.concatenate([common, anchors1 + prefix, tail1]),
+                           np.concatenate([common, anchors2 + prefix, tail2])),
+        'moved': pairs(equal1[~in_order] + prefix, equal2[~in_order] + prefix),
+        'modified': pairs(modified1 + prefix, modified2 + prefix),
+        'deleted': deleted + prefix,
+        'inserted': inserted + prefix
+    }
+
+def moved_blocks(moved: np.ndarray) -> List[Tuple[int, int, int]]:
+    """
+    Agrupa los pares movidos en bloques contiguos en ambos archivos
+    Retorna (fila inicial en referencia, fila inicial en comparación, número de filas)
+    """
+    if len(moved) == 0:
+        return []
+    steps = np.diff(moved, axis=0)
+    breaks = np.flatnonzero((steps[:, 0] != 1) | (steps[:, 1] != 1)) + 1
+    starts = np.concatenate([[0], breaks])
+    lengths = np.diff(np.concatenate([starts, [len(moved)]]))
+    return [(int(moved[s, 0]), int(moved[s, 1]), int(n)) for s, n in zip(starts, lengths)]
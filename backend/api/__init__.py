@@ -2,4 +2,6 @@
 
 from api.files import router as files_router
 from api.comparisons import router as comparisons_router
-from api.history import router as history_router 
\ No newline at end of file
+from api.history import router as history_router 
+from api.admin import router as admin_router
+from api.progress import router as progress_router
\ No newline at end of file
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException
+from runtime import get_result_cache, get_admission_controller
+
+router = APIRouter(prefix="/admin")
+
+@router.get("/cache")
+def get_cache_statistics():
+    """Statistiques du cache de résultats (succès, échecs, taille en mémoire et en base)"""
+    cache = get_result_cache()
+    if cache is None:
+        return {"enabled": False}
+    return dict(cache.stats(), enabled=True)
+
+@router.delete("/cache")
+def clear_cache():
+    """Vide le cache de résultats (mémoire et base de données)"""
+    cache = get_result_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Le cache de résultats est désactivé")
+    try:
+        return {"success": True, "deleted": cache.clear()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/admission")
+def get_admission_metrics():
+    """Métriques du contrôle d'admission : comparaisons actives, file d'attente, mémoire réservée et rejets"""
+    return get_admission_controller().metrics()
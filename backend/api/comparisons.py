@@ -1,28 +1,157 @@
 from fastapi import APIRouter, HTTPException
-from database_manager import DatabaseManager
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from admission import ReservedStreamingResponse
+from runtime import (
+    get_database_manager, get_comparator, get_exporter, get_reference_preprocessor, get_workbook_comparator,
+    get_admission_controller
+)
 from typing import List
+import os
 
 router = APIRouter()
-db = DatabaseManager()
 
 @router.get("/comparisons", response_model=List[dict])
 def list_comparisons():
     """Liste l'historique des comparaisons"""
-    return db.get_comparison_history()
+    return get_database_manager().get_comparison_history()
 
 @router.get("/comparisons/{comparison_id}")
 def get_comparison(comparison_id: int):
     """Détail d'une comparaison"""
-    result = db.get_comparison_details(comparison_id)
+    result = get_database_manager().get_comparison_details(comparison_id)
     if not result:
         raise HTTPException(status_code=404, detail="Comparaison non trouvée")
     return result
 
+def _export_differences(result: dict, files_kept: bool, headers: dict):
+    """
+    Différences et en-tête du rapport d'une comparaison enregistrée : rejouée si ses fichiers sont
+    conservés, sinon celles enregistrées avec le résultat (headers reçoit X-Report-Truncated)
+    """
+    result_data = result.get('result_data') or {}
+    stored_metadata = result_data.get('metadata') or {}
+    ref_path = result.get('reference_file_path')
+    comp_path = result.get('compare_file_path')
+
+    if 'sheets' in result_data:
+        workbook = get_workbook_comparator()
+        summary = result_data.get('summary', {})
+        metadata = {key: summary.get(key, '') for key in ('referenceRows', 'compareRows')}
+        metadata["workbook"] = True
+        if files_kept:
+            try:
+                # Valider les options avant que la réponse ne commence
+                get_comparator().resolve_options(stored_metadata.get('options'))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            differences = workbook.iter_differences(result_data, ref_path, comp_path)
+        else:
+            stored = sum(len(sheet.get('differences', [])) for sheet in result_data['sheets'])
+            stored += sum(len(names) for names in result_data.get('unmatchedSheets', {}).values())
+            differences = workbook.stored_differences(result_data)
+            total = summary.get('differences', stored)
+            if total > stored:
+                metadata["totalDifferences"] = total
+                headers["X-Report-Truncated"] = f"{stored}/{total}"
+    elif files_kept:
+        comparator = get_comparator()
+        # Rejouer avec les mêmes options que la comparaison enregistrée
+        try:
+            options = comparator.resolve_options(stored_metadata.get('options'))
+            # Référence prétraitée : lue depuis le cache ; sinon l'empreinte est vérifiée avant lecture
+            df1 = get_reference_preprocessor().load(
+                {'file_path': ref_path, 'checksum': result.get('reference_checksum')},
+                options['columns'], options['ignore_columns']
+            )
+            df2 = comparator.read_path(comp_path, options['columns'], options['ignore_columns'])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        df1, df2 = comparator.prepare_dataframes(df1, df2, options)
+        differences = comparator.iter_differences(df1, df2, options)
+        metadata = {
+            "referenceRows": len(df1),
+            "referenceColumns": len(df1.columns),
+            "compareRows": len(df2),
+            "compareColumns": len(df2.columns)
+        }
+    else:
+        stored = result_data.get('differences', [])
+        differences = iter(stored)
+        summary = result_data.get('summary', {})
+        metadata = {key: summary.get(key, '') for key in
+                    ('referenceRows', 'referenceColumns', 'compareRows', 'compareColumns')}
+        total = summary.get('differences', len(stored))
+        if total > len(stored):
+            # Seules les premières différences sont enregistrées avec le résultat
+            metadata["totalDifferences"] = total
+            headers["X-Report-Truncated"] = f"{len(stored)}/{total}"
+    return differences, metadata
+
+@router.get("/comparisons/{comparison_id}/export")
+async def export_comparison(comparison_id: int, format: str = "xlsx"):
+    """
+    Exporte le rapport d'une comparaison enregistrée (CSV ou XLSX), téléchargé par morceaux.
+    Les fichiers comparés sont conservés à l'enregistrement : la comparaison est rejouée pour
+    exporter toutes les différences. S'ils ne sont plus sur le disque (comparaisons anciennes),
+    on exporte les différences enregistrées et l'en-tête X-Report-Truncated signale un rapport partiel.
+    Pour une comparaison de classeurs (/compare/workbook), les différences de toutes les feuilles sont
+    exportées ensemble, chacune avec le nom de sa feuille (colonne « Hoja »).
+    Rejouer la comparaison demande une place au contrôle d'admission, comme POST /export ; elle
+    est conservée jusqu'à la fin du téléchargement (429/503 si le serveur est saturé).
+    """
+    db = get_database_manager()
+    exporter = get_exporter()
+    result = await run_in_threadpool(db.get_comparison_details, comparison_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Comparaison non trouvée")
+
+    try:
+        media_type = exporter.get_media_type(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stored_metadata = (result.get('result_data') or {}).get('metadata') or {}
+    ref_path = result.get('reference_file_path')
+    comp_path = result.get('compare_file_path')
+    ref_name = result.get('reference_original_name') or stored_metadata.get('referenceFileName') or 'referencia'
+    comp_name = result['compare_file_name']
+    headers = {}
+    files_kept = bool(ref_path and comp_path and os.path.exists(ref_path) and os.path.exists(comp_path))
+
+    reservation = None
+    if files_kept:
+        # Même estimation que POST /export : la comparaison est rejouée pendant le téléchargement
+        admission = get_admission_controller()
+        cost = admission.estimate(
+            {'filename': ref_name, 'size': os.path.getsize(ref_path)},
+            {'filename': comp_name, 'size': os.path.getsize(comp_path)}
+        )
+        reservation = await admission.reserve(cost)
+
+    try:
+        differences, metadata = await run_in_threadpool(_export_differences, result, files_kept, headers)
+        await run_in_threadpool(db.mark_comparison_as_exported, comparison_id, format.lower())
+    except BaseException:
+        if reservation is not None:
+            await reservation.release(completed=False)
+        raise
+
+    metadata.update({"referenceFileName": ref_name, "compareFileName": comp_name})
+
+    filename = exporter.get_filename(ref_name, comp_name, format)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    chunks = exporter.stream(differences, format, metadata)
+    if reservation is None:
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+    # La place est libérée à la fin de la réponse, y compris si le client se déconnecte
+    return ReservedStreamingResponse(iterate_in_threadpool(chunks), reservation, media_type=media_type, headers=headers)
+
 @router.delete("/comparisons/{comparison_id}")
 def delete_comparison(comparison_id: int):
     """Supprime une comparaison de l'historique"""
     try:
-        db.delete_comparison(comparison_id)
+        get_database_manager().delete_comparison(comparison_id)
         return {"success": True, "comparison_id": comparison_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,51 +1,81 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from database_manager import DatabaseManager
-from models import ReferenceFile
+from runtime import get_database_manager, get_reference_store, get_reference_preprocessor
+from config import Config
 from typing import List
-import shutil
-import os
 
 router = APIRouter()
-db = DatabaseManager()
 
 @router.get("/reference-files", response_model=List[dict])
 def list_reference_files():
     """Liste tous les fichiers de référence actifs"""
-    return db.get_reference_files()
+    return get_database_manager().get_reference_files()
 
 @router.post("/reference-files")
 def add_reference_file(file: UploadFile = File(...)):
-    """Ajoute un nouveau fichier de référence"""
+    """
+    Ajoute un nouveau fichier de référence.
+    Le fichier est stocké sous son empreinte SHA-256, calculée pendant la copie ;
+    un contenu déjà présent dans la bibliothèque n'est ni réécrit ni ajouté une seconde fois.
+    Le prétraitement (profil, cache colonnaire, index des lignes) est mis en file d'attente.
+    """
+    db = get_database_manager()
+    store = get_reference_store()
     try:
-        # Sauvegarder le fichier sur le disque
-        upload_dir = db.config.get_reference_files_dir()
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        # Ajouter à la BDD
+        stored = store.ingest(file.file, file.filename)
+        existing = db.find_reference_by_checksum(stored['checksum'])
+        if existing:
+            return {"success": True, "duplicate": True, "filename": existing['name'],
+                    "file_id": existing['id'], "checksum": existing['checksum'],
+                    "status": existing['status'], "profile": existing.get('profile')}
+        # Ajouter à la BDD ; le profil, les dimensions et le cache sont calculés en arrière-plan
         file_data = {
             'name': file.filename,
             'original_name': file.filename,
-            'file_path': file_path,
-            'file_size': os.path.getsize(file_path),
+            'file_path': stored['file_path'],
+            'file_size': stored['file_size'],
             'mime_type': file.content_type,
-            'row_count': 0,
-            'column_count': 0,
             'description': '',
             'tags': '',
-            'checksum': '',
+            'checksum': stored['checksum'],
         }
-        db.add_reference_file(file_data)
-        return {"success": True, "filename": file.filename}
+        file_id = db.add_reference_file(file_data)
+        get_reference_preprocessor().submit(file_id)
+        return {"success": True, "duplicate": False, "filename": file.filename, "file_id": file_id,
+                "checksum": stored['checksum'], "status": "pending"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reference-files/{file_id}/profile")
+def get_reference_profile(file_id: int):
+    """Profil des données d'un fichier de référence"""
+    reference = get_database_manager().get_reference_file(file_id)
+    if not reference:
+        raise HTTPException(status_code=404, detail="Fichier de référence non trouvé")
+    if not reference.get('profile'):
+        raise HTTPException(status_code=404, detail="Profil non disponible pour ce fichier")
+    return reference['profile']
+
+@router.post("/reference-files/{file_id}/preprocess")
+def preprocess_reference_file(file_id: int):
+    """Relance le prétraitement d'un fichier de référence (après une erreur ou une interruption)"""
+    db = get_database_manager()
+    reference = db.get_reference_file(file_id)
+    if not reference:
+        raise HTTPException(status_code=404, detail="Fichier de référence non trouvé")
+    # Un prétraitement interrompu (processus arrêté) reste « processing » : il est repris après le délai
+    if reference['status'] == 'processing' and not db.reset_interrupted_references(
+        Config.REFERENCE_PROCESSING_TIMEOUT, file_id
+    ):
+        raise HTTPException(status_code=409, detail="Le fichier est déjà en cours de prétraitement")
+    db.set_reference_status(file_id, 'pending')
+    get_reference_preprocessor().submit(file_id)
+    return {"success": True, "file_id": file_id, "status": "pending"}
+
 @router.delete("/reference-files/{file_id}")
 def delete_reference_file(file_id: int):
     """Supprime (désactive) un fichier de référence"""
     try:
-        db.delete_reference_file(file_id)
+        get_database_manager().delete_reference_file(file_id)
         return {"success": True, "file_id": file_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,24 @@
-from fastapi import APIRouter
-from database_manager import DatabaseManager
+from fastapi import APIRouter, HTTPException
+from runtime import get_database_manager
 from typing import List
 
 router = APIRouter()
-db = DatabaseManager()
 
 @router.get("/history", response_model=List[dict])
 def get_history():
     """Récupère l'historique des comparaisons"""
-    return db.get_comparison_history()
+    return get_database_manager().get_comparison_history()
+
+@router.get("/history/changes", response_model=List[dict])
+def get_history_changes(column: str = None, key: str = None, change_type: str = None,
+                        limit: int = 100, offset: int = 0):
+    """
+    Recherche dans tout l'historique les changements d'une colonne et/ou d'une clé de ligne
+    (par exemple column=IP_Address&key=PC-HR-001). Seules les comparaisons enregistrées avec
+    l'option 'record_changes' alimentent la table comparison_changes. changes_truncated signale
+    une comparaison dont le registre a atteint la limite : la réponse peut alors être incomplète.
+    """
+    if column is None and key is None:
+        raise HTTPException(status_code=400, detail="Indiquez au moins une colonne (column) ou une clé (key)")
+    limit = max(1, min(limit, 1000))
+    return get_database_manager().find_changes(column, key, change_type, limit, max(offset, 0))
@@ -0,0 +1,52 @@
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from runtime import get_progress_registry
+from serializers import dumps
+
+router = APIRouter(prefix="/progress")
+
+# Intervalle en secondes entre deux lectures de l'instantané de progression
+POLL_INTERVAL = 0.2
+
+# Lectures sans changement avant d'envoyer un commentaire qui garde la connexion ouverte (~15 s)
+KEEPALIVE_POLLS = 75
+
+@router.get("/{progress_id}")
+async def stream_progress(progress_id: str, request: Request):
+    """
+    Flux Server-Sent Events de la progression d'une comparaison.
+    Le client choisit l'identifiant, ouvre ce flux puis lance /compare, /compare/reference/{id} ou
+    /quick-scan avec ?progress_id=... (l'ordre n'a pas d'importance). Chaque événement « progress »
+    contient la phase, les lignes traitées, le débit, le temps restant estimé et les différences
+    comptées jusque-là ; le flux se ferme après l'état final. Avec plusieurs processus (start_production.py),
+    la progression passe par un dictionnaire partagé, le flux et la comparaison peuvent donc être servis
+    par des processus différents.
+    """
+    progress = get_progress_registry().open(progress_id)
+
+    async def events():
+        version = None
+        idle = 0
+        while not await request.is_disconnected():
+            # La comparaison peut s'exécuter dans un autre processus : on relit le stockage partagé
+            progress.refresh()
+            if progress.version != version:
+                version = progress.version
+                snapshot = progress.snapshot
+                yield b"event: progress\ndata: " + dumps(snapshot) + b"\n\n"
+                if snapshot['status'] in progress.FINISHED:
+                    return
+                idle = 0
+            else:
+                idle += 1
+                if idle >= KEEPALIVE_POLLS:
+                    yield b": keep-alive\n\n"
+                    idle = 0
+            await asyncio.sleep(POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Mediciones de rendimiento del backend
+
+Uso:
+    python benchmarks.py arranque [--repeticiones 3] [--output resultados.json]
+    python benchmarks.py serializacion [--diferencias 200000] [--output resultados.json]
+    python benchmarks.py excel [--filas 50000] [--archivo libro.xlsx] [--output resultados.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+BACKEND_DIR = Path(__file__).parent
+EXAMPLES_DIR = BACKEND_DIR.parent / "examples"
+
+def _free_port() -> int:
+    """Busca un puerto libre para levantar un servidor temporal"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _multipart(files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    """Construye un cuerpo multipart/form-data sin dependencias externas"""
+    boundary = uuid.uuid4().hex
+    body = b""
+    for field, (filename, content) in files.items():
+        body += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8") + content + b"\r\n"
+    body += f"--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float = 60) -> float:
+    """Retorna los segundos transcurridos hasta que la URL responde con 200"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor termino inesperadamente (codigo {process.returncode})")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} no respondio en {timeout} segundos")
+
+def _measure_import(module: str) -> float:
+    """Mide el tiempo de importacion de un modulo en un interprete limpio"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+def benchmark_startup(repetitions: int = 3) -> Dict[str, Any]:
+    """
+    Mide el arranque en frio del backend
+    Registra la importacion de main, el tiempo hasta /health y /ready y la primera comparacion
+    """
+    reference = (EXAMPLES_DIR / "maquinas_referencia.csv").read_bytes()
+    compare = (EXAMPLES_DIR / "maquinas_nuevas.csv").read_bytes()
+    body, content_type = _multipart({
+        "file1": ("maquinas_referencia.csv", reference),
+        "file2": ("maquinas_nuevas.csv", compare)
+    })
+
+    runs = []
+    for _ in range(repetitions):
+        run = {
+            "import_main": _measure_import("main"),
+            "import_file_comparator": _measure_import("file_comparator")
+        }
+
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            run["first_health"] = _wait_for(f"{base_url}/health", process)
+            run["ready"] = _wait_for(f"{base_url}/ready", process) + run["first_health"]
+
+            request = urllib.request.Request(
+                f"{base_url}/compare", data=body, headers={"Content-Type": content_type}, method="POST"
+            )
+            compare_start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+            run["first_compare"] = time.perf_counter() - compare_start
+            run["total"] = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+
+        runs.append({key: round(value, 4) for key, value in run.items()})
+
+    return {
+        "benchmark": "arranque",
+        "date": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "median": {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]}
+    }
+
+def _synthetic_result(differences: int) -> Dict[str, Any]:
+    """Genera un resultado de comparacion grande con escalares de numpy y NaN"""
+    import numpy as np
+    import pandas as pd
+
+    rows = max(differences // 10, 1)
+    frame = pd.DataFrame({
+        "Nombre_Maquina": [f"PC-{i:07d}" for i in range(rows)],
+        "Puerto": np.arange(rows, dtype=np.int64),
+        "Carga": np.where(np.arange(rows) % 7 == 0, np.nan, np.linspace(0, 1, rows)),
+        "Activa": np.arange(rows) % 2 == 0
+    })
+    unique_rows = [
+        {"row_index": int(i), "data": frame.iloc[i].to_dict(), "key_columns": list(frame.columns)}
+        for i in range(rows)
+    ]
+    return {
+        "identical": False,
+        "summary": {"differences": differences, "modifiedCells": differences},
+        "differences": [
+            {
+                "type": "cell_modified",
+                "position": f"Fila {i + 1}, Columna 'Carga'",
+                "column": "Carga",
+                "row": i + 1,
+                "referenceValue": str(i),
+                "compareValue": str(i + 1)
+            }
+            for i in range(differences)
+        ],
+        "different_content": {"unique_in_reference": unique_rows, "unique_in_compare": unique_rows}
+    }
+
+def benchmark_serialization(differences: int = 200000, repetitions: int = 3) -> Dict[str, Any]:
+    """
+    Compara la ruta anterior (limpieza + json.dumps para la respuesta y otra vez para el
+    historial) con serializers.dumps, que codifica una sola vez y reutiliza los bytes
+    """
+    import serializers
+
+    result = _synthetic_result(differences)
+
+    def previous_path():
+        # Respuesta HTTP y json.dumps de save_comparison: dos codificaciones completas
+        clean = serializers._to_builtin(result)
+        response = json.dumps(clean, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        stored = json.dumps(serializers._to_builtin(result))
+        return response, stored
+
+    def current_path():
+        body = serializers.dumps(result)
+        return body, body.decode("utf-8")
+
+    runs = []
+    for _ in range(repetitions):
+        run = {}
+        for name, function in (("stdlib_dos_pasadas", previous_path), ("serializer_una_pasada", current_path)):
+            start = time.perf_counter()
+            body, _ = function()
+            run[name] = time.perf_counter() - start
+            run[f"{name}_bytes"] = len(body)
+        runs.append({key: round(value, 4) for key, value in run.items()})
+
+    median = {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]}
+    median["aceleracion"] = round(median["stdlib_dos_pasadas"] / max(median["serializer_una_pasada"], 1e-9), 2)
+
+    return {
+        "benchmark": "serializacion",
+        "date": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "encoder": "orjson" if serializers.orjson is not None else "json",
+        "differences": differences,
+        "runs": runs,
+        "median": median
+    }
+
+def _synthetic_inventory(rows: int):
+    """Inventario de maquinas con texto, enteros, reales, fechas y celdas vacias"""
+    import numpy as np
+    import pandas as pd
+
+    index = np.arange(rows)
+    return pd.DataFrame({
+        "Nombre_Maquina": [f"PC-{i:07d}" for i in range(rows)],
+        "IP_Address": [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(rows)],
+        "Departamento": np.array(["IT", "RRHH", "Finanzas", "Ventas"])[index % 4],
+        "Puerto": index,
+        "Carga": np.where(index % 7 == 0, np.nan, np.linspace(0, 1, rows)),
+        "Ultimo_Acceso": pd.date_range("2024-01-01", periods=rows, freq="min")
+    })
+
+def benchmark_excel(rows: int = 50000, repetitions: int = 3, workbook: str = None) -> Dict[str, Any]:
+    """
+    Lectura de un libro de Excel con cada motor instalado (excel_readers.py) y, como referencia,
+    del mismo contenido en CSV; comprueba además que todos los motores dan el mismo DataFrame
+    Sin --archivo se genera un inventario sintetico de rows filas
+    """
+    import pandas as pd
+    import excel_readers
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = None
+        if workbook is None:
+            frame = _synthetic_inventory(rows)
+            workbook = os.path.join(directory, "inventario.xlsx")
+            csv_path = os.path.join(directory, "inventario.csv")
+            frame.to_excel(workbook, index=False, engine="xlsxwriter")
+            frame.to_csv(csv_path, index=False)
+
+        extension = workbook.lower().split(".")[-1]
+        engines = excel_readers.available_engines(extension)
+        readers = {
+            engine: lambda engine=engine: excel_readers.read_excel(workbook, extension, engine=engine)[0]
+            for engine in engines
+        }
+        if csv_path:
+            readers["csv"] = lambda: pd.read_csv(csv_path)
+
+        runs = []
+        frames = {}
+        for _ in range(repetitions):
+            run = {}
+            for name, function in readers.items():
+                start = time.perf_counter()
+                frames[name] = function()
+                run[name] = round(time.perf_counter() - start, 4)
+            runs.append(run)
+
+    median = {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]}
+    # El motor mas lento (el ultimo de la lista) es la referencia de la aceleracion
+    baseline = engines[-1]
+    for engine in engines[:-1]:
+        median[f"aceleracion_{engine}"] = round(median[baseline] / max(median[engine], 1e-9), 2)
+    if "csv" in median:
+        median[f"{engines[0]}_vs_csv"] = round(median[engines[0]] / max(median["csv"], 1e-9), 2)
+
+    reference = frames[baseline]
+    return {
+        "benchmark": "excel",
+        "date": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "workbook": os.path.basename(workbook),
+        "rows": len(reference),
+        "engines": engines,
+        "identical_frames": {engine: bool(frames[engine].equals(reference)) for engine in engines},
+        "runs": runs,
+        "median": median
+    }
+
+def _print_results(results: Dict[str, Any]):
+    print("=" * 60)
+    print(f"📊 BENCHMARK: {results['benchmark'].upper()}")
+    print("=" * 60)
+    for key, value in results["median"].items():
+        unit = "" if key.endswith("_bytes") or key.startswith("aceleracion") or key.endswith("_vs_csv") else " s"
+        print(f"{key:<28} {value:>14.4f}{unit}")
+    print("=" * 60)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mediciones de rendimiento del backend")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subparsers.add_parser("arranque", help="Tiempo de importacion y de la primera peticion")
+    startup.add_argument("--repeticiones", type=int, default=3)
+    startup.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+
+    serialization = subparsers.add_parser("serializacion", help="Codificacion JSON de resultados grandes")
+    serialization.add_argument("--diferencias", type=int, default=200000)
+    serialization.add_argument("--repeticiones", type=int, default=3)
+    serialization.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+
+    excel = subparsers.add_parser("excel", help="Lectura de libros de Excel con cada motor instalado")
+    excel.add_argument("--filas", type=int, default=50000)
+    excel.add_argument("--archivo", help="Libro XLSX o XLS propio en lugar del inventario sintetico")
+    excel.add_argument("--repeticiones", type=int, default=3)
+    excel.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+
+    args = parser.parse_args()
+
+    if args.benchmark == "arranque":
+        results = benchmark_startup(args.repeticiones)
+    elif args.benchmark == "serializacion":
+        results = benchmark_serialization(args.diferencias, args.repeticiones)
+    elif args.benchmark == "excel":
+        results = benchmark_excel(args.filas, args.repeticiones, args.archivo)
+
+    _print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+        print(f"💾 Resultados guardados en: {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Optional
+
+class ComparisonCancelled(Exception):
+    """La comparación se detuvo antes de terminar; reason es 'cancelled', 'disconnected' o 'deadline'"""
+
+    def __init__(self, reason: str, time_budget: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.time_budget = time_budget
+
+class CancellationToken:
+    """
+    Señal de cancelación compartida entre el endpoint y el motor de comparación
+    El motor la consulta entre bloques y fases con check(); el endpoint la activa con cancel()
+    cuando el cliente se desconecta, y el plazo (si hay) vence por sí solo
+    En esos mismos puntos el motor informa del avance a progress (ComparisonProgress), si lo hay
+    """
+
+    def __init__(self, time_budget: Optional[float] = None, progress=None):
+        self.time_budget = time_budget
+        self.progress = progress
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self._event = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = 'cancelled'):
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._event.is_set():
+            return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return 'deadline'
+        return None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def check(self):
+        """Lanza ComparisonCancelled si se canceló o venció el plazo"""
+        reason = self.reason
+        if reason is not None:
+            raise ComparisonCancelled(reason, self.time_budget)
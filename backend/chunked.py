@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+class ChangeLog:
+    """
+    Cambios por columna y clave de fila, para la tabla comparison_changes del historial
+    Lo crea quien guarda la comparación y lo recibe el motor junto al resultado, no dentro de él:
+    así el registro no llega a la respuesta, a la caché ni al resultado guardado
+    La clave de una fila es su valor en key_column; las celdas modificadas la toman de la fila de
+    referencia con keys (valores de la columna del bloque actual, cuya primera fila es offset)
+    Se conservan como mucho limit cambios: [hoja, columna, clave, tipo, valor anterior, valor nuevo];
+    total cuenta también los que no caben, y la comparación guardada indica si el registro quedó truncado
+    """
+
+    # Tipos de diferencia que se registran; los bloques movidos y el número de columnas no tienen columna ni fila
+    RECORDED_TYPES = ('cell_modified', 'row_added', 'row_removed', 'column_added', 'column_missing', 'column_renamed')
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.rows: List[List[Any]] = []
+        self.total = 0
+        self.key_column: Optional[str] = None
+        self.sheet: Optional[str] = None
+        self.keys: Optional[np.ndarray] = None
+        self.offset = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.rows)
+
+    def start(self, key_column: Optional[str]):
+        """Empieza los cambios de una comparación con su columna clave; sheet la fija quien compara un libro"""
+        self.key_column = key_column
+        self.keys, self.offset = None, 0
+
+    def use_keys(self, keys: Optional[np.ndarray], offset: int = 0):
+        self.keys, self.offset = keys, offset
+
+    def _key(self, row: int) -> Optional[str]:
+        index = row - 1 - self.offset
+        if self.keys is None or not 0 <= index < len(self.keys):
+            return None
+        return str(self.keys[index])
+
+    def add(self, difference: Dict[str, Any]):
+        kind = difference["type"]
+        if kind not in self.RECORDED_TYPES:
+            return
+        self.total += 1
+        if len(self.rows) >= self.limit:
+            return
+        if kind == "cell_modified":
+            self.rows.append([
+                self.sheet, difference["column"], self._key(difference["row"]), kind,
+                difference["referenceValue"], difference["compareValue"]
+            ])
+        elif kind in ("row_added", "row_removed"):
+            key = difference["data"].get(self.key_column) if self.key_column else None
+            self.rows.append([self.sheet, None, key, kind, None, None])
+        else:
+            self.rows.append([self.sheet, difference.get("column"), None, kind, None, None])
+
+    def merge(self, rows: List[List[Any]], total: int):
+        """Agrega los cambios de una hoja comparada en otro proceso (ver workbook.py)"""
+        self.rows.extend(rows[:max(self.limit - len(self.rows), 0)])
+        self.total += total
+
+class DifferenceTally:
+    """
+    Cuenta las diferencias por tipo a medida que se generan
+    Solo conserva las primeras para el reporte, así la memoria no crece con el número de diferencias
+    Si hay changes (ChangeLog), le pasa cada diferencia para el registro por columna y clave
+    """
+
+    def __init__(self, keep: int, changes: Optional[ChangeLog] = None):
+        self.keep = keep
+        self.kept: List[Dict[str, Any]] = []
+        self.total = 0
+        self.counts: Counter = Counter()
+        self.moved_rows = 0
+        self.changes = changes
+
+    def add(self, difference: Dict[str, Any]):
+        self.total += 1
+        if self.changes is not None:
+            self.changes.add(difference)
+        self.counts[difference["type"]] += 1
+        if difference["type"] == "row_moved":
+            self.moved_rows += difference["rows"]
+        if len(self.kept) < self.keep:
+            self.kept.append(difference)
+
+    def extend(self, differences: Iterable[Dict[str, Any]]):
+        for difference in differences:
+            self.add(difference)
+
+def rechunk(chunks: Iterable[pd.DataFrame], rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Reagrupa bloques de tamaño variable (lotes de Parquet o Arrow) en bloques de exactamente rows filas
+    Así el bloque k de ambos archivos cubre las mismas posiciones; solo el último puede ser menor
+    """
+    buffer: List[pd.DataFrame] = []
+    buffered = 0
+    for chunk in chunks:
+        while len(chunk):
+            piece = chunk.iloc[:rows - buffered]
+            chunk = chunk.iloc[len(piece):]
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered == rows:
+                yield buffer[0] if len(buffer) == 1 else pd.concat(buffer)
+                buffer, buffered = [], 0
+    if buffer:
+        yield buffer[0] if len(buffer) == 1 else pd.concat(buffer)
@@ -18,7 +18,7 @@ class Config:
     
     # Configuracion de archivos - Compatible con la estructura existente
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 10485760))  # 10MB por defecto
-    ALLOWED_EXTENSIONS = os.getenv('ALLOWED_EXTENSIONS', 'csv,xlsx,xls').split(',')
+    ALLOWED_EXTENSIONS = os.getenv('ALLOWED_EXTENSIONS', 'csv,xlsx,xls,parquet,arrow,feather,ipc').split(',')
     SUPPORTED_FORMATS = [f'.{ext}' for ext in ALLOWED_EXTENSIONS]
     
     # Configuracion de seguridad
@@ -38,11 +38,70 @@ class Config:
     # Configuracion del ambiente de ejecucion
     ENV = os.getenv('ENV', 'production')
     
+    # Configuracion del servidor de produccion multiproceso
+    # Un solo proceso por defecto (aplicacion de escritorio de un usuario): cada proceso carga su
+    # propio motor y sus caches; varios procesos solo si se configuran (0 = uno por CPU)
+    WORKERS = int(os.getenv('WORKERS', 1))
+    MAX_WORKERS = int(os.getenv('MAX_WORKERS', 8))
+    WORKER_MAX_REQUESTS = int(os.getenv('WORKER_MAX_REQUESTS', 500))  # Reciclar el proceso para liberar memoria de pandas
+    WORKER_MAX_REQUESTS_JITTER = int(os.getenv('WORKER_MAX_REQUESTS_JITTER', 50))
+    WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 300))  # Segundos sin latido antes de reiniciar un proceso
+    WORKER_GRACEFUL_TIMEOUT = int(os.getenv('WORKER_GRACEFUL_TIMEOUT', 30))
+    WORKER_RESTART_BACKOFF = float(os.getenv('WORKER_RESTART_BACKOFF', 1))  # Espera antes de reemplazar un proceso caido; se duplica en cada caida seguida
+    WORKER_RESTART_BACKOFF_MAX = float(os.getenv('WORKER_RESTART_BACKOFF_MAX', 60))
+    WORKER_MAX_STARTUP_FAILURES = int(os.getenv('WORKER_MAX_STARTUP_FAILURES', 5))  # Caidas seguidas sin llegar a servir antes de detener el supervisor
+    
+    # El supervisor crea las tablas antes de lanzar los procesos y se lo indica con esta variable
+    DB_SCHEMA_READY = os.getenv('DB_SCHEMA_READY', 'False').lower() == 'true'
+    
+    # Configuracion de la cache de resultados de comparacion
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_MEMORY_BYTES = int(os.getenv('RESULT_CACHE_MEMORY_BYTES', 67108864))  # 64MB en memoria por proceso
+    RESULT_CACHE_DB_BYTES = int(os.getenv('RESULT_CACHE_DB_BYTES', 536870912))  # 512MB en la base de datos
+    
+    # Control de admision de comparaciones (para todo el servidor: los trabajadores comparten el presupuesto)
+    COMPARISON_MEMORY_BUDGET = int(os.getenv('COMPARISON_MEMORY_BUDGET', 1073741824))  # 1GB de memoria estimada
+    MAX_CONCURRENT_COMPARISONS = int(os.getenv('MAX_CONCURRENT_COMPARISONS', 2))
+    COMPARISON_QUEUE_SIZE = int(os.getenv('COMPARISON_QUEUE_SIZE', 8))  # Solicitudes en espera antes de responder 429
+    COMPARISON_QUEUE_TIMEOUT = float(os.getenv('COMPARISON_QUEUE_TIMEOUT', 30))  # Segundos de espera antes de responder 503
+    COMPARISON_TIME_BUDGET = float(os.getenv('COMPARISON_TIME_BUDGET', 300))  # Segundos maximos por comparacion (0 = sin limite)
+    
+    # Memoria maxima de una comparacion para elegir el motor en memoria; si no cabe se compara por bloques
+    COMPARISON_ENGINE_BUDGET = int(os.getenv('COMPARISON_ENGINE_BUDGET', 0))  # 0 = presupuesto de admision / comparaciones simultaneas
+    
+    # Segundos tras los que un preprocesamiento de referencia sin terminar se da por interrumpido
+    # (proceso caido) y se vuelve a encolar; al arrancar el supervisor se retoman todos
+    REFERENCE_PROCESSING_TIMEOUT = int(os.getenv('REFERENCE_PROCESSING_TIMEOUT', 1800))
+    
+    # Procesos que comparan en paralelo las hojas de dos libros de Excel (por proceso del servidor)
+    WORKBOOK_WORKERS = int(os.getenv('WORKBOOK_WORKERS', 0))  # 0 = numero de CPU (hasta MAX_WORKERS)
+    
     @classmethod
     def is_production(cls):
         """Verifica si la aplicacion esta ejecutandose en modo produccion"""
         return cls.ENV.lower() == 'production' or not cls.DEBUG
     
+    @classmethod
+    def get_worker_count(cls):
+        """Numero de procesos del servidor: WORKERS, o uno por CPU (hasta MAX_WORKERS) si WORKERS es 0"""
+        if cls.WORKERS > 0:
+            return cls.WORKERS
+        return max(1, min(os.cpu_count() or 1, cls.MAX_WORKERS))
+    
+    @classmethod
+    def get_engine_budget(cls):
+        """Memoria disponible para una comparacion, configurada o repartida entre las simultaneas"""
+        if cls.COMPARISON_ENGINE_BUDGET > 0:
+            return cls.COMPARISON_ENGINE_BUDGET
+        return cls.COMPARISON_MEMORY_BUDGET // max(cls.MAX_CONCURRENT_COMPARISONS, 1)
+    
+    @classmethod
+    def get_workbook_workers(cls):
+        """Procesos para comparar hojas en paralelo, configurados o calculados a partir de los CPU"""
+        if cls.WORKBOOK_WORKERS > 0:
+            return cls.WORKBOOK_WORKERS
+        return max(1, min(os.cpu_count() or 1, cls.MAX_WORKERS))
+    
     @classmethod
     def get_cors_origins(cls):
         """Retorna las origenes CORS configuradas para el servidor"""
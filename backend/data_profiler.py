@@ -0,0 +1,113 @@
+import hashlib
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from sketches import KMVSketch, hash_values
+
+class DataProfiler:
+    """
+    Calcula el perfil de un archivo: dimensiones, tipos, nulos, cardinalidad y longitudes
+    El perfil se guarda con el archivo de referencia para no tener que volver a leerlo
+    """
+
+    PROFILE_VERSION = 1
+
+    # Tamaño del sketch usado para estimar valores distintos por columna
+    DISTINCT_SKETCH_SIZE = 1024
+
+    # Copias de los datos que mantiene en memoria una comparación completa
+    # (DataFrame original, conversión a string y matrices de comparación)
+    COMPARISON_MEMORY_FACTOR = 3
+
+    def profile(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Genera el perfil completo de un DataFrame en una sola pasada por columna"""
+        columns = [str(col).strip() for col in df.columns]
+        null_counts = df.isna().sum()
+        memory = df.memory_usage(index=False, deep=True)
+
+        column_profiles = []
+        for position, col in enumerate(df.columns):
+            column_profiles.append(self._profile_column(
+                df[col], columns[position], int(null_counts.iloc[position]), int(memory.iloc[position])
+            ))
+
+        return {
+            'version': self.PROFILE_VERSION,
+            'row_count': int(len(df)),
+            'column_count': int(len(df.columns)),
+            'memory_bytes': int(memory.sum()),
+            'schema_fingerprint': self.schema_fingerprint(columns),
+            'columns': column_profiles,
+            'profiled_at': datetime.utcnow().isoformat()
+        }
+
+    def _profile_column(self, series: pd.Series, name: str, null_count: int, memory_bytes: int) -> Dict[str, Any]:
+        values = series.dropna()
+
+        sketch = KMVSketch(self.DISTINCT_SKETCH_SIZE)
+        if len(values):
+            sketch.update(hash_values(values))
+
+        lengths = values.astype(str).str.len()
+
+        return {
+            'name': name,
+            'dtype': str(series.dtype),
+            'null_count': null_count,
+            'distinct_estimate': sketch.estimate(),
+            'distinct_exact': sketch.is_exact(),
+            'min_length': int(lengths.min()) if len(lengths) else 0,
+            'max_length': int(lengths.max()) if len(lengths) else 0,
+            'memory_bytes': memory_bytes
+        }
+
+    def schema_fingerprint(self, columns: List[str]) -> str:
+        """
+        Huella del esquema basada en los nombres de columna y su orden
+        No incluye los tipos, que varían según el formato (CSV frente a Excel)
+        """
+        canonical = '\n'.join(str(col).strip() for col in columns)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def check_structure(self, profile: Dict[str, Any], columns: List[str],
+                        dtypes: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Compara un perfil guardado con las columnas de otro archivo sin releer la referencia
+        Anticipa si la comparación de contenido podrá ejecutarse
+        """
+        columns = [str(col).strip() for col in columns]
+        reference_columns = [col['name'] for col in profile.get('columns', [])]
+
+        missing = [col for col in reference_columns if col not in set(columns)]
+        extra = [col for col in columns if col not in set(reference_columns)]
+
+        dtype_mismatches = []
+        if dtypes:
+            for col in profile.get('columns', []):
+                other = dtypes.get(col['name'])
+                if other is not None and other != col['dtype']:
+                    dtype_mismatches.append({'column': col['name'], 'reference': col['dtype'], 'compare': other})
+
+        return {
+            'same_schema': profile.get('schema_fingerprint') == self.schema_fingerprint(columns),
+            'compatible': not missing and not extra,
+            'missing_columns': missing,
+            'extra_columns': extra,
+            'dtype_mismatches': dtype_mismatches
+        }
+
+    def estimate_comparison_memory(self, profile: Dict[str, Any], other_profile: Optional[Dict[str, Any]] = None,
+                                   other_file_size: int = 0) -> int:
+        """
+        Estima la memoria máxima en bytes de una comparación contra este perfil
+        Si no hay perfil del otro archivo, se aproxima a partir de su tamaño en disco
+        """
+        reference_bytes = profile.get('memory_bytes', 0)
+        if other_profile is not None:
+            other_bytes = other_profile.get('memory_bytes', 0)
+        else:
+            # Un CSV cargado como cadenas de pandas ocupa varias veces su tamaño en disco
+            other_bytes = other_file_size * 4
+        return int((reference_bytes + other_bytes) * self.COMPARISON_MEMORY_FACTOR)
@@ -3,15 +3,21 @@ import json
 import hashlib
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
-from models import ReferenceFile, Comparison, AppSetting, ActivityLog, DatabaseConfig
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, desc, and_, or_, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import (ReferenceFile, Comparison, ComparisonChange, ChangeValue, AppSetting, ActivityLog,
+                    ComparisonCache, DatabaseConfig)
+from serializers import dumps
 import logging
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    def __init__(self, db_path: str = None):
+    # Valores por consulta al buscar sus identificadores (límite de parámetros de SQLite)
+    VALUE_LOOKUP_BATCH = 500
+    
+    def __init__(self, db_path: str = None, init_schema: bool = True):
         if db_path is None:
             # Buscar la base de datos en el directorio de Electron
             possible_paths = [
@@ -29,12 +35,18 @@ class DatabaseManager:
                 db_path = possible_paths[0]
                 os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
+        self.db_path = db_path
         self.config = DatabaseConfig(db_path)
-        self.config.create_tables()
-        logger.info(f"Base de datos inicializada en: {db_path}")
         
-        # Insertar configuraciones por defecto
-        self._insert_default_settings()
+        # Con varios procesos, solo el supervisor crea las tablas para evitar carreras
+        if init_schema:
+            self.config.create_tables()
+            logger.info(f"Base de datos inicializada en: {db_path}")
+            
+            # Insertar configuraciones por defecto
+            self._insert_default_settings()
+        else:
+            logger.info(f"Usando base de datos ya inicializada en: {db_path}")
         
     def _insert_default_settings(self):
         """Inserta configuraciones por defecto si no existen"""
@@ -83,8 +95,13 @@ class DatabaseManager:
                 if existing:
                     raise ValueError(f"Ya existe un archivo idéntico: {existing.name}")
             
+            profile = file_data.get('profile')
+            
+            # El nombre es único: dos archivos distintos con el mismo nombre se distinguen con un sufijo
+            name = self._unique_reference_name(session, file_data['name'])
+            
             reference_file = ReferenceFile(
-                name=file_data['name'],
+                name=name,
                 original_name=file_data['original_name'],
                 file_path=file_data['file_path'],
                 file_size=file_data['file_size'],
@@ -93,7 +110,9 @@ class DatabaseManager:
                 column_count=file_data.get('column_count', 0),
                 description=file_data.get('description'),
                 tags=','.join(file_data.get('tags', [])) if file_data.get('tags') else None,
-                checksum=file_data.get('checksum')
+                checksum=file_data.get('checksum'),
+                profile_data=self._encode_json(profile) if profile else None,
+                schema_fingerprint=profile.get('schema_fingerprint') if profile else None
             )
             
             session.add(reference_file)
@@ -105,8 +124,8 @@ class DatabaseManager:
             self.log_activity(
                 session,
                 'REFERENCE_ADDED',
-                f'Archivo de referencia agregado: {file_data["name"]}',
-                file_data['name'],
+                f'Archivo de referencia agregado: {name}',
+                name,
                 True
             )
             
@@ -119,6 +138,27 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def _unique_reference_name(self, session: Session, name: str) -> str:
+        base, extension = os.path.splitext(name)
+        candidate = name
+        suffix = 2
+        while session.query(ReferenceFile.id).filter(ReferenceFile.name == candidate).first():
+            candidate = f"{base} ({suffix}){extension}"
+            suffix += 1
+        return candidate
+
+    def find_reference_by_checksum(self, checksum: str) -> Optional[Dict[str, Any]]:
+        """Archivo de referencia activo con el mismo contenido, si existe"""
+        session = self.config.get_session()
+        try:
+            reference_file = session.query(ReferenceFile).filter(
+                ReferenceFile.checksum == checksum,
+                ReferenceFile.is_active == True
+            ).first()
+            return reference_file.to_dict() if reference_file else None
+        finally:
+            session.close()
+
     def get_reference_files(self, include_inactive: bool = False) -> List[Dict[str, Any]]:
         """Obtiene la lista de archivos de referencia"""
         session = self.config.get_session()
@@ -154,6 +194,112 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def update_reference_profile(self, file_id: int, profile: Dict[str, Any]) -> bool:
+        """Guarda el perfil de datos calculado para un archivo de referencia"""
+        session = self.config.get_session()
+        try:
+            file = session.query(ReferenceFile).filter(ReferenceFile.id == file_id).first()
+            if file:
+                file.row_count = profile['row_count']
+                file.column_count = profile['column_count']
+                file.profile_data = self._encode_json(profile)
+                file.schema_fingerprint = profile['schema_fingerprint']
+                session.commit()
+                return True
+            return False
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al guardar el perfil del archivo {file_id}: {e}")
+            return False
+        finally:
+            session.close()
+
+    def claim_reference_processing(self, file_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Pasa un archivo de referencia pendiente a 'processing' y lo retorna
+        La actualización es condicional, así solo un proceso lo preprocesa aunque varios lo reciban
+        """
+        session = self.config.get_session()
+        try:
+            claimed = session.query(ReferenceFile).filter(
+                ReferenceFile.id == file_id,
+                ReferenceFile.is_active == True,
+                or_(ReferenceFile.status == 'pending', ReferenceFile.status == None)
+            ).update({ReferenceFile.status: 'processing', ReferenceFile.status_message: None,
+                      ReferenceFile.processing_started: datetime.utcnow()},
+                     synchronize_session=False)
+            session.commit()
+            if not claimed:
+                return None
+            return session.query(ReferenceFile).filter(ReferenceFile.id == file_id).first().to_dict()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al reservar el archivo de referencia {file_id}: {e}")
+            return None
+        finally:
+            session.close()
+
+    def set_reference_status(self, file_id: int, status: str, message: str = None) -> bool:
+        """Actualiza el estado de preprocesamiento de un archivo de referencia"""
+        session = self.config.get_session()
+        try:
+            file = session.query(ReferenceFile).filter(ReferenceFile.id == file_id).first()
+            if not file:
+                return False
+            file.status = status
+            file.status_message = message
+            if status == 'ready':
+                file.processed_date = datetime.utcnow()
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al actualizar el estado del archivo {file_id}: {e}")
+            return False
+        finally:
+            session.close()
+
+    def reset_interrupted_references(self, older_than: Optional[float] = None, file_id: Optional[int] = None) -> int:
+        """
+        Devuelve a 'pending' los archivos que quedaron en 'processing' porque el proceso que los
+        preprocesaba terminó (caída o reinicio); retorna cuántos se retomaron
+        Sin older_than se retoman todos (el supervisor, antes de lanzar los trabajadores); con él, solo
+        los que llevan más de older_than segundos, para no quitárselos a otro trabajador que sigue vivo
+        """
+        session = self.config.get_session()
+        try:
+            query = session.query(ReferenceFile).filter(ReferenceFile.status == 'processing')
+            if file_id is not None:
+                query = query.filter(ReferenceFile.id == file_id)
+            if older_than is not None:
+                query = query.filter(or_(
+                    ReferenceFile.processing_started == None,
+                    ReferenceFile.processing_started < datetime.utcnow() - timedelta(seconds=older_than)
+                ))
+            reset = query.update({ReferenceFile.status: 'pending', ReferenceFile.processing_started: None},
+                                 synchronize_session=False)
+            session.commit()
+            return reset
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al retomar los archivos de referencia interrumpidos: {e}")
+            return 0
+        finally:
+            session.close()
+
+    def get_pending_reference_ids(self) -> List[int]:
+        """Archivos de referencia activos que aún no se han preprocesado"""
+        session = self.config.get_session()
+        try:
+            rows = session.query(ReferenceFile.id).filter(
+                ReferenceFile.is_active == True,
+                or_(ReferenceFile.status == 'pending', ReferenceFile.status == None)
+            ).order_by(ReferenceFile.id).all()
+            return [row.id for row in rows]
+        finally:
+            session.close()
+
     def update_reference_file_usage(self, file_id: int) -> bool:
         """Actualiza el contador de uso de un archivo de referencia"""
         session = self.config.get_session()
@@ -202,6 +348,49 @@ class DatabaseManager:
             session.close()
 
     # Métodos para comparaciones
+    def _encode_json(self, data: Any) -> str:
+        """Acepta un resultado ya codificado (bytes/str) o lo codifica una sola vez"""
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data).decode('utf-8')
+        if isinstance(data, str):
+            return data
+        return dumps(data).decode('utf-8')
+
+    def build_comparison_record(self, result: Dict[str, Any], result_json: bytes, compare_file_name: str,
+                                compare_file_size: int, processing_time: float,
+                                reference_file_id: int = None, compare_file_path: str = None,
+                                reference_file_path: str = None, changes=None) -> Dict[str, Any]:
+        """
+        Prepara los datos de save_comparison a partir del resultado del comparador
+        Las rutas de los archivos guardados permiten volver a exportar todas las diferencias;
+        reference_file_path solo hace falta si la referencia no es un archivo de la biblioteca
+        changes es el ChangeLog que recibió la comparación (opción 'record_changes'), que no forma
+        parte del resultado: sus filas van a comparison_changes y sus totales a la comparación
+        """
+        summary = result['summary']
+        return {
+            'reference_file_id': reference_file_id,
+            'reference_file_path': reference_file_path,
+            'compare_file_name': compare_file_name,
+            'compare_file_path': compare_file_path,
+            'compare_file_size': compare_file_size,
+            'processing_time': processing_time,
+            'total_differences': summary['differences'],
+            'modified_cells': summary['modifiedCells'],
+            'added_rows': summary['addedRows'],
+            'removed_rows': summary['removedRows'],
+            'added_columns': summary['addedColumns'],
+            'removed_columns': summary['removedColumns'],
+            'unique_in_reference': summary['uniqueInReference'],
+            'unique_in_compare': summary['uniqueInCompare'],
+            'identical': result['identical'],
+            'result_data': result_json,  # Ya codificado: se guarda sin volver a serializar
+            'summary_data': summary,
+            'changes': changes.rows if changes is not None else [],
+            'changes_recorded': len(changes.rows) if changes is not None else None,
+            'changes_total': changes.total if changes is not None else None
+        }
+
     def save_comparison(self, comparison_data: Dict[str, Any]) -> int:
         """Guarda el resultado de una comparación"""
         session = self.config.get_session()
@@ -210,6 +399,7 @@ class DatabaseManager:
                 reference_file_id=comparison_data.get('reference_file_id'),
                 compare_file_name=comparison_data['compare_file_name'],
                 compare_file_path=comparison_data.get('compare_file_path'),
+                reference_file_path=comparison_data.get('reference_file_path'),
                 compare_file_size=comparison_data.get('compare_file_size'),
                 processing_time=comparison_data['processing_time'],
                 total_differences=comparison_data['total_differences'],
@@ -221,12 +411,18 @@ class DatabaseManager:
                 unique_in_reference=comparison_data.get('unique_in_reference', 0),
                 unique_in_compare=comparison_data.get('unique_in_compare', 0),
                 identical=comparison_data['identical'],
-                result_data=json.dumps(comparison_data['result_data']),
-                summary_data=json.dumps(comparison_data.get('summary_data', {})),
+                result_data=self._encode_json(comparison_data['result_data']),
+                summary_data=self._encode_json(comparison_data.get('summary_data', {})),
+                changes_recorded=comparison_data.get('changes_recorded'),
+                changes_total=comparison_data.get('changes_total'),
                 notes=comparison_data.get('notes')
             )
             
             session.add(comparison)
+            if comparison_data.get('changes'):
+                # El identificador hace falta para el registro de cambios, guardado en la misma transacción
+                session.flush()
+                self._insert_changes(session, comparison.id, comparison_data['changes'])
             session.commit()
             
             comparison_id = comparison.id
@@ -253,6 +449,100 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def _insert_changes(self, session: Session, comparison_id: int, changes: List[Tuple]):
+        """
+        Inserta en bloque el registro de cambios; los valores que aún no existen se agregan a change_values
+        Se usan sentencias de SQLAlchemy Core (executemany) en la conexión de la sesión: el ORM
+        construiría un objeto por fila
+        """
+        connection = session.connection()
+        value_ids = self._value_ids(connection, {value for change in changes for value in change[4:] if value is not None})
+        connection.execute(insert(ComparisonChange.__table__), [
+            {
+                'comparison_id': comparison_id,
+                'sheet': sheet,
+                'column_name': column,
+                'row_key': row_key,
+                'change_type': change_type,
+                'old_value_id': value_ids.get(old_value),
+                'new_value_id': value_ids.get(new_value)
+            }
+            for sheet, column, row_key, change_type, old_value, new_value in changes
+        ])
+
+    def _value_ids(self, connection, values: set) -> Dict[str, int]:
+        """Identificadores de los valores, insertando los nuevos (sin error si otro proceso ya los insertó)"""
+        values = list(values)
+        if not values:
+            return {}
+        table = ChangeValue.__table__
+        connection.execute(
+            sqlite_insert(table).on_conflict_do_nothing(index_elements=['value']),
+            [{'value': value} for value in values]
+        )
+        ids = {}
+        for start in range(0, len(values), self.VALUE_LOOKUP_BATCH):
+            batch = values[start:start + self.VALUE_LOOKUP_BATCH]
+            ids.update(connection.execute(select(table.c.value, table.c.id).where(table.c.value.in_(batch))).all())
+        return ids
+
+    def find_changes(self, column: str = None, row_key: str = None, change_type: str = None,
+                     limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Cambios registrados en todo el historial para una columna y/o una clave de fila
+        Se resuelven con los índices de comparison_changes, sin decodificar los resultados guardados
+        """
+        session = self.config.get_session()
+        try:
+            old_value = aliased(ChangeValue)
+            new_value = aliased(ChangeValue)
+            query = session.query(
+                ComparisonChange, Comparison.comparison_date, Comparison.compare_file_name,
+                Comparison.reference_file_id, Comparison.changes_recorded, Comparison.changes_total,
+                old_value.value, new_value.value
+            ).join(
+                Comparison, ComparisonChange.comparison_id == Comparison.id
+            ).outerjoin(
+                old_value, ComparisonChange.old_value_id == old_value.id
+            ).outerjoin(
+                new_value, ComparisonChange.new_value_id == new_value.id
+            )
+            
+            if column is not None:
+                query = query.filter(ComparisonChange.column_name == column)
+            if row_key is not None:
+                query = query.filter(ComparisonChange.row_key == row_key)
+            if change_type is not None:
+                query = query.filter(ComparisonChange.change_type == change_type)
+            
+            rows = query.order_by(
+                desc(Comparison.comparison_date), ComparisonChange.id
+            ).offset(offset).limit(limit).all()
+            
+            return [
+                {
+                    'comparison_id': change.comparison_id,
+                    'comparison_date': comparison_date.isoformat() if comparison_date else None,
+                    'compare_file_name': compare_file_name,
+                    'reference_file_id': reference_file_id,
+                    'sheet': change.sheet,
+                    'column': change.column_name,
+                    'row_key': change.row_key,
+                    'change_type': change.change_type,
+                    'old_value': old,
+                    'new_value': new,
+                    # La comparación tenía más cambios de los que se registraron (CHANGE_LOG_LIMIT)
+                    'changes_truncated': (recorded or 0) < (total or 0)
+                }
+                for change, comparison_date, compare_file_name, reference_file_id, recorded, total, old, new in rows
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error al buscar cambios en el historial: {e}")
+            return []
+        finally:
+            session.close()
+
     def get_comparison_history(self, limit: int = 50, offset: int = 0, 
                              reference_file_id: int = None) -> List[Dict[str, Any]]:
         """Obtiene el historial de comparaciones"""
@@ -295,11 +585,14 @@ class DatabaseManager:
                 return None
             
             result = comparison.to_dict(include_data=True)
+            result['compare_file_path'] = comparison.compare_file_path
+            result['reference_file_path'] = comparison.reference_file_path
             
             if comparison.reference_file:
                 result['reference_file_name'] = comparison.reference_file.name
                 result['reference_original_name'] = comparison.reference_file.original_name
                 result['reference_file_path'] = comparison.reference_file.file_path
+                result['reference_checksum'] = comparison.reference_file.checksum
             
             return result
             
@@ -329,6 +622,23 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def delete_comparison(self, comparison_id: int) -> bool:
+        """Elimina una comparación del historial junto con su registro de cambios"""
+        session = self.config.get_session()
+        try:
+            session.query(ComparisonChange).filter(
+                ComparisonChange.comparison_id == comparison_id
+            ).delete(synchronize_session=False)
+            deleted = session.query(Comparison).filter(Comparison.id == comparison_id).delete()
+            session.commit()
+            return deleted > 0
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al eliminar comparación {comparison_id}: {e}")
+            raise
+        finally:
+            session.close()
+
     # Métodos para configuraciones
     def get_setting(self, key: str) -> Optional[str]:
         """Obtiene el valor de una configuración"""
@@ -381,6 +691,94 @@ class DatabaseManager:
         finally:
             session.close()
 
+    # Métodos para la caché de resultados
+    def get_cached_result(self, cache_key: str) -> Optional[bytes]:
+        """Retorna el resultado codificado guardado para la clave y registra el acceso"""
+        session = self.config.get_session()
+        try:
+            entry = session.query(ComparisonCache).filter(ComparisonCache.cache_key == cache_key).first()
+            if not entry:
+                return None
+            entry.last_accessed = datetime.utcnow()
+            entry.hit_count = (entry.hit_count or 0) + 1
+            data = entry.result_data
+            session.commit()
+            return data
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al leer la caché de resultados: {e}")
+            return None
+        finally:
+            session.close()
+
+    def store_cached_result(self, cache_key: str, data: bytes, engine_version: str,
+                            max_total_bytes: int) -> bool:
+        """
+        Guarda un resultado codificado y elimina las entradas usadas hace más tiempo
+        hasta que el total vuelva a caber en max_total_bytes
+        """
+        session = self.config.get_session()
+        try:
+            entry = session.query(ComparisonCache).filter(ComparisonCache.cache_key == cache_key).first()
+            if entry is None:
+                entry = ComparisonCache(cache_key=cache_key)
+                session.add(entry)
+            entry.result_data = bytes(data)
+            entry.size_bytes = len(data)
+            entry.engine_version = engine_version
+            entry.last_accessed = datetime.utcnow()
+            session.flush()
+            stored_id = entry.id
+
+            # Recorrer de la más reciente a la más antigua y eliminar lo que no cabe
+            total = 0
+            evicted = []
+            rows = session.query(ComparisonCache.id, ComparisonCache.size_bytes).order_by(
+                desc(ComparisonCache.last_accessed)
+            ).all()
+            for entry_id, size in rows:
+                total += size
+                if total > max_total_bytes:
+                    evicted.append(entry_id)
+            if evicted:
+                session.query(ComparisonCache).filter(ComparisonCache.id.in_(evicted)).delete(synchronize_session=False)
+
+            session.commit()
+            return stored_id not in evicted
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al guardar en la caché de resultados: {e}")
+            return False
+        finally:
+            session.close()
+
+    def get_result_cache_statistics(self) -> Dict[str, Any]:
+        """Número de entradas, bytes ocupados y aciertos acumulados de la caché persistente"""
+        session = self.config.get_session()
+        try:
+            entries, size, hits = session.query(
+                func.count(ComparisonCache.id),
+                func.coalesce(func.sum(ComparisonCache.size_bytes), 0),
+                func.coalesce(func.sum(ComparisonCache.hit_count), 0)
+            ).one()
+            return {'entries': int(entries), 'size_bytes': int(size), 'hits': int(hits)}
+        finally:
+            session.close()
+
+    def clear_result_cache(self) -> int:
+        """Vacía la caché persistente de resultados y retorna las entradas eliminadas"""
+        session = self.config.get_session()
+        try:
+            deleted = session.query(ComparisonCache).delete()
+            session.commit()
+            return deleted
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error al vaciar la caché de resultados: {e}")
+            raise
+        finally:
+            session.close()
+
     # Métodos para logs de actividad
     def log_activity(self, session: Session, action: str, details: str = None, 
                     file_name: str = None, success: bool = True, error_message: str = None):
@@ -479,6 +877,10 @@ class DatabaseManager:
             # Limpiar comparaciones muy antiguas si hay demasiadas
             total_comparisons = session.query(Comparison).count()
             if total_comparisons > 1000:
+                old_ids = select(Comparison.id).where(Comparison.comparison_date < cutoff_date)
+                session.query(ComparisonChange).filter(
+                    ComparisonChange.comparison_id.in_(old_ids)
+                ).delete(synchronize_session=False)
                 old_comparisons = session.query(Comparison).filter(
                     Comparison.comparison_date < cutoff_date
                 ).delete()
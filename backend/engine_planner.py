@@ -0,0 +1,118 @@
+import io
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class EnginePlanner:
+    """
+    Elige el motor de comparación antes de leer los archivos
+    Estima la memoria pico de cada motor a partir del tamaño, las filas, las columnas y el ancho
+    de fila de una muestra (FileInspector), y elige el más rápido que cabe en el presupuesto
+    """
+
+    # Motores en orden de preferencia: el primero que cabe en el presupuesto es el más rápido
+    ENGINES = ['memory', 'chunked']
+
+    # Bytes de cada celda convertida a texto además de sus caracteres (objeto str de Python y su puntero)
+    CELL_OVERHEAD = 57
+
+    # Copias del DataFrame de texto en el pico de memoria (medido con tracemalloc: la lectura
+    # original se libera al convertirla y las matrices de comparación comparten las cadenas)
+    FRAME_COPIES = 1
+
+    # Bytes por celda de las matrices de objetos usadas al comparar celda por celda
+    CELL_MATRIX_BYTES = 8
+
+    # Bytes por fila de los hashes, códigos y conteos usados para las filas únicas (ambos motores)
+    ROW_INDEX_BYTES = 48
+
+    # Memoria por byte de archivo cuando no se puede inspeccionar (como AdmissionController.DEFAULT_EXPANSION)
+    FALLBACK_EXPANSION = 10
+
+    def __init__(self, inspector, comparator, memory_budget: int):
+        self.inspector = inspector
+        self.comparator = comparator
+        self.memory_budget = memory_budget
+
+    def describe(self, content: bytes, filename: str) -> Dict[str, Any]:
+        """Filas, columnas y ancho medio de fila de un archivo, sin construir el DataFrame"""
+        try:
+            inspection = self.inspector.inspect(io.BytesIO(content), filename)
+        except Exception as e:
+            logger.warning(f"No se pudo inspeccionar {filename} para planificar la comparación: {e}")
+            return {'filename': filename, 'size': len(content), 'rows': None, 'columns': None, 'row_width': None}
+
+        rows = inspection['rows']
+        # Sin muestra (archivo sin filas), el ancho se aproxima con los bytes por fila en disco
+        row_width = inspection.get('row_width')
+        if row_width is None:
+            row_width = len(content) / rows if rows else 0.0
+        return {
+            'filename': filename,
+            'size': len(content),
+            'rows': rows,
+            'columns': inspection['columns'],
+            'row_width': round(row_width, 1)
+        }
+
+    def estimate(self, file: Dict[str, Any], rows_in_memory: Optional[int] = None) -> int:
+        """
+        Memoria pico estimada para un archivo si se mantienen rows_in_memory filas a la vez
+        (todas si es None); los hashes de fila se mantienen siempre para el archivo completo
+        """
+        if file['rows'] is None:
+            return int(file['size'] * self.FALLBACK_EXPANSION)
+        rows = file['rows'] if rows_in_memory is None else min(rows_in_memory, file['rows'])
+        cells = rows * file['columns']
+        frame_bytes = cells * self.CELL_OVERHEAD + rows * file['row_width']
+        return int(
+            file['size']
+            + frame_bytes * self.FRAME_COPIES
+            + cells * self.CELL_MATRIX_BYTES
+            + file['rows'] * self.ROW_INDEX_BYTES
+        )
+
+    def plan(self, files: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Elige el motor para comparar los archivos ({'content', 'filename'}) con estas opciones
+        Retorna el motor, el motivo, las estimaciones de cada motor y los datos usados para calcularlas
+        """
+        options = self.comparator.resolve_options(options)
+        described = [self.describe(file['content'], file['filename']) for file in files]
+        filenames = [file['filename'] for file in files]
+        requested = options['engine']
+        if requested == 'chunked':
+            self.comparator.require_chunked(options, *filenames)
+
+        # Sin inspección no se conocen las filas y el motor por bloques no se elige automáticamente
+        chunkable = (self.comparator.supports_chunked(options, *filenames)
+                     and all(file['rows'] is not None for file in described))
+        estimates = {
+            'memory': sum(self.estimate(file) for file in described),
+            'chunked': sum(self.estimate(file, self.comparator.CHUNKED_ENGINE_ROWS) for file in described)
+                       if chunkable else None
+        }
+
+        if requested != 'auto':
+            engine, reason = requested, 'requested'
+        else:
+            candidates = [engine for engine in self.ENGINES if estimates[engine] is not None]
+            fitting = [engine for engine in candidates if estimates[engine] <= self.memory_budget]
+            if fitting:
+                engine = fitting[0]
+                reason = 'within_budget' if engine == self.ENGINES[0] else 'memory_over_budget'
+            else:
+                # Nada cabe: el motor que menos memoria necesita
+                engine = min(candidates, key=lambda name: estimates[name])
+                reason = 'over_budget'
+
+        return {
+            'engine': engine,
+            'reason': reason,
+            'estimated_bytes': estimates[engine] if estimates[engine] is not None else estimates['memory'],
+            'memory_budget': self.memory_budget,
+            'estimates': estimates,
+            'chunk_rows': self.comparator.CHUNKED_ENGINE_ROWS if engine == 'chunked' else None,
+            'files': described
+        }
@@ -0,0 +1,111 @@
+import importlib.util
+import logging
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, List, Any, Callable, Optional, Tuple, Union, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# Motores de lectura de Excel por formato, del más rápido al más lento
+# Se usa el primero instalado; calamine (paquete opcional python-calamine, escrito en Rust)
+# lee las celdas varias veces más rápido que openpyxl y xlrd, que son la alternativa siempre disponible
+EXCEL_ENGINES = {
+    'xlsx': ['calamine', 'openpyxl'],
+    'xls': ['calamine', 'xlrd']
+}
+
+# Módulo que debe estar instalado para poder usar cada motor
+ENGINE_MODULES = {
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+    'xlrd': 'xlrd'
+}
+
+def _convert_cell(value: Any) -> Any:
+    """Valores de calamine con los mismos tipos que dan los lectores de pandas"""
+    if isinstance(value, float) and value.is_integer():
+        # Excel guarda todos los números como reales: 10.0 se lee como 10, igual que con openpyxl
+        return int(value)
+    if isinstance(value, date):
+        return pd.Timestamp(value)
+    if isinstance(value, timedelta):
+        return pd.Timedelta(value)
+    return value
+
+def _read_calamine(source: Union[str, BinaryIO], sheet_name: Union[int, str], usecols) -> pd.DataFrame:
+    """Celdas leídas por calamine; encabezados y tipos se interpretan con el mismo parser que read_excel"""
+    from python_calamine import CalamineWorkbook
+    from pandas.io.parsers import TextParser
+
+    if isinstance(source, str):
+        workbook = CalamineWorkbook.from_path(source)
+    else:
+        workbook = CalamineWorkbook.from_filelike(source)
+    if isinstance(sheet_name, int):
+        sheet = workbook.get_sheet_by_index(sheet_name)
+    else:
+        sheet = workbook.get_sheet_by_name(sheet_name)
+
+    rows = [[_convert_cell(value) for value in row] for row in sheet.to_python(skip_empty_area=False)]
+    if not rows:
+        return pd.DataFrame()
+    return TextParser(rows, header=0, usecols=usecols).read()
+
+def _read_openpyxl(source: Union[str, BinaryIO], sheet_name: Union[int, str], usecols) -> pd.DataFrame:
+    # pandas abre los .xlsx con openpyxl en modo de solo lectura
+    return pd.read_excel(source, sheet_name=sheet_name, usecols=usecols, engine='openpyxl')
+
+def _read_xlrd(source: Union[str, BinaryIO], sheet_name: Union[int, str], usecols) -> pd.DataFrame:
+    return pd.read_excel(source, sheet_name=sheet_name, usecols=usecols, engine='xlrd')
+
+READERS: Dict[str, Callable[..., pd.DataFrame]] = {
+    'calamine': _read_calamine,
+    'openpyxl': _read_openpyxl,
+    'xlrd': _read_xlrd
+}
+
+_installed: Dict[str, bool] = {}
+
+def is_installed(engine: str) -> bool:
+    """Comprueba una sola vez por proceso si el módulo del motor está instalado, sin importarlo"""
+    if engine not in _installed:
+        _installed[engine] = importlib.util.find_spec(ENGINE_MODULES[engine]) is not None
+    return _installed[engine]
+
+def available_engines(extension: str) -> List[str]:
+    """Motores instalados para un formato, en orden de preferencia"""
+    if extension not in EXCEL_ENGINES:
+        raise ValueError(f"Formato de Excel no soportado: {extension}")
+    return [engine for engine in EXCEL_ENGINES[extension] if is_installed(engine)]
+
+def read_excel(source: Union[str, BinaryIO], extension: str, sheet_name: Union[int, str] = 0,
+               usecols=None, engine: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Lee una hoja con el motor indicado o, sin motor, con el más rápido instalado
+    Si un motor rápido no puede leer el archivo se prueba el siguiente; el error del último se propaga
+    Retorna el DataFrame y el motor que lo leyó
+    """
+    if engine is not None:
+        if engine not in EXCEL_ENGINES.get(extension, []):
+            raise ValueError(
+                f"Motor de Excel no válido para {extension}: {engine}. "
+                f"Motores disponibles: {', '.join(EXCEL_ENGINES.get(extension, []))}"
+            )
+        engines = [engine]
+    else:
+        engines = available_engines(extension)
+        if not engines:
+            raise ValueError(
+                f"No hay ningún motor instalado para leer archivos {extension}: "
+                f"{', '.join(ENGINE_MODULES[name] for name in EXCEL_ENGINES[extension])}"
+            )
+
+    for position, name in enumerate(engines):
+        if not isinstance(source, str):
+            source.seek(0)
+        try:
+            return READERS[name](source, sheet_name, usecols), name
+        except Exception as e:
+            if position == len(engines) - 1:
+                raise
+            logger.warning(f"El motor {name} no pudo leer el libro, se usa {engines[position + 1]}: {e}")
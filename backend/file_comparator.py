@@ -1,146 +1,836 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Iterator, Union, BinaryIO
+import codecs
 import io
+import itertools
 from datetime import datetime
 
+import excel_readers
+from normalization import get_pipeline
+from alignment import align_rows, moved_blocks
+from pairing import pair_similar_rows
+from sketches import KMVSketch, hash_values
+from quick_scan import ScanSide, summarize
+from cancellation import CancellationToken, ComparisonCancelled
+from chunked import ChangeLog, DifferenceTally, rechunk
+
 class FileComparator:
     """
     Motor principal para comparar archivos CSV y Excel
     Analiza diferencias estructurales y de contenido entre documentos
     """
     
+    # Versión del motor de comparación: forma parte de la clave de la caché de resultados
+    # Incrementarla cuando cambie el formato o el contenido de los resultados
+    ENGINE_VERSION = '2.0'
+    
+    # Número de filas comparadas por bloque al recorrer el contenido
+    CONTENT_CHUNK_ROWS = 10000
+    
+    # Formatos columnares de Arrow: se leen sin parsear texto y solo con las columnas pedidas
+    COLUMNAR_FORMATS = ['parquet', 'arrow', 'feather', 'ipc']
+    
+    # Modos para detectar filas únicas: por conjunto o contando copias (multiconjunto)
+    ROW_MATCHING_MODES = ['set', 'multiset']
+    
+    # Alineación de filas: por posición o por secuencia (detecta filas movidas e insertadas)
+    ALIGNMENT_MODES = ['position', 'sequence']
+    
+    # Motores de comparación: 'memory' carga ambos archivos completos; 'chunked' los recorre por bloques
+    # alineados con memoria acotada; 'auto' deja la elección al planificador (ver engine_planner.py)
+    ENGINES = ['auto', 'memory', 'chunked']
+    
+    # Formatos que el motor por bloques lee de forma incremental (Excel siempre se carga completo)
+    CHUNKED_FORMATS = ['csv'] + COLUMNAR_FORMATS
+    
+    # Filas de cada archivo que el motor por bloques mantiene en memoria a la vez
+    CHUNKED_ENGINE_ROWS = 50000
+    
+    # Diferencias incluidas en el reporte (el resumen las cuenta todas)
+    REPORTED_DIFFERENCES = 100
+    
+    # Cambios por columna y clave registrados con 'record_changes' (para la tabla comparison_changes);
+    # si hay más, la comparación guardada queda marcada con el registro truncado
+    CHANGE_LOG_LIMIT = 100000
+    
+    # Fracción mínima de columnas iguales para considerar dos filas únicas como una fila modificada
+    PAIRING_MIN_SIMILARITY = 0.5
+    
+    # Similitud mínima (Jaccard estimado de los valores) para tomar una columna nueva como renombrada
+    RENAME_MIN_SIMILARITY = 0.5
+    
+    # Valores distintos (no nulos) mínimos de una columna para tomarla como renombrada: con pocos
+    # valores (indicadores S/N, estados) dos columnas sin relación comparten casi todos
+    RENAME_MIN_DISTINCT = 10
+    
+    # Cociente mínimo entre los valores distintos de las dos columnas (el menor sobre el mayor)
+    RENAME_MIN_DISTINCT_RATIO = 0.8
+    
+    # Tamaño del sketch de valores usado para detectar columnas renombradas
+    RENAME_SKETCH_SIZE = 256
+    
+    # Escaneo rápido: tamaño del sketch de filas, filas muestreadas y filas leídas por bloque
+    QUICK_SCAN_SKETCH_SIZE = 4096
+    QUICK_SCAN_SAMPLE_ROWS = 2000
+    QUICK_SCAN_CHUNK_ROWS = 100000
+    
+    # Opciones de comparación aceptadas y sus valores por defecto
+    DEFAULT_OPTIONS = {
+        'columns': None,  # Limitar la comparación a estas columnas
+        'ignore_columns': None,  # Columnas que no se leen ni se comparan
+        'tolerances': None,  # Tolerancia por columna: número (valores numéricos) o duración ('5min', '1h')
+        'row_matching': 'set',  # 'set': filas únicas por contenido; 'multiset': también copias sobrantes
+        'alignment': 'position',  # 'position': fila i contra fila i; 'sequence': alineación por hashes de fila
+        'fuzzy_pairing': False,  # Emparejar filas únicas parecidas como filas modificadas
+        'detect_renames': True,  # Emparejar columnas faltantes y agregadas con valores parecidos
+        'normalization': None,  # Perfil con nombre o reglas por columna (ver normalization.py)
+        'engine': 'auto',  # 'memory', 'chunked' o 'auto' (elegido según la memoria estimada)
+        'record_changes': False,  # Registrar en el historial los cambios por columna y clave de fila al guardar
+        'row_key': None  # Columna que identifica cada fila en los cambios (por defecto, la primera común)
+    }
+    
     def __init__(self):
-        self.supported_formats = ['.csv', '.xlsx', '.xls']
+        self.supported_formats = ['.csv', '.xlsx', '.xls'] + [f'.{ext}' for ext in self.COLUMNAR_FORMATS]
     
-    def read_file(self, file_content: bytes, filename: str) -> pd.DataFrame:
+    def resolve_options(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Combina las opciones recibidas con los valores por defecto
+        Rechaza opciones desconocidas para no ignorar errores de escritura en silencio
+        """
+        resolved = dict(self.DEFAULT_OPTIONS)
+        for key, value in (options or {}).items():
+            if key not in self.DEFAULT_OPTIONS:
+                raise ValueError(f"Opción de comparación desconocida: {key}")
+            resolved[key] = value
+        
+        for key in ('columns', 'ignore_columns'):
+            if resolved[key] is not None:
+                if isinstance(resolved[key], str):
+                    resolved[key] = resolved[key].split(',')
+                resolved[key] = [str(col).strip() for col in resolved[key] if str(col).strip()] or None
+        
+        if resolved['row_matching'] not in self.ROW_MATCHING_MODES:
+            raise ValueError(
+                f"Modo de emparejamiento de filas no válido: {resolved['row_matching']}. "
+                f"Modos disponibles: {', '.join(self.ROW_MATCHING_MODES)}"
+            )
+        
+        if resolved['alignment'] not in self.ALIGNMENT_MODES:
+            raise ValueError(
+                f"Modo de alineación no válido: {resolved['alignment']}. "
+                f"Modos disponibles: {', '.join(self.ALIGNMENT_MODES)}"
+            )
+        
+        if resolved['engine'] not in self.ENGINES:
+            raise ValueError(
+                f"Motor de comparación no válido: {resolved['engine']}. "
+                f"Motores disponibles: {', '.join(self.ENGINES)}"
+            )
+        
+        if not isinstance(resolved['record_changes'], bool):
+            raise ValueError("La opción 'record_changes' debe ser true o false")
+        if resolved['row_key'] is not None:
+            resolved['row_key'] = str(resolved['row_key']).strip() or None
+        
+        if resolved['tolerances'] is not None:
+            if not isinstance(resolved['tolerances'], dict):
+                raise ValueError("La opción 'tolerances' debe ser un objeto {columna: tolerancia}")
+            resolved['tolerances'] = {str(col).strip(): value for col, value in resolved['tolerances'].items()} or None
+            self._parse_tolerances(resolved['tolerances'])
+        
+        # Compilar ahora para rechazar perfiles o reglas desconocidas antes de leer los archivos
+        get_pipeline(resolved['normalization'])
+        
+        return resolved
+    
+    def read_file(self, file_content: bytes, filename: str,
+                  columns: Optional[List[str]] = None,
+                  ignore_columns: Optional[List[str]] = None,
+                  sheet_name: Union[int, str] = 0) -> pd.DataFrame:
         """
         Procesa y carga un archivo en memoria, manejando diferentes codificaciones
+        Si se indican columnas, solo se cargan esas (comparando nombres sin espacios)
+        Las columnas ignoradas no se llegan a cargar
+        En Excel se lee la hoja sheet_name (nombre o posición; por defecto la primera)
         """
         file_extension = filename.lower().split('.')[-1]
+        usecols = self._column_selector(columns, ignore_columns)
         
         try:
             if file_extension == 'csv':
                 # Probar diferentes codificaciones para archivos CSV
                 for encoding in ['utf-8', 'latin-1', 'cp1252']:
                     try:
-                        df = pd.read_csv(io.BytesIO(file_content), encoding=encoding)
+                        df = pd.read_csv(io.BytesIO(file_content), encoding=encoding, usecols=usecols)
                         return df
                     except UnicodeDecodeError:
                         continue
                 raise ValueError("No se pudo decodificar el archivo CSV")
                 
             elif file_extension in ['xlsx', 'xls']:
-                df = pd.read_excel(io.BytesIO(file_content))
-                return df
+                return self._read_excel(io.BytesIO(file_content), file_extension, sheet_name, usecols)
+            
+            elif file_extension in self.COLUMNAR_FORMATS:
+                pa = self._import_pyarrow()
+                return self._read_arrow_source(pa.BufferReader(file_content), file_extension, columns, ignore_columns)
             else:
                 raise ValueError(f"Formato de archivo no soportado: {file_extension}")
                 
         except Exception as e:
             raise ValueError(f"Error al leer el archivo {filename}: {str(e)}")
     
-    def _extract_different_content(self, df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, Any]:
+    def read_path(self, file_path: str, columns: Optional[List[str]] = None,
+                  ignore_columns: Optional[List[str]] = None,
+                  sheet_name: Union[int, str] = 0) -> pd.DataFrame:
+        """
+        Carga un archivo desde el disco
+        Los archivos Parquet y Arrow se mapean en memoria en lugar de copiarse completos,
+        y los libros de Excel se abren desde la ruta sin copiar el archivo a memoria
+        """
+        file_extension = file_path.lower().split('.')[-1]
+        
+        if file_extension in ['xlsx', 'xls']:
+            try:
+                return self._read_excel(file_path, file_extension, sheet_name,
+                                        self._column_selector(columns, ignore_columns))
+            except Exception as e:
+                raise ValueError(f"Error al leer el archivo {file_path}: {str(e)}")
+        
+        if file_extension in self.COLUMNAR_FORMATS:
+            try:
+                pa = self._import_pyarrow()
+                with pa.memory_map(file_path, 'r') as source:
+                    return self._read_arrow_source(source, file_extension, columns, ignore_columns)
+            except Exception as e:
+                raise ValueError(f"Error al leer el archivo {file_path}: {str(e)}")
+        
+        with open(file_path, 'rb') as f:
+            return self.read_file(f.read(), file_path, columns, ignore_columns)
+    
+    def _read_excel(self, source: Union[str, BinaryIO], file_extension: str,
+                    sheet_name: Union[int, str], usecols) -> pd.DataFrame:
+        """
+        Una hoja de un libro de Excel, leída con el motor más rápido instalado (ver excel_readers.py)
+        El motor queda en df.attrs['excel_engine'] y compare_dataframes lo incluye en los metadatos
+        """
+        df, engine = excel_readers.read_excel(source, file_extension, sheet_name, usecols)
+        df.attrs['excel_engine'] = engine
+        return df
+    
+    def iter_chunks(self, source: Union[bytes, BinaryIO], filename: str, chunk_rows: int,
+                    columns: Optional[List[str]] = None,
+                    ignore_columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Lee un archivo por bloques de filas sin cargarlo completo
+        CSV, Parquet y Arrow se leen de forma incremental; Excel se carga y se divide en bloques
+        """
+        file_extension = filename.lower().split('.')[-1]
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        usecols = self._column_selector(columns, ignore_columns)
+        
+        try:
+            if file_extension == 'csv':
+                encoding = self._detect_encoding(source)
+                yield from pd.read_csv(source, encoding=encoding, usecols=usecols, chunksize=chunk_rows)
+            
+            elif file_extension in ['xlsx', 'xls']:
+                df = self._read_excel(source, file_extension, 0, usecols)
+                for start in range(0, max(len(df), 1), chunk_rows):
+                    yield df.iloc[start:start + chunk_rows]
+            
+            elif file_extension == 'parquet':
+                import pyarrow.parquet as pq
+                self._import_pyarrow()
+                parquet_file = pq.ParquetFile(source)
+                names = self._project_columns(parquet_file.schema_arrow.names, columns, ignore_columns)
+                for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=names):
+                    yield batch.to_pandas()
+            
+            elif file_extension in self.COLUMNAR_FORMATS:
+                pa = self._import_pyarrow()
+                try:
+                    reader = pa.ipc.open_file(source)
+                    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                    schema = reader.schema
+                except pa.ArrowInvalid:
+                    source.seek(0)
+                    reader = pa.ipc.open_stream(source)
+                    batches = iter(reader)
+                    schema = reader.schema
+                names = self._project_columns(schema.names, columns, ignore_columns)
+                for batch in batches:
+                    if names is not None:
+                        batch = batch.select(names)
+                    yield batch.to_pandas()
+            else:
+                raise ValueError(f"Formato de archivo no soportado: {file_extension}")
+        
+        except Exception as e:
+            raise ValueError(f"Error al leer el archivo {filename}: {str(e)}")
+    
+    def _detect_encoding(self, source: BinaryIO) -> str:
+        """Elige la codificación del CSV a partir del primer MB, sin leer todo el archivo"""
+        prefix = source.read(1024 * 1024)
+        source.seek(0)
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("No se pudo decodificar el archivo CSV")
+    
+    def _read_arrow_source(self, source, file_extension: str, columns: Optional[List[str]],
+                           ignore_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Lee una fuente Arrow (buffer o archivo mapeado) proyectando solo las columnas pedidas"""
+        pa = self._import_pyarrow()
+        
+        if file_extension == 'parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(source)
+            names = self._project_columns(parquet_file.schema_arrow.names, columns, ignore_columns)
+            table = parquet_file.read(columns=names)
+        else:
+            try:
+                reader = pa.ipc.open_file(source)
+            except pa.ArrowInvalid:
+                # Formato de flujo IPC (sin pie de archivo)
+                source.seek(0)
+                reader = pa.ipc.open_stream(source)
+            names = self._project_columns(reader.schema.names, columns, ignore_columns)
+            table = reader.read_all()
+            if names is not None:
+                table = table.select(names)
+        
+        return table.to_pandas()
+    
+    def _column_selector(self, columns: Optional[List[str]], ignore_columns: Optional[List[str]] = None):
+        """Selector de columnas para pandas que ignora los espacios en los encabezados"""
+        if not columns and not ignore_columns:
+            return None
+        wanted = {str(col).strip() for col in columns} if columns else None
+        ignored = {str(col).strip() for col in ignore_columns or []}
+        return lambda col: (wanted is None or str(col).strip() in wanted) and str(col).strip() not in ignored
+    
+    def _project_columns(self, names: List[str], columns: Optional[List[str]],
+                         ignore_columns: Optional[List[str]] = None) -> Optional[List[str]]:
+        selector = self._column_selector(columns, ignore_columns)
+        if selector is None:
+            return None
+        return [name for name in names if selector(name)]
+    
+    def _parse_tolerances(self, tolerances: Optional[Dict[str, Any]]) -> Dict[str, Tuple[str, float]]:
+        """
+        Convierte las tolerancias de las opciones en (tipo, valor)
+        Un número es una tolerancia numérica; un texto como '90s' o '5min' es una duración en segundos
+        """
+        parsed = {}
+        for col, value in (tolerances or {}).items():
+            if isinstance(value, bool):
+                raise ValueError(f"Tolerancia no válida para la columna '{col}': {value}")
+            if isinstance(value, (int, float)):
+                kind, amount = 'numeric', float(value)
+            else:
+                try:
+                    kind, amount = 'numeric', float(value)
+                except (TypeError, ValueError):
+                    try:
+                        kind, amount = 'time', pd.Timedelta(str(value)).total_seconds()
+                    except ValueError:
+                        raise ValueError(f"Tolerancia no válida para la columna '{col}': {value}")
+            if not amount > 0:
+                raise ValueError(f"La tolerancia de la columna '{col}' debe ser mayor que cero")
+            parsed[col] = (kind, amount)
+        return parsed
+    
+    def _tolerance_values(self, values: pd.Series, kind: str) -> np.ndarray:
+        """Valores numéricos (o segundos, para fechas) de una columna; NaN si no se pueden interpretar"""
+        if kind == 'time':
+            # En UTC para poder restar fechas con y sin zona horaria
+            parsed = pd.to_datetime(values, errors='coerce', format='mixed', utc=True)
+            # Segundos desde el origen, independientemente de la resolución del tipo datetime
+            return (parsed - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy(dtype=float)
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    
+    def _row_hashes(self, df: pd.DataFrame, columns: List[str],
+                    tolerances: Dict[str, Tuple[str, float]]) -> np.ndarray:
+        """
+        Hash de 64 bits por fila sobre las columnas indicadas, calculado de forma vectorizada
+        En las columnas con tolerancia se usa el valor redondeado a múltiplos de la tolerancia
+        """
+        # Referencia preprocesada: se reutiliza el índice de hashes si cubre exactamente estas columnas
+        index = df.attrs.get('row_hash_index')
+        if index is not None and index.matches(df, columns) and not any(col in tolerances for col in columns):
+            return index.hashes
+        frame = self._hashable_frame(df[columns], tolerances)
+        return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+    
+    def _column_hashes(self, df: pd.DataFrame, columns: List[str],
+                       tolerances: Dict[str, Tuple[str, float]]) -> np.ndarray:
+        """Matriz (filas, columnas) con el hash de 64 bits de cada celda"""
+        frame = self._hashable_frame(df[columns], tolerances)
+        hashes = np.empty((len(frame), len(columns)), dtype=np.uint64)
+        for position, col in enumerate(columns):
+            hashes[:, position] = pd.util.hash_pandas_object(frame[col], index=False).to_numpy(dtype=np.uint64)
+        return hashes
+    
+    def _hashable_frame(self, frame: pd.DataFrame, tolerances: Dict[str, Tuple[str, float]]) -> pd.DataFrame:
+        """En las columnas con tolerancia sustituye cada valor por su múltiplo de la tolerancia"""
+        tolerant = [col for col in frame.columns if col in tolerances]
+        if tolerant:
+            frame = frame.copy(deep=False)
+            for col in tolerant:
+                kind, amount = tolerances[col]
+                buckets = np.round(self._tolerance_values(frame[col], kind) / amount)
+                # Los valores no interpretables conservan su texto original
+                frame[col] = np.where(np.isnan(buckets), frame[col].to_numpy(dtype=object), buckets.astype(str))
+        return frame
+    
+    def _tolerance_keys(self, df: pd.DataFrame, common_cols: List[str],
+                        tolerances: Dict[str, Tuple[str, float]]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Datos para emparejar filas dentro de la tolerancia (ver _match_within_tolerance), por fila:
+        hash de las columnas sin tolerancia, valores de las columnas con tolerancia y hash de su texto
+        Retorna None si ninguna columna común tiene tolerancia
+        """
+        tolerant = [col for col in common_cols if col in tolerances]
+        if not tolerant:
+            return None
+        exact = [col for col in common_cols if col not in tolerances]
+        if exact:
+            keys = pd.util.hash_pandas_object(df[exact], index=False).to_numpy(dtype=np.uint64)
+        else:
+            keys = np.zeros(len(df), dtype=np.uint64)
+        return {
+            'keys': keys,
+            'numbers': np.column_stack([self._tolerance_values(df[col], tolerances[col][0]) for col in tolerant]),
+            'texts': np.column_stack([
+                pd.util.hash_pandas_object(df[col], index=False).to_numpy(dtype=np.uint64) for col in tolerant
+            ]),
+            'amounts': np.array([tolerances[col][1] for col in tolerant])
+        }
+    
+    def _match_within_tolerance(self, rows1: np.ndarray, rows2: np.ndarray, keys1: Dict[str, np.ndarray],
+                                keys2: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retira de las filas únicas los pares que solo difieren dentro de la tolerancia
+        Los hashes de fila usan el valor redondeado a múltiplos de la tolerancia: dos valores cercanos
+        a ambos lados del límite de un múltiplo (1.04 y 1.06 con 0.1) caen en múltiplos distintos
+        Aquí las filas con las mismas columnas exactas se emparejan comparando |a - b| <= tolerancia,
+        buscando en el bloque (múltiplo inferior de la primera columna con tolerancia) y en sus vecinos
+        keys1[k] y keys2[k] (de _tolerance_keys) corresponden a rows1[k] y rows2[k]
+        """
+        if not len(rows1) or not len(rows2):
+            return rows1, rows2
+        amounts = keys1['amounts']
+        blocks1, blocks2 = self._tolerance_blocks(keys1, amounts), self._tolerance_blocks(keys2, amounts)
+        numeric1 = blocks1['numeric'].to_numpy()
+        alive1 = np.ones(len(rows1), dtype=bool)
+        alive2 = np.ones(len(rows2), dtype=bool)
+        
+        def close(left: np.ndarray, right) -> np.ndarray:
+            # Igual que en la comparación de celdas: mismo texto o dentro de la tolerancia (NaN nunca lo está)
+            return ((np.abs(keys1['numbers'][left] - keys2['numbers'][right]) <= amounts)
+                    | (keys1['texts'][left] == keys2['texts'][right])).all(axis=1)
+        
+        # Pasada vectorizada: la k-ésima fila de un bloque con la k-ésima del mismo bloque o del vecino
+        columns = ['key', 'numeric', 'bucket']
+        for offset in (0, -1, 1):
+            left = blocks1[alive1 & (numeric1 | (offset == 0))]
+            right = blocks2[alive2]
+            if left.empty or right.empty:
+                break
+            if offset:
+                left = left.assign(bucket=left['bucket'] + offset)
+            pairs = left.assign(rank=left.groupby(columns).cumcount()).merge(
+                right.assign(rank=right.groupby(columns).cumcount()), on=columns + ['rank'], suffixes=('1', '2')
+            )
+            matched = close(pairs['row1'].to_numpy(), pairs['row2'].to_numpy())
+            alive1[pairs['row1'].to_numpy()[matched]] = False
+            alive2[pairs['row2'].to_numpy()[matched]] = False
+        
+        # Las restantes que tienen candidatas, una a una contra todas las de su bloque y de los vecinos
+        left, right = blocks1[alive1], blocks2[alive2]
+        if not left.empty and not right.empty:
+            probed = pd.MultiIndex.from_frame(right[columns])
+            reachable = np.zeros(len(left), dtype=bool)
+            for offset in (0, -1, 1):
+                reachable |= pd.MultiIndex.from_arrays([
+                    left['key'], left['numeric'], left['bucket'] + np.where(left['numeric'], offset, 0)
+                ]).isin(probed)
+            left = left[reachable]
+        if not left.empty and not right.empty:
+            # Solo las filas de la derecha alcanzables desde alguna de la izquierda entran en el índice
+            wanted = pd.MultiIndex.from_arrays([
+                np.tile(left['key'], 3), np.tile(left['numeric'], 3),
+                np.concatenate([left['bucket'] + np.where(left['numeric'], offset, 0) for offset in (0, -1, 1)])
+            ])
+            right = right[pd.MultiIndex.from_frame(right[columns]).isin(wanted)]
+            candidates: Dict[Tuple, List[int]] = {}
+            for row in right.itertuples(index=False):
+                candidates.setdefault((row.key, row.numeric, row.bucket), []).append(row.row)
+            for row in left.itertuples(index=False):
+                offsets = (0, -1, 1) if row.numeric else (0,)
+                for offset in offsets:
+                    positions = candidates.get((row.key, row.numeric, row.bucket + offset))
+                    if not positions:
+                        continue
+                    found = close(row.row, positions)
+                    if found.any():
+                        alive1[row.row] = False
+                        alive2[positions.pop(int(np.argmax(found)))] = False
+                        break
+        
+        return rows1[alive1], rows2[alive2]
+    
+    def _tolerance_blocks(self, keys: Dict[str, np.ndarray], amounts: np.ndarray) -> pd.DataFrame:
+        """Bloque de cada fila: columnas exactas y múltiplo inferior de la primera columna con tolerancia"""
+        first = keys['numbers'][:, 0]
+        numeric = ~np.isnan(first)
+        with np.errstate(invalid='ignore', over='ignore'):
+            buckets = np.floor(np.where(numeric, first, 0) / amounts[0]).astype(np.int64)
+        return pd.DataFrame({
+            'key': keys['keys'],
+            'numeric': numeric,
+            # Un valor no numérico solo se empareja con el mismo texto
+            'bucket': np.where(numeric, buckets, keys['texts'][:, 0].view(np.int64)),
+            'row': np.arange(len(first))
+        })
+    
+    def _import_pyarrow(self):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            return pyarrow
+        except ImportError:
+            raise ValueError("El soporte de archivos Parquet/Arrow requiere el paquete 'pyarrow'")
+    
+    def _extract_different_content(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                                   options: Optional[Dict[str, Any]] = None,
+                                   cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """
         Identifica y extrae el contenido que hace únicos a cada documento
-        Encuentra registros que solo existen en uno de los archivos
+        Encuentra registros que solo existen en uno de los archivos comparando hashes de fila
+        En modo 'multiset' también cuenta como únicas las copias sobrantes de una fila repetida
         """
-        # Normalizar datos como strings para comparación consistente
-        df1_str = df1.astype(str)
-        df2_str = df2.astype(str)
+        options = options or {}
+        tolerances = self._parse_tolerances(options.get('tolerances'))
+        multiset = options.get('row_matching') == 'multiset'
         
-        # Buscar columnas que comparten ambos archivos
-        common_cols = list(set(df1.columns) & set(df2.columns))
+        # Buscar columnas que comparten ambos archivos, en el orden del archivo de referencia
+        common_cols = [col for col in df1.columns if col in set(df2.columns)]
         
         # Preparar listas para almacenar elementos únicos
         unique_in_reference = []
         unique_in_compare = []
+        modified_rows = []
+        total_modified_rows = 0
+        total_unique_in_reference = 0
+        total_unique_in_compare = 0
+        duplicates_in_reference = 0
+        duplicates_in_compare = 0
         
         if common_cols:
-            # Generar claves únicas basadas en las columnas compartidas
-            df1_key = df1_str[common_cols].apply(lambda x: '|'.join(x), axis=1)
-            df2_key = df2_str[common_cols].apply(lambda x: '|'.join(x), axis=1)
+            # Generar un hash por fila basado en las columnas compartidas
+            self._phase(cancel, 'unique_rows', len(df1) + len(df2))
+            df1_hashes = self._row_hashes(df1, common_cols, tolerances)
+            self._advance(cancel, len(df1))
+            df2_hashes = self._row_hashes(df2, common_cols, tolerances)
+            self._advance(cancel, len(df2))
+            self._check(cancel)
             
-            # Encontrar registros que solo existen en cada archivo
-            df1_unique_keys = set(df1_key) - set(df2_key)
-            df2_unique_keys = set(df2_key) - set(df1_key)
+            uniqueness = self._row_uniqueness(df1_hashes, df2_hashes, multiset)
+            df1_unique_rows, df2_unique_rows = uniqueness['rows1'], uniqueness['rows2']
+            if any(col in tolerances for col in common_cols) and len(df1_unique_rows) and len(df2_unique_rows):
+                df1_unique_rows, df2_unique_rows = self._match_within_tolerance(
+                    df1_unique_rows, df2_unique_rows,
+                    self._tolerance_keys(df1.iloc[df1_unique_rows], common_cols, tolerances),
+                    self._tolerance_keys(df2.iloc[df2_unique_rows], common_cols, tolerances)
+                )
+            duplicates_in_reference = uniqueness['duplicates_in_reference']
+            duplicates_in_compare = uniqueness['duplicates_in_compare']
             
-            # Extraer los datos completos de los registros únicos
-            for key in df1_unique_keys:
-                row_idx = df1_key[df1_key == key].index[0]
-                unique_in_reference.append({
-                    'row_index': int(row_idx),
-                    'data': df1.iloc[row_idx].to_dict(),
-                    'key_columns': common_cols
-                })
+            if options.get('fuzzy_pairing'):
+                self._check(cancel)
+                self._phase(cancel, 'pairing')
+                paired1, paired2, similarity = self._pair_unique_rows(
+                    df1, df2, df1_unique_rows, df2_unique_rows, common_cols, tolerances
+                )
+                df1_unique_rows = np.setdiff1d(df1_unique_rows, paired1, assume_unique=True)
+                df2_unique_rows = np.setdiff1d(df2_unique_rows, paired2, assume_unique=True)
+                total_modified_rows = len(paired1)
+                # Extraer los cambios solo de las filas que se van a mostrar
+                modified_rows = self._modified_rows(
+                    df1, df2, paired1[:50], paired2[:50], similarity[:50], common_cols, tolerances
+                )
             
-            for key in df2_unique_keys:
-                row_idx = df2_key[df2_key == key].index[0]
-                unique_in_compare.append({
-                    'row_index': int(row_idx),
-                    'data': df2.iloc[row_idx].to_dict(),
-                    'key_columns': common_cols
-                })
+            total_unique_in_reference = len(df1_unique_rows)
+            total_unique_in_compare = len(df2_unique_rows)
+            
+            # Extraer los datos completos solo de los registros que se van a mostrar
+            unique_in_reference = self._unique_row_entries(
+                df1_unique_rows[:50], [df1.iloc[i].to_dict() for i in df1_unique_rows[:50]],
+                uniqueness['codes1'], uniqueness, common_cols, multiset
+            )
+            unique_in_compare = self._unique_row_entries(
+                df2_unique_rows[:50], [df2.iloc[i].to_dict() for i in df2_unique_rows[:50]],
+                uniqueness['codes2'], uniqueness, common_cols, multiset
+            )
         
         # Identificar columnas que solo existen en cada archivo
         cols_only_in_reference = list(set(df1.columns) - set(df2.columns))
         cols_only_in_compare = list(set(df2.columns) - set(df1.columns))
         
         return {
-            'unique_in_reference': unique_in_reference[:50],  # Limitar para evitar sobrecarga en el frontend
-            'unique_in_compare': unique_in_compare[:50],      # Limitar para evitar sobrecarga en el frontend
+            'unique_in_reference': unique_in_reference,  # Limitado a 50 para evitar sobrecarga en el frontend
+            'unique_in_compare': unique_in_compare,      # Limitado a 50 para evitar sobrecarga en el frontend
             'columns_only_in_reference': cols_only_in_reference,
             'columns_only_in_compare': cols_only_in_compare,
-            'total_unique_in_reference': len(unique_in_reference),
-            'total_unique_in_compare': len(unique_in_compare)
+            'total_unique_in_reference': total_unique_in_reference,
+            'total_unique_in_compare': total_unique_in_compare,
+            'modified_rows': modified_rows,  # Limitado a 50 para evitar sobrecarga en el frontend
+            'total_modified_rows': total_modified_rows,
+            'duplicates_in_reference': duplicates_in_reference,  # Filas repetidas dentro del mismo archivo
+            'duplicates_in_compare': duplicates_in_compare,
+            'row_matching': 'multiset' if multiset else 'set'
         }
     
+    def _row_uniqueness(self, hashes1: np.ndarray, hashes2: np.ndarray, multiset: bool) -> Dict[str, Any]:
+        """
+        Posiciones de las filas únicas de cada archivo a partir de sus hashes de fila
+        Retorna también los códigos y conteos de cada fila, usados en el modo 'multiset'
+        """
+        # Número de apariciones de cada fila en ambos archivos y orden de cada copia
+        codes1, codes2, counts1, counts2 = self._row_occurrences(hashes1, hashes2)
+        copy1 = pd.Series(codes1).groupby(codes1).cumcount().to_numpy()
+        copy2 = pd.Series(codes2).groupby(codes2).cumcount().to_numpy()
+        
+        if multiset:
+            # Las copias que superan el número de apariciones en el otro archivo
+            rows1 = np.flatnonzero(copy1 >= counts2[codes1])
+            rows2 = np.flatnonzero(copy2 >= counts1[codes2])
+        else:
+            # Primera aparición de las filas que no existen en el otro archivo
+            rows1 = np.flatnonzero((counts2[codes1] == 0) & (copy1 == 0))
+            rows2 = np.flatnonzero((counts1[codes2] == 0) & (copy2 == 0))
+        
+        return {
+            'rows1': rows1,
+            'rows2': rows2,
+            'codes1': codes1,
+            'codes2': codes2,
+            'counts1': counts1,
+            'counts2': counts2,
+            'duplicates_in_reference': int(np.count_nonzero(copy1)),
+            'duplicates_in_compare': int(np.count_nonzero(copy2))
+        }
+    
+    def _unique_row_entries(self, rows: np.ndarray, data: List[Dict[str, Any]], codes: np.ndarray,
+                            uniqueness: Dict[str, Any], common_cols: List[str],
+                            multiset: bool) -> List[Dict[str, Any]]:
+        """Entradas de las filas únicas que se muestran, con sus datos completos"""
+        entries = []
+        for row_idx, row_data in zip(rows, data):
+            entry = {
+                'row_index': int(row_idx),
+                'data': row_data,
+                'key_columns': common_cols
+            }
+            if multiset:
+                entry['reference_count'] = int(uniqueness['counts1'][codes[row_idx]])
+                entry['compare_count'] = int(uniqueness['counts2'][codes[row_idx]])
+            entries.append(entry)
+        return entries
+    
+    def _pair_unique_rows(self, df1: pd.DataFrame, df2: pd.DataFrame, rows1: np.ndarray, rows2: np.ndarray,
+                          common_cols: List[str], tolerances: Dict[str, Tuple[str, float]]
+                          ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Empareja filas únicas de ambos archivos que parecen el mismo registro modificado
+        Solo se calculan hashes de celda para las filas únicas, no para todo el archivo
+        """
+        if not len(rows1) or not len(rows2):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        
+        left, right, similarity = pair_similar_rows(
+            self._column_hashes(df1.iloc[rows1], common_cols, tolerances),
+            self._column_hashes(df2.iloc[rows2], common_cols, tolerances),
+            self.PAIRING_MIN_SIMILARITY
+        )
+        order = np.argsort(rows1[left], kind='stable')
+        return rows1[left][order], rows2[right][order], similarity[order]
+    
+    def _modified_rows(self, df1: pd.DataFrame, df2: pd.DataFrame, rows1: np.ndarray, rows2: np.ndarray,
+                       similarity: np.ndarray, common_cols: List[str],
+                       tolerances: Dict[str, Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Filas emparejadas con la lista de columnas que cambiaron entre ambas versiones"""
+        # Mismo criterio que la comparación de celdas: distinto valor y fuera de la tolerancia de la columna
+        changed = (df1[common_cols].iloc[rows1].to_numpy(dtype=object)
+                   != df2[common_cols].iloc[rows2].to_numpy(dtype=object))
+        for position, col in enumerate(common_cols):
+            if col in tolerances:
+                kind, amount = tolerances[col]
+                changed[:, position] &= ~(np.abs(
+                    self._tolerance_values(df1[col].iloc[rows1], kind) - self._tolerance_values(df2[col].iloc[rows2], kind)
+                ) <= amount)
+        
+        modified = []
+        for k, (i, j, score) in enumerate(zip(rows1.tolist(), rows2.tolist(), similarity.tolist())):
+            reference = df1.iloc[i]
+            compare = df2.iloc[j]
+            modified.append({
+                'reference_row_index': i,
+                'compare_row_index': j,
+                'similarity': round(score, 3),
+                'changes': [
+                    {'column': col, 'referenceValue': str(reference[col]), 'compareValue': str(compare[col])}
+                    for c, col in enumerate(common_cols) if changed[k, c]
+                ]
+            })
+        return modified
+    
+    def _row_occurrences(self, hashes1: np.ndarray,
+                         hashes2: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Asigna un código común a cada hash de fila y cuenta sus apariciones en cada archivo
+        Usa factorize (tabla hash) y bincount: tiempo lineal, sin ordenar
+        """
+        codes, uniques = pd.factorize(np.concatenate([hashes1, hashes2]))
+        codes1, codes2 = codes[:len(hashes1)], codes[len(hashes1):]
+        counts1 = np.bincount(codes1, minlength=len(uniques))
+        counts2 = np.bincount(codes2, minlength=len(uniques))
+        return codes1, codes2, counts1, counts2
+    
     def compare_dataframes(self, df1: pd.DataFrame, df2: pd.DataFrame, 
-                          ref_filename: str, comp_filename: str) -> Dict[str, Any]:
+                          ref_filename: str, comp_filename: str,
+                          options: Optional[Dict[str, Any]] = None,
+                          cancel: Optional[CancellationToken] = None,
+                          changes: Optional[ChangeLog] = None) -> Dict[str, Any]:
         """
         Ejecuta la comparación completa entre dos DataFrames
         Retorna un reporte detallado con todas las diferencias encontradas
+        Si se cancela (o vence el plazo) durante el análisis del contenido, retorna lo encontrado
+        hasta ese momento marcado como incompleto; antes de eso lanza ComparisonCancelled
+        Con changes (ChangeLog) se registran además todos los cambios por columna y clave de fila
         """
         start_time = datetime.now()
+        options = self.resolve_options(options)
         
-        # Limpiar nombres de columnas para evitar problemas de espacios
-        df1.columns = df1.columns.str.strip()
-        df2.columns = df2.columns.str.strip()
-        
-        # Convertir todo a string para comparación uniforme
-        df1 = df1.astype(str)
-        df2 = df2.astype(str)
-        
-        differences = []
-        
-        # Primero analizar la estructura de los archivos
-        struct_diff = self._compare_structure(df1, df2)
-        differences.extend(struct_diff)
+        # Motor que leyó cada libro de Excel (antes de preparar, que crea DataFrames nuevos)
+        excel_engines = {
+            role: df.attrs['excel_engine'] for role, df in (('reference', df1), ('compare', df2))
+            if 'excel_engine' in df.attrs
+        }
         
-        # Si la estructura es compatible, analizar el contenido
-        if not struct_diff:  # Solo proceder si no hay diferencias estructurales críticas
-            content_diff = self._compare_content(df1, df2)
-            differences.extend(content_diff)
+        self._check(cancel)
+        self._phase(cancel, 'preparing')
+        df1, df2 = self.prepare_dataframes(df1, df2, options)
+        self._check(cancel)
         
-        # Extraer el contenido que diferencia los documentos
-        different_content = self._extract_different_content(df1, df2)
+        # Solo se conservan las diferencias que se reportan; el resto se cuenta
+        self._start_change_log(changes, options, df1.columns, df2.columns)
+        if changes is not None and changes.key_column is not None:
+            changes.use_keys(df1[changes.key_column].to_numpy())
+        tally = DifferenceTally(self.REPORTED_DIFFERENCES, changes)
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.track(tally)
+        different_content = self._empty_different_content(df1, df2, options)
+        incomplete_reason = None
+        try:
+            # Analizar la estructura y, si es compatible, el contenido
+            tally.extend(self.iter_differences(df1, df2, options, cancel))
+            
+            # Extraer el contenido que diferencia los documentos
+            different_content = self._extract_different_content(df1, df2, options, cancel)
+        except ComparisonCancelled as stop:
+            incomplete_reason = stop.reason
         
+        result = self._build_result(
+            (len(df1), len(df1.columns)), (len(df2), len(df2.columns)), tally, different_content,
+            ref_filename, comp_filename, options, start_time, incomplete_reason, 'memory'
+        )
+        if excel_engines:
+            result['metadata']['excelEngines'] = excel_engines
+        return result
+    
+    def _build_result(self, shape1: Tuple[int, int], shape2: Tuple[int, int], tally: DifferenceTally,
+                      different_content: Dict[str, Any], ref_filename: str, comp_filename: str,
+                      options: Dict[str, Any], start_time: datetime, incomplete_reason: Optional[str],
+                      engine: str) -> Dict[str, Any]:
+        """Reporte final de una comparación, común a ambos motores"""
         # Generar estadísticas del análisis
-        summary = self._generate_summary(df1, df2, differences, different_content)
+        summary = self._generate_summary(shape1, shape2, tally, different_content)
         
         # Calcular tiempo total de procesamiento
         processing_time = (datetime.now() - start_time).total_seconds()
         
-        return {
-            "identical": len(differences) == 0,
+        metadata = {
+            "comparisonDate": datetime.now().isoformat(),
+            "referenceFileName": ref_filename,
+            "compareFileName": comp_filename,
+            "processingTime": f"{processing_time:.2f} segundos",
+            "options": options,
+            "engine": engine
+        }
+        if incomplete_reason:
+            metadata["incompleteReason"] = incomplete_reason
+        
+        result = {
+            "identical": tally.total == 0 and incomplete_reason is None,
+            "incomplete": incomplete_reason is not None,
             "summary": summary,
-            "differences": differences[:100],  # Limitar para evitar sobrecarga en el frontend
+            "differences": tally.kept,  # Limitar para evitar sobrecarga en el frontend
             "different_content": different_content,
-            "metadata": {
-                "comparisonDate": datetime.now().isoformat(),
-                "referenceFileName": ref_filename,
-                "compareFileName": comp_filename,
-                "processingTime": f"{processing_time:.2f} segundos"
-            }
+            "metadata": metadata
+        }
+        return result
+    
+    def new_change_log(self) -> ChangeLog:
+        """Registro de cambios vacío para pasar a la comparación y luego a save_comparison"""
+        return ChangeLog(self.CHANGE_LOG_LIMIT)
+    
+    def _start_change_log(self, changes: Optional[ChangeLog], options: Dict[str, Any], columns1, columns2):
+        """Fija la columna clave de las filas en el registro de cambios, si lo hay"""
+        if changes is None:
+            return
+        key_column = options['row_key']
+        if key_column is None:
+            key_column = next((col for col in columns1 if col in set(columns2)), None)
+        elif key_column not in set(columns1):
+            raise ValueError(f"La columna clave '{key_column}' no existe en el archivo de referencia")
+        changes.start(key_column)
+    
+    def _check(self, cancel: Optional[CancellationToken]):
+        if cancel is not None:
+            cancel.check()
+    
+    def _phase(self, cancel: Optional[CancellationToken], phase: str, total: Optional[int] = None):
+        """Informa del cambio de fase al progreso asociado al token, si lo hay"""
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.start_phase(phase, total)
+    
+    def _advance(self, cancel: Optional[CancellationToken], rows: int):
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.advance(rows)
+    
+    def _empty_different_content(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                                 options: Dict[str, Any]) -> Dict[str, Any]:
+        """Contenido diferente vacío, usado cuando la comparación se detiene antes de extraerlo"""
+        return {
+            'unique_in_reference': [],
+            'unique_in_compare': [],
+            'columns_only_in_reference': list(set(df1.columns) - set(df2.columns)),
+            'columns_only_in_compare': list(set(df2.columns) - set(df1.columns)),
+            'total_unique_in_reference': 0,
+            'total_unique_in_compare': 0,
+            'modified_rows': [],
+            'total_modified_rows': 0,
+            'duplicates_in_reference': 0,
+            'duplicates_in_compare': 0,
+            'row_matching': options.get('row_matching', 'set')
         }
     
     def _compare_structure(self, df1: pd.DataFrame, df2: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -150,6 +840,17 @@ class FileComparator:
         """
         differences = []
         
+        # Columnas renombradas detectadas en prepare_dataframes: no impiden comparar el contenido
+        for reference_name, compare_name in df2.attrs.get('renamed_columns', {}).items():
+            differences.append({
+                "type": "column_renamed",
+                "position": "Columna",
+                "column": reference_name,
+                "description": f"Columna '{reference_name}' renombrada a '{compare_name}' en archivo a comparar",
+                "referenceValue": f"Columna '{reference_name}'",
+                "compareValue": f"Columna '{compare_name}'"
+            })
+        
         # Verificar si el número de columnas coincide
         if len(df1.columns) != len(df2.columns):
             differences.append({
@@ -172,6 +873,7 @@ class FileComparator:
             differences.append({
                 "type": "column_missing",
                 "position": f"Columna",
+                "column": col,
                 "description": f"Columna '{col}' falta en archivo a comparar",
                 "referenceValue": f"Columna '{col}' presente",
                 "compareValue": "Columna faltante"
@@ -182,6 +884,7 @@ class FileComparator:
             differences.append({
                 "type": "column_added",
                 "position": f"Columna",
+                "column": col,
                 "description": f"Columna '{col}' agregada en archivo a comparar",
                 "referenceValue": "Columna no presente",
                 "compareValue": f"Columna '{col}' agregada"
@@ -189,116 +892,623 @@ class FileComparator:
         
         return differences
     
-    def _compare_content(self, df1: pd.DataFrame, df2: pd.DataFrame) -> List[Dict[str, Any]]:
+    def prepare_dataframes(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                           options: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Normaliza ambos DataFrames antes de compararlos
+        Limpia los nombres de columnas, convierte todo a string y aplica el perfil de normalización
+        """
+        df1, df2 = self._prepare_frame(df1, options), self._prepare_frame(df2, options)
+        
+        # Comparar las columnas renombradas con su nombre en la referencia
+        if (options or {}).get('detect_renames', True):
+            renames = self._detect_renames(df1, df2)
+            if renames:
+                df2 = df2.rename(columns={compare: reference for reference, compare in renames.items()})
+                df2.attrs['renamed_columns'] = renames
+        
+        return df1, df2
+    
+    def _prepare_frame(self, df: pd.DataFrame, options: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Prepara un DataFrame (o un bloque de filas) de forma independiente del otro archivo"""
+        # Limpiar nombres de columnas para evitar problemas de espacios
+        df.columns = df.columns.str.strip()
+        
+        # Descartar las columnas ignoradas antes de convertirlas (si no se excluyeron al leer)
+        ignored = set((options or {}).get('ignore_columns') or [])
+        if ignored:
+            df = df[[col for col in df.columns if col not in ignored]]
+        
+        # Convertir todo a string para comparación uniforme (la caché de referencias ya está convertida)
+        if df.attrs.get('prepared_by') != self.ENGINE_VERSION:
+            df = df.astype(str)
+        
+        # Normalizar una sola vez por DataFrame, antes de cualquier hash o comparación
+        pipeline = get_pipeline((options or {}).get('normalization'))
+        if pipeline is not None:
+            df = pipeline.apply(df)
+            # Los hashes precalculados corresponden a los valores sin normalizar
+            df.attrs.pop('row_hash_index', None)
+        
+        return df
+    
+    def prepare_reference(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Prepara un archivo de referencia para guardarlo en caché
+        Retorna el DataFrame convertido (sin normalizar) y los hashes de fila de todas sus columnas
+        """
+        df = self._prepare_frame(df)
+        return df, self._row_hashes(df, list(df.columns), {})
+    
+    def _detect_renames(self, df1: pd.DataFrame, df2: pd.DataFrame) -> Dict[str, str]:
+        """
+        Empareja columnas que faltan en el archivo a comparar con columnas nuevas de contenido parecido
+        Cada columna candidata se resume en un sketch KMV de sus valores no nulos; se compara la
+        similitud de Jaccard estimada y se eligen primero los pares más parecidos
+        Retorna {nombre en referencia: nombre en archivo a comparar}
+        """
+        missing = [col for col in df1.columns if col not in set(df2.columns)]
+        added = [col for col in df2.columns if col not in set(df1.columns)]
+        if not missing or not added:
+            return {}
+        
+        sketches1 = {col: KMVSketch(self.RENAME_SKETCH_SIZE).update(hash_values(df1[col].dropna())) for col in missing}
+        sketches2 = {col: KMVSketch(self.RENAME_SKETCH_SIZE).update(hash_values(df2[col].dropna())) for col in added}
+        return self._match_renames(sketches1, sketches2)
+    
+    def _match_renames(self, sketches1: Dict[str, KMVSketch], sketches2: Dict[str, KMVSketch]) -> Dict[str, str]:
+        """
+        Elige los pares de columnas más parecidos según los sketches de sus valores
+        Solo son candidatas las columnas con al menos RENAME_MIN_DISTINCT valores distintos (las
+        vacías no lo son) y los pares con un número de valores distintos parecido
+        """
+        distinct1, distinct2 = (
+            {col: sketch.estimate() for col, sketch in sketches.items() if sketch.estimate() >= self.RENAME_MIN_DISTINCT}
+            for sketches in (sketches1, sketches2)
+        )
+        scores = sorted(
+            (
+                (sketches1[ref].jaccard(sketches2[comp]), ref, comp)
+                for ref in distinct1 for comp in distinct2
+                if min(distinct1[ref], distinct2[comp]) >= self.RENAME_MIN_DISTINCT_RATIO * max(distinct1[ref], distinct2[comp])
+            ),
+            key=lambda score: -score[0]
+        )
+        
+        renames = {}
+        for similarity, ref, comp in scores:
+            if similarity < self.RENAME_MIN_SIMILARITY:
+                break
+            if ref not in renames and comp not in renames.values():
+                renames[ref] = comp
+        return renames
+    
+    def iter_differences(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                         options: Optional[Dict[str, Any]] = None,
+                         cancel: Optional[CancellationToken] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Genera todas las diferencias una por una, sin acumularlas en memoria
+        Espera DataFrames ya preparados con prepare_dataframes
+        """
+        struct_diff = self._compare_structure(df1, df2)
+        yield from struct_diff
+        
+        # Solo analizar el contenido si no hay diferencias estructurales críticas
+        if all(d["type"] == "column_renamed" for d in struct_diff):
+            yield from self._iter_content_differences(df1, df2, options, cancel)
+    
+    def _compare_content(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                         options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Compara el contenido celda por celda entre los archivos
         Identifica valores modificados, filas agregadas o eliminadas
         """
-        differences = []
+        return list(self._iter_content_differences(df1, df2, options))
+    
+    def _iter_content_differences(self, df1: pd.DataFrame, df2: pd.DataFrame,
+                                  options: Optional[Dict[str, Any]] = None,
+                                  cancel: Optional[CancellationToken] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre el contenido por bloques de filas y genera cada diferencia encontrada
+        Las celdas se comparan de forma vectorizada dentro de cada bloque
+        """
+        options = options or {}
+        tolerances = self._parse_tolerances(options.get('tolerances'))
         
-        # Obtener columnas que existen en ambos archivos
-        common_cols = list(set(df1.columns) & set(df2.columns))
+        # Obtener columnas que existen en ambos archivos, en el orden del archivo de referencia
+        common_cols = [col for col in df1.columns if col in set(df2.columns)]
         
-        # Determinar rangos de comparación
-        max_rows = max(len(df1), len(df2))
-        min_rows = min(len(df1), len(df2))
+        if options.get('alignment') == 'sequence' and common_cols:
+            self._phase(cancel, 'aligning')
+            yield from self._iter_aligned_differences(df1, df2, common_cols, tolerances, cancel)
+            return
         
-        # Comparar cada celda en las filas comunes
-        for i in range(min_rows):
-            for col in common_cols:
-                val1 = df1.iloc[i][col] if i < len(df1) else "N/A"
-                val2 = df2.iloc[i][col] if i < len(df2) else "N/A"
-                
-                if str(val1) != str(val2):
-                    differences.append({
-                        "type": "cell_modified",
-                        "position": f"Fila {i+1}, Columna '{col}'",
-                        "column": col,
-                        "row": i+1,
-                        "referenceValue": str(val1),
-                        "compareValue": str(val2)
-                    })
+        self._phase(cancel, 'content', max(len(df1), len(df2)))
+        min_rows = min(len(df1), len(df2))
+        rows = np.arange(min_rows)
+        yield from self._iter_cell_changes(df1, df2, rows, rows, common_cols, tolerances, cancel)
         
         # Identificar filas nuevas en el archivo de comparación
         if len(df2) > len(df1):
-            for i in range(len(df1), len(df2)):
-                row_data = {}
-                for col in common_cols:
-                    if col in df2.columns:
-                        row_data[col] = str(df2.iloc[i][col])
-                
-                differences.append({
-                    "type": "row_added",
-                    "position": f"Fila {i+1}",
-                    "row": i+1,
-                    "data": row_data,
-                    "description": f"Fila {i+1} agregada en archivo a comparar"
-                })
+            yield from self._iter_row_differences("row_added", df2, range(len(df1), len(df2)), common_cols, cancel)
         
         # Identificar filas que faltan en el archivo de comparación
         elif len(df1) > len(df2):
-            for i in range(len(df2), len(df1)):
-                row_data = {}
-                for col in common_cols:
-                    if col in df1.columns:
-                        row_data[col] = str(df1.iloc[i][col])
-                
-                differences.append({
-                    "type": "row_removed",
-                    "position": f"Fila {i+1}",
+            yield from self._iter_row_differences("row_removed", df1, range(len(df2), len(df1)), common_cols, cancel)
+    
+    def _iter_cell_changes(self, df1: pd.DataFrame, df2: pd.DataFrame, rows1: np.ndarray, rows2: np.ndarray,
+                           common_cols: List[str], tolerances: Dict[str, Tuple[str, float]],
+                           cancel: Optional[CancellationToken] = None,
+                           offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Compara celda por celda las filas emparejadas (rows1[k] contra rows2[k]), un bloque a la vez
+        offset es la posición en el archivo de la primera fila de los DataFrames (motor por bloques)
+        """
+        if not common_cols or not len(rows1):
+            return
+        
+        values1 = df1[common_cols].to_numpy(dtype=object)
+        values2 = df2[common_cols].to_numpy(dtype=object)
+        
+        # Valores numéricos de las columnas con tolerancia, interpretados una sola vez
+        tolerant = {
+            position: (
+                self._tolerance_values(df1[col], tolerances[col][0]),
+                self._tolerance_values(df2[col], tolerances[col][0]),
+                tolerances[col][1]
+            )
+            for position, col in enumerate(common_cols) if col in tolerances
+        }
+        
+        for start in range(0, len(rows1), self.CONTENT_CHUNK_ROWS):
+            self._check(cancel)
+            chunk1 = rows1[start:start + self.CONTENT_CHUNK_ROWS]
+            chunk2 = rows2[start:start + self.CONTENT_CHUNK_ROWS]
+            block1 = values1[chunk1]
+            block2 = values2[chunk2]
+            
+            changed = block1 != block2
+            for c, (numbers1, numbers2, amount) in tolerant.items():
+                # Dentro de la tolerancia no es una modificación (NaN nunca lo está)
+                changed[:, c] &= ~(np.abs(numbers1[chunk1] - numbers2[chunk2]) <= amount)
+            
+            changed_rows, changed_cols = np.nonzero(changed)
+            for r, c in zip(changed_rows.tolist(), changed_cols.tolist()):
+                i, j = int(chunk1[r]) + offset, int(chunk2[r]) + offset
+                col = common_cols[c]
+                difference = {
+                    "type": "cell_modified",
+                    "position": f"Fila {i+1}, Columna '{col}'",
+                    "column": col,
                     "row": i+1,
-                    "data": row_data,
-                    "description": f"Fila {i+1} falta en archivo a comparar"
-                })
+                    "referenceValue": str(block1[r, c]),
+                    "compareValue": str(block2[r, c])
+                }
+                if i != j:
+                    difference["position"] = f"Fila {i+1} (fila {j+1} en archivo a comparar), Columna '{col}'"
+                    difference["compareRow"] = j+1
+                yield difference
+            self._advance(cancel, len(chunk1))
+    
+    def _iter_row_differences(self, kind: str, df: pd.DataFrame, rows, common_cols: List[str],
+                              cancel: Optional[CancellationToken] = None,
+                              offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Filas completas agregadas o eliminadas, consultando la cancelación una vez por bloque"""
+        for start in range(0, len(rows), self.CONTENT_CHUNK_ROWS):
+            self._check(cancel)
+            block = rows[start:start + self.CONTENT_CHUNK_ROWS]
+            for i in block:
+                yield self._row_difference(kind, df, i, common_cols, offset)
+            self._advance(cancel, len(block))
+    
+    def _row_difference(self, kind: str, df: pd.DataFrame, i: int, common_cols: List[str],
+                        offset: int = 0) -> Dict[str, Any]:
+        """Diferencia de una fila completa agregada (row_added) o eliminada (row_removed)"""
+        where = "agregada en" if kind == "row_added" else "falta en"
+        row = i + offset + 1
+        return {
+            "type": kind,
+            "position": f"Fila {row}",
+            "row": row,
+            "data": {col: str(df.iloc[i][col]) for col in common_cols},
+            "description": f"Fila {row} {where} archivo a comparar"
+        }
+    
+    def _iter_aligned_differences(self, df1: pd.DataFrame, df2: pd.DataFrame, common_cols: List[str],
+                                  tolerances: Dict[str, Tuple[str, float]],
+                                  cancel: Optional[CancellationToken] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Alinea las filas por su hash en lugar de por su posición
+        Las filas reordenadas se reportan como bloques movidos y no como celdas modificadas
+        """
+        alignment = align_rows(
+            self._row_hashes(df1, common_cols, tolerances),
+            self._row_hashes(df2, common_cols, tolerances)
+        )
+        self._check(cancel)
         
-        return differences
+        for ref_start, comp_start, count in moved_blocks(alignment['moved']):
+            yield {
+                "type": "row_moved",
+                "position": f"Filas {ref_start+1}-{ref_start+count}",
+                "row": ref_start+1,
+                "compareRow": comp_start+1,
+                "rows": count,
+                "description": (
+                    f"{count} fila(s) movida(s): filas {ref_start+1}-{ref_start+count} de la referencia "
+                    f"están en las filas {comp_start+1}-{comp_start+count} del archivo a comparar"
+                )
+            }
+        
+        modified = alignment['modified']
+        self._phase(cancel, 'content', len(modified) + len(alignment['inserted']) + len(alignment['deleted']))
+        yield from self._iter_cell_changes(df1, df2, modified[:, 0], modified[:, 1], common_cols, tolerances, cancel)
+        yield from self._iter_row_differences("row_added", df2, alignment['inserted'].tolist(), common_cols, cancel)
+        yield from self._iter_row_differences("row_removed", df1, alignment['deleted'].tolist(), common_cols, cancel)
     
-    def _generate_summary(self, df1: pd.DataFrame, df2: pd.DataFrame, 
-                         differences: List[Dict[str, Any]], 
+    def _generate_summary(self, shape1: Tuple[int, int], shape2: Tuple[int, int],
+                         tally: DifferenceTally,
                          different_content: Dict[str, Any]) -> Dict[str, int]:
         """
         Genera estadísticas resumidas del análisis de comparación
-        Cuenta diferentes tipos de diferencias encontradas
+        Recibe (filas, columnas) de cada archivo y los conteos por tipo de diferencia
         """
-        # Contar cada tipo de diferencia encontrada
-        cell_modifications = len([d for d in differences if d["type"] == "cell_modified"])
-        rows_added = len([d for d in differences if d["type"] == "row_added"])
-        rows_removed = len([d for d in differences if d["type"] == "row_removed"])
-        columns_added = len([d for d in differences if d["type"] == "column_added"])
-        columns_removed = len([d for d in differences if d["type"] == "column_missing"])
+        rows1, columns1 = shape1
+        rows2, columns2 = shape2
         
         return {
-            "totalRows": max(len(df1), len(df2)),
-            "totalColumns": max(len(df1.columns), len(df2.columns)),
-            "differences": len(differences),
-            "addedRows": rows_added,
-            "removedRows": rows_removed,
-            "modifiedCells": cell_modifications,
-            "addedColumns": columns_added,
-            "removedColumns": columns_removed,
-            "referenceRows": len(df1),
-            "referenceColumns": len(df1.columns),
-            "compareRows": len(df2),
-            "compareColumns": len(df2.columns),
+            "totalRows": max(rows1, rows2),
+            "totalColumns": max(columns1, columns2),
+            "differences": tally.total,
+            "addedRows": tally.counts["row_added"],
+            "removedRows": tally.counts["row_removed"],
+            "modifiedCells": tally.counts["cell_modified"],
+            "movedRows": tally.moved_rows,
+            "movedBlocks": tally.counts["row_moved"],
+            "addedColumns": tally.counts["column_added"],
+            "removedColumns": tally.counts["column_missing"],
+            "renamedColumns": tally.counts["column_renamed"],
+            "referenceRows": rows1,
+            "referenceColumns": columns1,
+            "compareRows": rows2,
+            "compareColumns": columns2,
             "uniqueInReference": different_content.get('total_unique_in_reference', 0),
-            "uniqueInCompare": different_content.get('total_unique_in_compare', 0)
+            "uniqueInCompare": different_content.get('total_unique_in_compare', 0),
+            "modifiedRows": different_content.get('total_modified_rows', 0),
+            "duplicatesInReference": different_content.get('duplicates_in_reference', 0),
+            "duplicatesInCompare": different_content.get('duplicates_in_compare', 0)
+        }
+    
+    def quick_scan(self, file1_source: Union[bytes, BinaryIO], file1_name: str,
+                   file2_source: Union[bytes, BinaryIO], file2_name: str,
+                   options: Optional[Dict[str, Any]] = None,
+                   cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Estimación aproximada de las diferencias en una sola pasada por bloques sobre cada archivo
+        Mantiene solo un sketch de hashes de fila y una muestra acotada por archivo, nunca el archivo completo
+        """
+        start_time = datetime.now()
+        try:
+            options = self.resolve_options(options)
+            tolerances = self._parse_tolerances(options['tolerances'])
+            
+            chunks1 = self.iter_chunks(file1_source, file1_name, self.QUICK_SCAN_CHUNK_ROWS,
+                                       options['columns'], options['ignore_columns'])
+            chunks2 = self.iter_chunks(file2_source, file2_name, self.QUICK_SCAN_CHUNK_ROWS,
+                                       options['columns'], options['ignore_columns'])
+            
+            # El primer bloque de cada archivo basta para conocer las columnas comunes
+            first1 = self._prepare_frame(next(chunks1), options)
+            first2 = self._prepare_frame(next(chunks2), options)
+            common_cols = [col for col in first1.columns if col in set(first2.columns)]
+            
+            self._phase(cancel, 'scanning')
+            sides = []
+            for first, chunks in ((first1, chunks1), (first2, chunks2)):
+                side = ScanSide(self.QUICK_SCAN_SKETCH_SIZE, self.QUICK_SCAN_SAMPLE_ROWS)
+                chunk = first
+                while chunk is not None:
+                    self._check(cancel)
+                    self._advance(cancel, len(chunk))
+                    comparable = self._hashable_frame(chunk[common_cols], tolerances)
+                    side.update(
+                        pd.util.hash_pandas_object(comparable, index=False).to_numpy(dtype=np.uint64),
+                        comparable
+                    )
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        chunk = self._prepare_frame(chunk, options)
+                sides.append(side)
+            
+            result = summarize(
+                sides[0], sides[1], common_cols,
+                [col for col in first1.columns if col not in set(first2.columns)],
+                [col for col in first2.columns if col not in set(first1.columns)]
+            )
+        except StopIteration:
+            raise ValueError("Error en el escaneo rápido: uno de los archivos no contiene datos")
+        except ComparisonCancelled:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error en el escaneo rápido: {str(e)}")
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        result["metadata"] = {
+            "comparisonDate": datetime.now().isoformat(),
+            "referenceFileName": file1_name,
+            "compareFileName": file2_name,
+            "processingTime": f"{processing_time:.2f} segundos",
+            "options": options
         }
+        return result
+    
+    def supports_chunked(self, options: Dict[str, Any], *filenames: str) -> bool:
+        """
+        Indica si el motor por bloques puede dar el mismo resultado que el motor en memoria
+        Requiere alineación por posición, sin emparejar filas parecidas, y formatos legibles por bloques
+        """
+        return (
+            options.get('alignment', 'position') == 'position'
+            and not options.get('fuzzy_pairing')
+            and all(name.lower().split('.')[-1] in self.CHUNKED_FORMATS for name in filenames)
+        )
+    
+    def require_chunked(self, options: Dict[str, Any], *filenames: str):
+        if not self.supports_chunked(options, *filenames):
+            raise ValueError(
+                "El motor por bloques requiere archivos CSV, Parquet o Arrow, "
+                "alineación por posición y sin emparejamiento de filas parecidas"
+            )
+    
+    def compare_chunked(self, file1_source: Union[bytes, BinaryIO], file1_name: str,
+                        file2_source: Union[bytes, BinaryIO], file2_name: str,
+                        options: Optional[Dict[str, Any]] = None,
+                        cancel: Optional[CancellationToken] = None,
+                        total_rows: Optional[int] = None,
+                        changes: Optional[ChangeLog] = None) -> Dict[str, Any]:
+        """
+        Comparación completa recorriendo ambos archivos por bloques alineados
+        Genera el mismo reporte que el motor en memoria con alineación por posición, pero solo mantiene
+        un bloque de cada archivo y los hashes de fila (8 bytes por fila, más 16 por columna con tolerancia)
+        Los archivos se leen varias veces: tipos de columna (CSV), columnas renombradas (si hay
+        candidatas), contenido y, si hay filas únicas, los datos de las que se muestran
+        total_rows (filas del archivo más largo, si se conocen) solo se usa para informar del progreso
+        changes (ChangeLog) recibe, como en compare_dataframes, todos los cambios por columna y clave
+        """
+        start_time = datetime.now()
+        options = self.resolve_options(options)
+        self.require_chunked(options, file1_name, file2_name)
+        tolerances = self._parse_tolerances(options['tolerances'])
+        multiset = options['row_matching'] == 'multiset'
+        sources = [(file1_source, file1_name), (file2_source, file2_name)]
+        
+        # Tipo de cada columna en todo el archivo y columnas tal como quedan tras prepararlas
+        self._phase(cancel, 'scanning')
+        dtypes = [self._chunked_dtypes(source, name, options, cancel) for source, name in sources]
+        ignored = set(options['ignore_columns'] or [])
+        columns1, columns2 = (
+            [col for col in (str(name).strip() for name in types) if col not in ignored] for types in dtypes
+        )
+        
+        # Columnas renombradas: solo se recorren las columnas candidatas si las hay en ambos archivos
+        renames = {}
+        missing = [col for col in columns1 if col not in set(columns2)]
+        added = [col for col in columns2 if col not in set(columns1)]
+        if options['detect_renames'] and missing and added:
+            self._phase(cancel, 'renames')
+            renames = self._match_renames(
+                self._chunked_sketches(*sources[0], options, dtypes[0], missing, cancel),
+                self._chunked_sketches(*sources[1], options, dtypes[1], added, cancel)
+            )
+            reverse = {compare: reference for reference, compare in renames.items()}
+            columns2 = [reverse.get(col, col) for col in columns2]
+        
+        # DataFrames vacíos con las columnas de cada archivo para reutilizar el análisis de estructura
+        frame1, frame2 = pd.DataFrame(columns=columns1), pd.DataFrame(columns=columns2)
+        if renames:
+            frame2.attrs['renamed_columns'] = renames
+        
+        self._start_change_log(changes, options, columns1, columns2)
+        tally = DifferenceTally(self.REPORTED_DIFFERENCES, changes)
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.track(tally)
+        struct_diff = self._compare_structure(frame1, frame2)
+        tally.extend(struct_diff)
+        compare_content = all(d["type"] == "column_renamed" for d in struct_diff)
+        common_cols = [col for col in columns1 if col in set(columns2)]
+        
+        different_content = self._empty_different_content(frame1, frame2, options)
+        row_counts = [0, 0]
+        incomplete_reason = None
+        try:
+            self._phase(cancel, 'content', total_rows)
+            hashes = ([], [])
+            tolerance_keys = ([], [])
+            offset = 0
+            for chunk1, chunk2 in itertools.zip_longest(
+                self._chunked_frames(*sources[0], options, dtypes[0]),
+                self._chunked_frames(*sources[1], options, dtypes[1], renames)
+            ):
+                self._check(cancel)
+                for side, chunk in enumerate((chunk1, chunk2)):
+                    if chunk is not None:
+                        row_counts[side] += len(chunk)
+                        if common_cols:
+                            hashes[side].append(self._row_hashes(chunk, common_cols, tolerances))
+                            keys = self._tolerance_keys(chunk, common_cols, tolerances)
+                            if keys is not None:
+                                tolerance_keys[side].append(keys)
+                if compare_content:
+                    if changes is not None and changes.key_column is not None:
+                        # Claves de las filas de referencia de este bloque
+                        changes.use_keys(chunk1[changes.key_column].to_numpy() if chunk1 is not None else None, offset)
+                    tally.extend(self._iter_chunk_differences(
+                        chunk1, chunk2, common_cols, tolerances, cancel, offset
+                    ))
+                else:
+                    # Sin comparación de celdas el avance se cuenta por bloque
+                    self._advance(cancel, max(len(chunk) for chunk in (chunk1, chunk2) if chunk is not None))
+                offset += self.CHUNKED_ENGINE_ROWS
+            
+            if common_cols:
+                self._phase(cancel, 'unique_rows')
+                uniqueness = self._row_uniqueness(
+                    *(np.concatenate(side) if side else np.empty(0, dtype=np.uint64) for side in hashes),
+                    multiset
+                )
+                del hashes
+                rows1, rows2 = uniqueness['rows1'], uniqueness['rows2']
+                if tolerance_keys[0] and tolerance_keys[1]:
+                    # Solo se conservan los datos de tolerancia de las filas únicas
+                    keys1, keys2 = (
+                        {name: (np.concatenate([keys[name] for keys in side])[rows] if name != 'amounts'
+                                else side[0][name]) for name in side[0]}
+                        for side, rows in zip(tolerance_keys, (rows1, rows2))
+                    )
+                    del tolerance_keys
+                    rows1, rows2 = self._match_within_tolerance(rows1, rows2, keys1, keys2)
+                different_content.update({
+                    'unique_in_reference': self._unique_row_entries(
+                        rows1[:50], self._chunked_rows(*sources[0], options, dtypes[0], None, rows1[:50], cancel),
+                        uniqueness['codes1'], uniqueness, common_cols, multiset
+                    ),
+                    'unique_in_compare': self._unique_row_entries(
+                        rows2[:50], self._chunked_rows(*sources[1], options, dtypes[1], renames, rows2[:50], cancel),
+                        uniqueness['codes2'], uniqueness, common_cols, multiset
+                    ),
+                    'total_unique_in_reference': len(rows1),
+                    'total_unique_in_compare': len(rows2),
+                    'duplicates_in_reference': uniqueness['duplicates_in_reference'],
+                    'duplicates_in_compare': uniqueness['duplicates_in_compare']
+                })
+        except ComparisonCancelled as stop:
+            incomplete_reason = stop.reason
+        
+        return self._build_result(
+            (row_counts[0], len(columns1)), (row_counts[1], len(columns2)), tally, different_content,
+            file1_name, file2_name, options, start_time, incomplete_reason, 'chunked'
+        )
+    
+    def _chunked_dtypes(self, source: Union[bytes, BinaryIO], filename: str, options: Dict[str, Any],
+                        cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Tipo de cada columna en todo el archivo, como lo deduce una lectura completa
+        En CSV pandas deduce los tipos por bloque: se combinan los de todos los bloques (enteros y
+        decimales dan decimales, números y texto dan object) igual que al unir sus bloques internos
+        Los formatos columnares llevan el tipo en el esquema y basta con el primer bloque
+        """
+        from pandas.core.dtypes.cast import find_common_type
+        
+        if not isinstance(source, (bytes, bytearray)):
+            source.seek(0)
+        whole_file = filename.lower().split('.')[-1] == 'csv'
+        seen: Dict[str, List[Any]] = {}
+        for chunk in self.iter_chunks(source, filename, self.CHUNKED_ENGINE_ROWS,
+                                      options['columns'], options['ignore_columns']):
+            self._check(cancel)
+            self._advance(cancel, len(chunk))
+            for col, dtype in chunk.dtypes.items():
+                seen.setdefault(col, []).append(dtype)
+            if not whole_file:
+                break
+        return {col: find_common_type(types) for col, types in seen.items()}
+    
+    def _chunked_frames(self, source: Union[bytes, BinaryIO], filename: str, options: Dict[str, Any],
+                        dtypes: Dict[str, Any], renames: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+        """Bloques preparados de exactamente CHUNKED_ENGINE_ROWS filas, con el tipo de toda la columna"""
+        if not isinstance(source, (bytes, bytearray)):
+            source.seek(0)
+        chunks = self.iter_chunks(source, filename, self.CHUNKED_ENGINE_ROWS,
+                                  options['columns'], options['ignore_columns'])
+        for chunk in rechunk(chunks, self.CHUNKED_ENGINE_ROWS):
+            changed = {col: dtype for col, dtype in dtypes.items() if col in chunk and chunk[col].dtype != dtype}
+            if changed:
+                chunk = chunk.astype(changed)
+            chunk = self._prepare_frame(chunk, options)
+            if renames:
+                chunk = chunk.rename(columns={compare: reference for reference, compare in renames.items()})
+            yield chunk
+    
+    def _chunked_sketches(self, source: Union[bytes, BinaryIO], filename: str, options: Dict[str, Any],
+                          dtypes: Dict[str, Any], columns: List[str],
+                          cancel: Optional[CancellationToken] = None) -> Dict[str, KMVSketch]:
+        """Sketches de valores de las columnas candidatas a renombradas, acumulados bloque a bloque"""
+        sketches = {col: KMVSketch(self.RENAME_SKETCH_SIZE) for col in columns}
+        for chunk in self._chunked_frames(source, filename, options, dtypes):
+            self._check(cancel)
+            self._advance(cancel, len(chunk))
+            for col in columns:
+                sketches[col].update(hash_values(chunk[col].dropna()))
+        return sketches
+    
+    def _chunked_rows(self, source: Union[bytes, BinaryIO], filename: str, options: Dict[str, Any],
+                      dtypes: Dict[str, Any], renames: Optional[Dict[str, str]], rows: np.ndarray,
+                      cancel: Optional[CancellationToken] = None) -> List[Dict[str, Any]]:
+        """Datos completos de las filas indicadas (posiciones crecientes); se lee hasta la última"""
+        if not len(rows):
+            return []
+        found = {}
+        offset = 0
+        for chunk in self._chunked_frames(source, filename, options, dtypes, renames):
+            self._check(cancel)
+            for i in rows[(rows >= offset) & (rows < offset + len(chunk))].tolist():
+                found[i] = chunk.iloc[i - offset].to_dict()
+            offset += len(chunk)
+            if offset > rows[-1]:
+                break
+        return [found[i] for i in rows.tolist()]
+    
+    def _iter_chunk_differences(self, chunk1: Optional[pd.DataFrame], chunk2: Optional[pd.DataFrame],
+                                common_cols: List[str], tolerances: Dict[str, Tuple[str, float]],
+                                cancel: Optional[CancellationToken], offset: int) -> Iterator[Dict[str, Any]]:
+        """Diferencias de contenido de un par de bloques alineados (None si un archivo ya terminó)"""
+        rows1 = len(chunk1) if chunk1 is not None else 0
+        rows2 = len(chunk2) if chunk2 is not None else 0
+        paired = np.arange(min(rows1, rows2))
+        yield from self._iter_cell_changes(chunk1, chunk2, paired, paired, common_cols, tolerances, cancel, offset)
+        
+        if rows2 > rows1:
+            yield from self._iter_row_differences("row_added", chunk2, range(rows1, rows2), common_cols, cancel, offset)
+        elif rows1 > rows2:
+            yield from self._iter_row_differences("row_removed", chunk1, range(rows2, rows1), common_cols, cancel, offset)
     
     def compare_files(self, file1_content: bytes, file1_name: str, 
-                     file2_content: bytes, file2_name: str) -> Dict[str, Any]:
+                     file2_content: bytes, file2_name: str,
+                     options: Optional[Dict[str, Any]] = None,
+                     cancel: Optional[CancellationToken] = None,
+                     plan: Optional[Dict[str, Any]] = None,
+                     changes: Optional[ChangeLog] = None) -> Dict[str, Any]:
         """
         Punto de entrada principal para comparar dos archivos
-        Coordina todo el proceso de análisis y comparación
+        Coordina todo el proceso de análisis y comparación con el motor elegido en el plan
+        (ver engine_planner.py); sin plan se usa la opción 'engine' ('auto' equivale a 'memory')
+        Con changes (ChangeLog) se registran además todos los cambios por columna y clave de fila
         """
         try:
-            # Cargar ambos archivos en memoria
-            df1 = self.read_file(file1_content, file1_name)
-            df2 = self.read_file(file2_content, file2_name)
+            options = self.resolve_options(options)
+            engine = plan['engine'] if plan else options['engine']
             
-            # Ejecutar la comparación completa
-            result = self.compare_dataframes(df1, df2, file1_name, file2_name)
+            if engine == 'chunked':
+                # Filas según la inspección del plan, para estimar el tiempo restante
+                known = [file['rows'] for file in (plan or {}).get('files', []) if file['rows'] is not None]
+                result = self.compare_chunked(
+                    file1_content, file1_name, file2_content, file2_name, options, cancel,
+                    max(known) if known else None, changes
+                )
+            else:
+                # Cargar ambos archivos en memoria, solo con las columnas que intervienen
+                self._phase(cancel, 'reading')
+                df1 = self.read_file(file1_content, file1_name, options['columns'], options['ignore_columns'])
+                df2 = self.read_file(file2_content, file2_name, options['columns'], options['ignore_columns'])
+                
+                # Ejecutar la comparación completa
+                result = self.compare_dataframes(df1, df2, file1_name, file2_name, options, cancel, changes)
             
+            if plan:
+                result['metadata']['plan'] = plan
             return result
             
+        except ComparisonCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Error en la comparación: {str(e)}") 
\ No newline at end of file
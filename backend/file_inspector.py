@@ -0,0 +1,221 @@
+import codecs
+import io
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, BinaryIO
+
+class FileInspector:
+    """
+    Validación rápida de archivos sin construir el DataFrame completo
+    Lee el encabezado y una muestra acotada; el número de filas se obtiene de los metadatos
+    del formato o con un recorrido de bytes que respeta las comillas
+    """
+
+    # Bytes leídos para detectar la codificación del CSV
+    SAMPLE_BYTES = 64 * 1024
+
+    # Filas de muestra usadas para inferir los tipos de columna
+    SAMPLE_ROWS = 100
+
+    # Tamaño de los bloques leídos al contar registros
+    SCAN_BLOCK_BYTES = 4 * 1024 * 1024
+
+    QUOTE = ord('"')
+    NEWLINE = ord('\n')
+
+    # Bytes con los que empieza una línea que puede estar en blanco: pandas omite las líneas
+    # formadas solo por espacios
+    BLANK_START = np.zeros(256, dtype=bool)
+    BLANK_START[list(b' \t\r\n\x0b\x0c')] = True
+
+    def inspect(self, source: BinaryIO, filename: str) -> Dict[str, Any]:
+        """Retorna filas, columnas, nombres y tipos de muestra del archivo"""
+        extension = filename.lower().split('.')[-1]
+        source.seek(0)
+
+        if extension == 'csv':
+            return self._inspect_csv(source)
+        elif extension == 'xlsx':
+            return self._inspect_xlsx(source)
+        elif extension == 'xls':
+            return self._inspect_xls(source)
+        elif extension == 'parquet':
+            return self._inspect_parquet(source)
+        elif extension in ['arrow', 'feather', 'ipc']:
+            return self._inspect_arrow(source)
+        raise ValueError(f"Formato de archivo no soportado: {extension}")
+
+    def _result(self, rows: int, columns: List[str], sample: Optional[pd.DataFrame], **extra) -> Dict[str, Any]:
+        result = {
+            'rows': int(rows),
+            'columns': len(columns),
+            'column_names': [str(col).strip() for col in columns],
+            'dtypes': {str(col).strip(): str(dtype) for col, dtype in sample.dtypes.items()} if sample is not None else {},
+            'row_width': self.row_width(sample)
+        }
+        result.update(extra)
+        return result
+
+    def row_width(self, sample: Optional[pd.DataFrame]) -> Optional[float]:
+        """Caracteres medios por fila de la muestra convertida a texto, como la compara el motor"""
+        if sample is None or sample.empty:
+            return None
+        return float(sum(sample[col].astype(str).str.len().mean() for col in sample.columns))
+
+    def _inspect_csv(self, source: BinaryIO) -> Dict[str, Any]:
+        prefix = source.read(self.SAMPLE_BYTES)
+        if not prefix.strip():
+            raise ValueError("El archivo está vacío")
+
+        encoding = self._detect_encoding(prefix)
+        text = codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+
+        # Mismo separador y comillas que read_file (valores por defecto de pandas): una muestra leída
+        # con otro separador daría columnas que la comparación no va a ver
+        complete = text if len(prefix) < self.SAMPLE_BYTES else text[:text.rfind('\n') + 1]
+        sample = pd.read_csv(io.StringIO(complete), nrows=self.SAMPLE_ROWS)
+
+        source.seek(0)
+        records = self.count_records(source)
+
+        return self._result(max(records - 1, 0), sample.columns.tolist(), sample, encoding=encoding)
+
+    def _detect_encoding(self, prefix: bytes) -> str:
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("No se pudo decodificar el archivo CSV")
+
+    def count_records(self, source: BinaryIO, quote: int = QUOTE) -> int:
+        """
+        Cuenta los registros de un CSV (incluido el encabezado) sin interpretarlo
+        Los saltos de línea dentro de un campo entre comillas no cuentan como fin de registro;
+        las comillas escapadas ("") cambian la paridad dos veces y no la alteran
+        Las líneas vacías o solo con espacios no cuentan, igual que en pandas (skip_blank_lines)
+        """
+        records = 0
+        in_quotes = 0
+        # El registro en curso, que puede empezar en un bloque anterior, ya tiene algún carácter visible
+        pending = False
+        while True:
+            block = source.read(self.SCAN_BLOCK_BYTES)
+            if not block:
+                break
+
+            data = np.frombuffer(block, dtype=np.uint8)
+            if not in_quotes and block.find(bytes([quote])) == -1:
+                # Bloque sin comillas: todos los saltos de línea terminan un registro
+                ends = np.flatnonzero(data == self.NEWLINE)
+            else:
+                # Solo interesan las comillas y los saltos de línea, en orden
+                positions = np.flatnonzero((data == quote) | (data == self.NEWLINE))
+                is_quote = data[positions] == quote
+                parity = (np.cumsum(is_quote) + in_quotes) % 2
+                ends = positions[~is_quote & (parity == 0)]
+                if len(parity):
+                    in_quotes = int(parity[-1])
+
+            if not len(ends):
+                pending = pending or bool(block.strip())
+                continue
+
+            # Solo un registro que empieza con un espacio (o está vacío) puede ser una línea en blanco
+            starts = np.concatenate([[0], ends[:-1] + 1])
+            candidates = np.flatnonzero(self.BLANK_START[data[starts]])
+            if pending and len(candidates) and candidates[0] == 0:
+                candidates = candidates[1:]
+            blank = sum(1 for k in candidates.tolist() if not block[starts[k]:ends[k]].strip())
+            records += len(ends) - blank
+            pending = bool(block[ends[-1] + 1:].strip())
+
+        # Último registro sin salto de línea final
+        if pending:
+            records += 1
+        return records
+
+    def _inspect_xlsx(self, source: BinaryIO) -> Dict[str, Any]:
+        from openpyxl import load_workbook
+
+        # En modo solo lectura las dimensiones salen de la etiqueta <dimension> de la hoja
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            sample_rows = list(sheet.iter_rows(max_row=self.SAMPLE_ROWS + 1, values_only=True))
+            # Como read_excel: las celdas vacías del final se descartan y un encabezado vacío con datos
+            # debajo se llama 'Unnamed: n', para que la muestra no se desplace de columna
+            width = max((self._used_width(row) for row in sample_rows), default=0)
+            rows_sample = [(tuple(row) + (None,) * width)[:width] for row in sample_rows]
+            header = [f'Unnamed: {k}' if value is None else value
+                      for k, value in enumerate(rows_sample[0] if rows_sample else ())]
+            sample = pd.DataFrame(rows_sample[1:], columns=header).infer_objects()
+
+            rows = sheet.max_row
+            if rows is None:
+                # Hoja sin dimensiones guardadas: se cuentan las filas sin leer sus valores en pandas
+                rows = sum(1 for _ in sheet.iter_rows(values_only=True))
+            return self._result(
+                max(rows - 1, 0), header, sample,
+                sheet=sheet.title, sheets=len(workbook.sheetnames)
+            )
+        finally:
+            workbook.close()
+
+    def _used_width(self, row: tuple) -> int:
+        """Número de celdas de la fila hasta la última no vacía"""
+        width = len(row)
+        while width and row[width - 1] is None:
+            width -= 1
+        return width
+
+    def _inspect_xls(self, source: BinaryIO) -> Dict[str, Any]:
+        import xlrd
+
+        workbook = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+        try:
+            sheet = workbook.sheet_by_index(0)
+            header = [str(value) for value in sheet.row_values(0)] if sheet.nrows else []
+            sample = pd.DataFrame(
+                [sheet.row_values(i) for i in range(1, min(sheet.nrows, self.SAMPLE_ROWS + 1))], columns=header
+            ).infer_objects()
+            return self._result(
+                max(sheet.nrows - 1, 0), header, sample,
+                sheet=sheet.name, sheets=workbook.nsheets
+            )
+        finally:
+            workbook.release_resources()
+
+    def _inspect_parquet(self, source: BinaryIO) -> Dict[str, Any]:
+        import pyarrow.parquet as pq
+
+        # El pie del archivo Parquet ya contiene el número de filas y el esquema;
+        # la muestra sale del primer lote, sin leer el resto del archivo
+        parquet_file = pq.ParquetFile(source)
+        schema = parquet_file.schema_arrow
+        batch = next(parquet_file.iter_batches(batch_size=self.SAMPLE_ROWS), None)
+        sample = batch.to_pandas() if batch is not None else schema.empty_table().to_pandas()
+        return self._result(parquet_file.metadata.num_rows, schema.names, sample)
+
+    def _inspect_arrow(self, source: BinaryIO) -> Dict[str, Any]:
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        first = None
+        try:
+            reader = pa.ipc.open_file(source)
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            if reader.num_record_batches:
+                first = reader.get_batch(0)
+        except pa.ArrowInvalid:
+            # Formato de flujo: hay que recorrer los lotes, pero sin convertirlos a pandas
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            rows = 0
+            for batch in reader:
+                first = batch if first is None else first
+                rows += batch.num_rows
+        # Solo las primeras filas del primer lote se convierten para la muestra
+        sample = first.slice(0, self.SAMPLE_ROWS).to_pandas() if first is not None else reader.schema.empty_table().to_pandas()
+        return self._result(rows, reader.schema.names, sample)
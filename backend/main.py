@@ -1,12 +1,22 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from file_comparator import FileComparator
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from contextlib import asynccontextmanager
 from config import Config
 import os
+import io
 from dotenv import load_dotenv
 import logging
-from api import files_router, comparisons_router, history_router
+import time
+import json
+import asyncio
+import runtime
+from serializers import dumps, loads, JSONBytesResponse
+from admission import AdmissionRejected, ReservedStreamingResponse
+from cancellation import CancellationToken, ComparisonCancelled
+from progress import ComparisonProgress
+from api import files_router, comparisons_router, history_router, admin_router, progress_router
 
 # Configuracion del sistema de logs
 logging.basicConfig(
@@ -22,11 +32,22 @@ logger = logging.getLogger(__name__)
 # Cargar variables de entorno desde archivo .env
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación
+    La base de datos y el motor de comparación se preparan una sola vez en segundo plano,
+    de modo que /health responde de inmediato y /ready indica cuándo se puede trabajar
+    """
+    runtime.start_warm_up()
+    yield
+
 app = FastAPI(
     title="Altice File Comparator API",
     description="API para comparar archivos CSV, Excel y XLS",
     version="1.0.0",
-    debug=Config.DEBUG
+    debug=Config.DEBUG,
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir peticiones desde el frontend
@@ -38,12 +59,167 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Instancia global del comparador de archivos
-comparator = FileComparator()
-
 app.include_router(files_router)
 app.include_router(comparisons_router)
 app.include_router(history_router)
+app.include_router(admin_router)
+app.include_router(progress_router)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):
+    """Sobrecarga: 429 (cola llena) o 503 (espera agotada) con la indicación Retry-After"""
+    logger.warning(f"Comparación rechazada ({exc.status_code}): {exc.detail}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(ComparisonCancelled)
+async def comparison_cancelled_handler(request, exc: ComparisonCancelled):
+    """Comparación detenida sin resultados parciales: plazo vencido (504) o cliente desconectado (499)"""
+    if exc.reason == 'deadline':
+        return JSONResponse(status_code=504, content={
+            "detail": f"La comparación superó el tiempo máximo permitido ({exc.time_budget:g} segundos)"
+        })
+    return JSONResponse(status_code=499, content={"detail": "Comparación cancelada"})
+
+# Intervalo en segundos con el que se comprueba si el cliente sigue conectado
+DISCONNECT_POLL_INTERVAL = 0.5
+
+def comparison_token(time_budget: float = None, progress: ComparisonProgress = None) -> CancellationToken:
+    """Token de cancelación con el plazo pedido, acotado por COMPARISON_TIME_BUDGET"""
+    limit = Config.COMPARISON_TIME_BUDGET
+    if time_budget is not None and time_budget > 0:
+        limit = min(time_budget, limit) if limit else time_budget
+    return CancellationToken(limit or None, progress)
+
+async def comparison_progress(progress_id: str = None):
+    """
+    Progreso de la comparación, publicado en /progress/{progress_id} si el cliente indica un identificador
+    Cuando el endpoint termina se publica el estado final: completado, cancelado o error
+    """
+    progress = runtime.get_progress_registry().open(progress_id)
+    try:
+        yield progress
+    except ComparisonCancelled as e:
+        progress.finish('cancelled', e.reason)
+        raise
+    except (HTTPException, AdmissionRejected) as e:
+        progress.finish('error', str(e.detail))
+        raise
+    except Exception as e:
+        progress.finish('error', str(e))
+        raise
+    else:
+        progress.finish('completed')
+
+def finish_progress(progress: ComparisonProgress, result: dict):
+    """Un resultado parcial se publica como 'incomplete' con el motivo de la interrupción"""
+    if result.get('incomplete'):
+        progress.finish('incomplete', result['metadata'].get('incompleteReason'))
+
+async def run_cancellable(request: Request, cancel: CancellationToken, func, *args):
+    """
+    Ejecuta func en el pool de hilos y activa el token si el cliente se desconecta
+    El motor consulta el token entre bloques y termina por su cuenta
+    """
+    async def watch_disconnect():
+        while not cancel.cancelled:
+            if await request.is_disconnected():
+                cancel.cancel('disconnected')
+                logger.info("Cliente desconectado: cancelando la comparación")
+                return
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+    
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        return await run_in_threadpool(func, *args)
+    finally:
+        watcher.cancel()
+
+def parse_options(options: str = None) -> dict:
+    """
+    Interpreta las opciones de comparación enviadas como JSON en el formulario
+    Ejemplo: {"columns": ["Nombre_Maquina", "IP_Address"]}
+    """
+    if not options:
+        return {}
+    try:
+        parsed = json.loads(options)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Opciones de comparación no válidas: {str(e)}")
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=400, detail="Las opciones de comparación deben ser un objeto JSON")
+    return parsed
+
+def cached_comparison(checksum1: str, filename1: str, checksum2: str, filename2: str,
+                      comparison_options: dict, mode: str = None, lookup: bool = True):
+    """
+    Busca el resultado en la caché antes de planificar la comparación y de pedir una plaza de admisión
+    Un par idéntico (mismo contenido, opciones y versión del motor) se sirve sin recalcular
+    mode distingue en la caché los resultados de otra forma (por ejemplo, 'workbook') del mismo par
+    Con lookup=False solo se calcula la clave: la comparación tiene que ejecutarse (para registrar sus cambios)
+    Retorna (clave, acierto): clave es None si la caché está desactivada; acierto es
+    (resultado, resultado codificado, cabeceras de la respuesta) o None si hay que comparar
+    """
+    cache = runtime.get_result_cache()
+    if cache is None:
+        return None, None
+    
+    resolved = runtime.get_comparator().resolve_options(comparison_options)
+    cache_key = cache.make_key(
+        checksum1, filename1, checksum2, filename2,
+        resolved if mode is None else dict(resolved, mode=mode)
+    )
+    cached = cache.get(cache_key) if lookup else None
+    if cached is None:
+        return cache_key, None
+    
+    result = loads(cached)
+    # Los nombres pueden cambiar aunque el contenido sea el mismo
+    result['metadata'].update({"referenceFileName": filename1, "compareFileName": filename2, "cached": True})
+    logger.info(f"Resultado servido desde la caché: {result['summary']['differences']} diferencias")
+    return cache_key, (result, dumps(result), {"X-Cache": "HIT"})
+
+def run_comparison(cache_key: str, compute):
+    """
+    Ejecuta la comparación (compute) tras un fallo de la caché y guarda el resultado con cache_key
+    Retorna (resultado, resultado codificado, cabeceras de la respuesta)
+    """
+    result = compute()
+    logger.info(f"Comparación completada: {result['summary']['differences']} diferencias encontradas")
+    
+    # Codificar una sola vez: los mismos bytes sirven para la respuesta, la caché y el historial
+    body = dumps(result)
+    if cache_key is None:
+        return result, body, {}
+    if result.get('incomplete'):
+        # Un resultado parcial no se reutiliza
+        return result, body, {"X-Cache": "SKIP"}
+    runtime.get_result_cache().put(cache_key, body)
+    return result, body, {"X-Cache": "MISS"}
+
+def change_log(save: bool, comparison_options: dict):
+    """
+    Registro de cambios para el historial: solo al guardar una comparación con 'record_changes'
+    Se pasa al motor y después a save_comparison, fuera del resultado (respuesta, caché e historial)
+    """
+    if not save or not comparison_options.get('record_changes'):
+        return None
+    return runtime.get_comparator().new_change_log()
+
+def keep_compared_file(content: bytes, filename: str) -> str:
+    """
+    Conserva un archivo de una comparación guardada en el almacén direccionado por contenido
+    Con sus rutas, /comparisons/{id}/export repite la comparación y exporta todas las diferencias
+    Si no se puede escribir, la comparación se guarda igual (se exportarán las diferencias guardadas)
+    """
+    try:
+        return runtime.get_reference_store().ingest(io.BytesIO(content), filename)['file_path']
+    except OSError as e:
+        logger.warning(f"No se pudo conservar el archivo {filename}: {e}")
+        return None
 
 @app.get("/")
 async def root():
@@ -62,7 +238,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     """
-    Endpoint de salud para monitoreo del servicio
+    Endpoint de salud (liveness) para monitoreo del servicio
+    Responde en cuanto el proceso acepta conexiones, sin esperar a la base de datos
     """
     return {
         "status": "healthy", 
@@ -71,24 +248,55 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Endpoint de preparación (readiness) del servicio
+    Retorna 503 hasta que la base de datos y el motor de comparación estén cargados
+    """
+    status = runtime.get_status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+@app.get("/normalization-profiles")
+async def get_normalization_profiles():
+    """
+    Lista los perfiles de normalización con nombre y las reglas disponibles
+    Se usan en la opción 'normalization' de /compare y /export
+    """
+    import normalization
+    return normalization.list_profiles()
+
 @app.post("/compare")
 async def compare_files(
+    request: Request,
     file1: UploadFile = File(..., description="Archivo de referencia"),
-    file2: UploadFile = File(..., description="Archivo a comparar")
+    file2: UploadFile = File(..., description="Archivo a comparar"),
+    options: str = Form(None, description="Opciones de comparación en JSON"),
+    save: bool = False,
+    time_budget: float = None,
+    progress: ComparisonProgress = Depends(comparison_progress)
 ):
     """
     Endpoint principal para comparar dos archivos
     
     Args:
-        file1: Archivo de referencia (CSV, XLSX, XLS)
-        file2: Archivo a comparar (CSV, XLSX, XLS)
+        file1: Archivo de referencia (CSV, XLSX, XLS, Parquet, Arrow)
+        file2: Archivo a comparar (CSV, XLSX, XLS, Parquet, Arrow)
+        options: Opciones de comparación en JSON (por ejemplo, las columnas a comparar)
+        save: Guardar el resultado en el historial de comparaciones
+        time_budget: Tiempo máximo en segundos (acotado por COMPARISON_TIME_BUDGET)
+        progress_id: Identificador elegido por el cliente para seguir el avance en /progress/{progress_id}
     
     Returns:
-        JSON con el resultado detallado de la comparación
+        JSON con el resultado detallado de la comparación; si se agota el tiempo durante el
+        análisis del contenido, el resultado parcial lleva "incomplete": true
+        El motor (en memoria o por bloques) se elige según la memoria estimada; la elección y
+        las estimaciones se devuelven en metadata.plan
     """
     
     # Validar tipos de archivo permitidos
     allowed_extensions = Config.ALLOWED_EXTENSIONS
+    comparison_options = parse_options(options)
     
     def validate_file(file: UploadFile) -> bool:
         if not file.filename:
@@ -138,16 +346,60 @@ async def compare_files(
         
         logger.info(f"Comparando archivos: {file1.filename} vs {file2.filename}")
         
-        # Ejecutar la comparación usando el motor de comparación
-        result = comparator.compare_files(
-            file1_content, file1.filename,
-            file2_content, file2.filename
-        )
+        # Un acierto de la caché no necesita plan ni plaza de admisión (si no hay cambios que registrar)
+        from result_cache import content_checksum
+        changes = change_log(save, comparison_options)
+        start_time = time.perf_counter()
+        cache_key, hit = await run_in_threadpool(lambda: cached_comparison(
+            content_checksum(file1_content), file1.filename,
+            content_checksum(file2_content), file2.filename,
+            comparison_options, lookup=changes is None
+        ))
+        if hit is not None:
+            result, body, headers = hit
+        else:
+            # Elegir el motor según la memoria estimada (inspeccionando los archivos fuera del bucle de eventos)
+            progress.start_phase('planning')
+            plan = await run_in_threadpool(runtime.get_engine_planner().plan, [
+                {'content': file1_content, 'filename': file1.filename},
+                {'content': file2_content, 'filename': file2.filename}
+            ], comparison_options)
+            logger.info(f"Motor elegido: {plan['engine']} ({plan['reason']}, {plan['estimated_bytes'] / 1024 / 1024:.1f} MB estimados)")
+            
+            # Admitir según la memoria estimada del motor elegido
+            admission = runtime.get_admission_controller()
+            comparator = runtime.get_comparator()
+            progress.start_phase('queued')
+            async with admission.admit(plan['estimated_bytes']):
+                # El plazo cuenta desde la admisión, no durante la espera en la cola
+                cancel = comparison_token(time_budget, progress)
+                start_time = time.perf_counter()
+                result, body, headers = await run_cancellable(
+                    request, cancel, run_comparison, cache_key,
+                    lambda: comparator.compare_files(
+                        file1_content, file1.filename,
+                        file2_content, file2.filename,
+                        comparison_options, cancel, plan, changes
+                    )
+                )
+        processing_time = time.perf_counter() - start_time
+        finish_progress(progress, result)
         
-        logger.info(f"Comparación completada: {result['summary']['differences']} diferencias encontradas")
+        if save:
+            db = runtime.get_database_manager()
+            comparison_id = db.save_comparison(db.build_comparison_record(
+                result, body, file2.filename, len(file2_content), processing_time,
+                compare_file_path=keep_compared_file(file2_content, file2.filename),
+                reference_file_path=keep_compared_file(file1_content, file1.filename),
+                changes=changes
+            ))
+            headers["X-Comparison-Id"] = str(comparison_id)
         
-        return JSONResponse(content=result)
+        return JSONBytesResponse(content=body, headers=headers)
         
+    except (HTTPException, AdmissionRejected, ComparisonCancelled):
+        raise
+    
     except ValueError as ve:
         logger.error(f"Error de validación: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -159,11 +411,370 @@ async def compare_files(
             detail=f"Error interno del servidor: {str(e)}"
         )
 
+@app.post("/compare/reference/{reference_id}")
+async def compare_with_reference(
+    request: Request,
+    reference_id: int,
+    file: UploadFile = File(..., description="Archivo a comparar"),
+    options: str = Form(None, description="Opciones de comparación en JSON"),
+    save: bool = True,
+    time_budget: float = None,
+    progress: ComparisonProgress = Depends(comparison_progress)
+):
+    """
+    Compara un archivo con un archivo de referencia de la biblioteca, sin volver a subirlo
+    La referencia se carga desde su caché preprocesada (o desde el disco, verificando su huella);
+    el uso de la referencia se actualiza y, por defecto, el resultado se guarda en el historial
+    """
+    if not file.filename or file.filename.lower().split('.')[-1] not in Config.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Archivo a comparar no válido. Formatos permitidos: {', '.join(Config.ALLOWED_EXTENSIONS)}"
+        )
+    
+    db = runtime.get_database_manager()
+    reference = db.get_reference_file(reference_id)
+    if not reference:
+        raise HTTPException(status_code=404, detail="Archivo de referencia no encontrado")
+    
+    file_content = await file.read()
+    if len(file_content) == 0:
+        raise HTTPException(status_code=400, detail="El archivo a comparar está vacío")
+    if len(file_content) > Config.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El archivo a comparar es demasiado grande. Máximo: {Config.MAX_FILE_SIZE / 1024 / 1024:.1f} MB"
+        )
+    
+    comparison_options = parse_options(options)
+    logger.info(f"Comparando {file.filename} con la referencia {reference['name']} (id {reference_id})")
+    
+    try:
+        comparator = runtime.get_comparator()
+        preprocessor = runtime.get_reference_preprocessor()
+        
+        def compute():
+            resolved = comparator.resolve_options(comparison_options)
+            progress.start_phase('reading')
+            df1 = preprocessor.load(reference, resolved['columns'], resolved['ignore_columns'])
+            df2 = comparator.read_file(file_content, file.filename, resolved['columns'], resolved['ignore_columns'])
+            return comparator.compare_dataframes(
+                df1, df2, reference['original_name'], file.filename, resolved, cancel, changes
+            )
+        
+        # Un acierto de la caché no necesita plaza de admisión (si no hay cambios que registrar)
+        from result_cache import content_checksum
+        changes = change_log(save, comparison_options)
+        start_time = time.perf_counter()
+        cache_key, hit = await run_in_threadpool(lambda: cached_comparison(
+            reference['checksum'] or runtime.get_reference_store().checksum(reference['file_path']),
+            reference['original_name'],
+            content_checksum(file_content), file.filename,
+            comparison_options, lookup=changes is None
+        ))
+        if hit is not None:
+            result, body, headers = hit
+        else:
+            admission = runtime.get_admission_controller()
+            cost = admission.estimate(
+                {'profile': reference.get('profile'), 'filename': reference['original_name'],
+                 'size': reference['file_size']},
+                {'filename': file.filename, 'size': len(file_content)}
+            )
+            progress.start_phase('queued')
+            async with admission.admit(cost):
+                cancel = comparison_token(time_budget, progress)
+                start_time = time.perf_counter()
+                result, body, headers = await run_cancellable(request, cancel, run_comparison, cache_key, compute)
+        processing_time = time.perf_counter() - start_time
+        finish_progress(progress, result)
+        
+        if save:
+            # save_comparison también actualiza el uso de la referencia
+            comparison_id = db.save_comparison(db.build_comparison_record(
+                result, body, file.filename, len(file_content), processing_time, reference_id,
+                compare_file_path=keep_compared_file(file_content, file.filename),
+                changes=changes
+            ))
+            headers["X-Comparison-Id"] = str(comparison_id)
+        else:
+            db.update_reference_file_usage(reference_id)
+        
+        return JSONBytesResponse(content=body, headers=headers)
+    
+    except (AdmissionRejected, ComparisonCancelled):
+        raise
+    
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    except Exception as e:
+        logger.error(f"Error interno del servidor: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.post("/compare/workbook")
+async def compare_workbooks(
+    request: Request,
+    file1: UploadFile = File(..., description="Libro de referencia"),
+    file2: UploadFile = File(..., description="Libro a comparar"),
+    options: str = Form(None, description="Opciones de comparación en JSON"),
+    save: bool = False,
+    time_budget: float = None,
+    progress: ComparisonProgress = Depends(comparison_progress)
+):
+    """
+    Compara todas las hojas de dos libros de Excel (XLSX o XLS)
+
+    Las hojas se emparejan por nombre y, las restantes, por similitud de encabezados; los pares
+    se comparan en paralelo en un pool de procesos (WORKBOOK_WORKERS) con las mismas opciones
+    que /compare. El resultado incluye el reporte de cada hoja en "sheets", las hojas sin pareja
+    en "unmatchedSheets" y el resumen agregado del libro en "summary"
+    """
+    workbook = runtime.get_workbook_comparator()
+    contents = []
+    for file, label in ((file1, "de referencia"), (file2, "a comparar")):
+        if not file.filename or file.filename.lower().split('.')[-1] not in workbook.EXCEL_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Libro {label} no válido. Formatos permitidos: {', '.join(workbook.EXCEL_FORMATS)}"
+            )
+        content = await file.read()
+        if len(content) == 0:
+            raise HTTPException(status_code=400, detail=f"El libro {label} está vacío")
+        if len(content) > Config.MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El libro {label} es demasiado grande. Máximo: {Config.MAX_FILE_SIZE / 1024 / 1024:.1f} MB"
+            )
+        contents.append(content)
+    file1_content, file2_content = contents
+
+    comparison_options = parse_options(options)
+    logger.info(f"Comparando libros: {file1.filename} vs {file2.filename}")
+
+    try:
+        # Un acierto de la caché no necesita plaza de admisión (si no hay cambios que registrar)
+        from result_cache import content_checksum
+        changes = change_log(save, comparison_options)
+        start_time = time.perf_counter()
+        cache_key, hit = await run_in_threadpool(lambda: cached_comparison(
+            content_checksum(file1_content), file1.filename,
+            content_checksum(file2_content), file2.filename,
+            comparison_options, 'workbook', changes is None
+        ))
+        if hit is not None:
+            result, body, headers = hit
+        else:
+            admission = runtime.get_admission_controller()
+            cost = admission.estimate(
+                {'filename': file1.filename, 'size': len(file1_content)},
+                {'filename': file2.filename, 'size': len(file2_content)}
+            )
+            progress.start_phase('queued')
+            async with admission.admit(cost):
+                cancel = comparison_token(time_budget, progress)
+                start_time = time.perf_counter()
+                result, body, headers = await run_cancellable(
+                    request, cancel, run_comparison, cache_key,
+                    lambda: workbook.compare(
+                        file1_content, file1.filename, file2_content, file2.filename, comparison_options,
+                        cancel, changes
+                    )
+                )
+        processing_time = time.perf_counter() - start_time
+        finish_progress(progress, result)
+
+        if save:
+            db = runtime.get_database_manager()
+            comparison_id = db.save_comparison(db.build_comparison_record(
+                result, body, file2.filename, len(file2_content), processing_time,
+                compare_file_path=keep_compared_file(file2_content, file2.filename),
+                reference_file_path=keep_compared_file(file1_content, file1.filename),
+                changes=changes
+            ))
+            headers["X-Comparison-Id"] = str(comparison_id)
+
+        return JSONBytesResponse(content=body, headers=headers)
+
+    except (AdmissionRejected, ComparisonCancelled):
+        raise
+
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    except Exception as e:
+        logger.error(f"Error interno del servidor: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+@app.post("/quick-scan")
+async def quick_scan_files(
+    request: Request,
+    file1: UploadFile = File(..., description="Archivo de referencia"),
+    file2: UploadFile = File(..., description="Archivo a comparar"),
+    options: str = Form(None, description="Opciones de comparación en JSON"),
+    progress: ComparisonProgress = Depends(comparison_progress)
+):
+    """
+    Escaneo rápido y aproximado de dos archivos grandes
+    Estima el solapamiento de filas, las filas únicas y la tasa de cambio por columna con
+    márgenes de error, leyendo cada archivo por bloques en una sola pasada
+    """
+    for file, label in ((file1, "de referencia"), (file2, "a comparar")):
+        if not file.filename or file.filename.lower().split('.')[-1] not in Config.ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Archivo {label} no válido. Formatos permitidos: {', '.join(Config.ALLOWED_EXTENSIONS)}"
+            )
+        if file.size == 0:
+            raise HTTPException(status_code=400, detail=f"El archivo {label} está vacío")
+        if file.size is not None and file.size > Config.MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El archivo {label} es demasiado grande. Máximo: {Config.MAX_FILE_SIZE / 1024 / 1024:.1f} MB"
+            )
+
+    comparison_options = parse_options(options)
+    logger.info(f"Escaneo rápido: {file1.filename} vs {file2.filename}")
+
+    # La memoria del escaneo por bloques está acotada: su coste no pasa de STREAMING_COST
+    admission = runtime.get_admission_controller()
+    cost = min(admission.estimate(
+        {'filename': file1.filename, 'size': file1.size},
+        {'filename': file2.filename, 'size': file2.size}
+    ), admission.STREAMING_COST)
+    
+    # Se leen directamente los archivos temporales de la subida, sin copiarlos a memoria
+    try:
+        progress.start_phase('queued')
+        async with admission.admit(cost):
+            cancel = comparison_token(progress=progress)
+            result = await run_cancellable(
+                request, cancel, runtime.get_comparator().quick_scan,
+                file1.file, file1.filename, file2.file, file2.filename, comparison_options, cancel
+            )
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    return JSONBytesResponse(content=dumps(result))
+
+@app.post("/export")
+async def export_comparison(
+    format: str = "xlsx",
+    file1: UploadFile = File(..., description="Archivo de referencia"),
+    file2: UploadFile = File(..., description="Archivo a comparar"),
+    options: str = Form(None, description="Opciones de comparación en JSON")
+):
+    """
+    Endpoint para exportar el reporte completo de diferencias entre dos archivos
+    El reporte (CSV o XLSX) se genera y se descarga por partes, sin límite de filas
+    """
+    exporter = runtime.get_exporter()
+    try:
+        exporter.get_media_type(format)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    for file, label in ((file1, "de referencia"), (file2, "a comparar")):
+        if not file.filename or file.filename.lower().split('.')[-1] not in Config.ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Archivo {label} no válido. Formatos permitidos: {', '.join(Config.ALLOWED_EXTENSIONS)}"
+            )
+    
+    file1_content = await file1.read()
+    file2_content = await file2.read()
+    
+    for content, label in ((file1_content, "de referencia"), (file2_content, "a comparar")):
+        if len(content) == 0:
+            raise HTTPException(status_code=400, detail=f"El archivo {label} está vacío")
+        if len(content) > Config.MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El archivo {label} es demasiado grande. Máximo: {Config.MAX_FILE_SIZE / 1024 / 1024:.1f} MB"
+            )
+    
+    comparator = runtime.get_comparator()
+    comparison_options = parse_options(options)
+    filename = exporter.get_filename(file1.filename, file2.filename, format)
+    
+    # Si la caché tiene el resultado con todas sus diferencias, el reporte sale de ahí
+    # sin leer los archivos ni pedir una plaza de admisión
+    from result_cache import content_checksum
+    try:
+        _, hit = await run_in_threadpool(lambda: cached_comparison(
+            content_checksum(file1_content), file1.filename,
+            content_checksum(file2_content), file2.filename,
+            comparison_options
+        ))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if hit is not None and hit[0]['summary']['differences'] == len(hit[0]['differences']):
+        summary = hit[0]['summary']
+        metadata = {key: summary[key] for key in ('referenceRows', 'referenceColumns', 'compareRows', 'compareColumns')}
+        metadata.update({"referenceFileName": file1.filename, "compareFileName": file2.filename})
+        logger.info(f"Exportando reporte {format} desde la caché: {file1.filename} vs {file2.filename}")
+        return StreamingResponse(
+            exporter.stream(iter(hit[0]['differences']), format, metadata),
+            media_type=exporter.get_media_type(format),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Cache": "HIT"}
+        )
+    
+    # La plaza se conserva hasta terminar de enviar el reporte, que se genera mientras se descarga
+    admission = runtime.get_admission_controller()
+    cost = admission.estimate(
+        {'filename': file1.filename, 'size': len(file1_content)},
+        {'filename': file2.filename, 'size': len(file2_content)}
+    )
+    reservation = await admission.reserve(cost)
+    
+    def load():
+        resolved = comparator.resolve_options(comparison_options)
+        df1 = comparator.read_file(file1_content, file1.filename, resolved['columns'], resolved['ignore_columns'])
+        df2 = comparator.read_file(file2_content, file2.filename, resolved['columns'], resolved['ignore_columns'])
+        return (resolved, *comparator.prepare_dataframes(df1, df2, resolved))
+    
+    try:
+        comparison_options, df1, df2 = await run_in_threadpool(load)
+    except ValueError as ve:
+        await reservation.release(completed=False)
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except BaseException:
+        await reservation.release(completed=False)
+        raise
+    
+    logger.info(f"Exportando reporte {format}: {file1.filename} vs {file2.filename}")
+    
+    metadata = {
+        "referenceFileName": file1.filename,
+        "compareFileName": file2.filename,
+        "referenceRows": len(df1),
+        "referenceColumns": len(df1.columns),
+        "compareRows": len(df2),
+        "compareColumns": len(df2.columns)
+    }
+    
+    return ReservedStreamingResponse(
+        iterate_in_threadpool(
+            exporter.stream(comparator.iter_differences(df1, df2, comparison_options), format, metadata)
+        ),
+        reservation,
+        media_type=exporter.get_media_type(format),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.post("/validate-file")
-async def validate_file_endpoint(file: UploadFile = File(...)):
+async def validate_file_endpoint(file: UploadFile = File(...), reference_id: int = None, full: bool = False):
     """
     Endpoint para validar un archivo antes de la comparación
     Verifica formato, tamaño y contenido del archivo
+    Por defecto solo lee el encabezado y una muestra; las filas se cuentan sin construir el
+    DataFrame. Con full=true el archivo se carga completo como en la comparación
+    Con reference_id, verifica además la estructura contra el perfil guardado de esa
+    referencia, sin volver a leer el archivo de referencia
     """
     try:
         # Validar que el archivo tenga nombre
@@ -178,30 +789,58 @@ async def validate_file_endpoint(file: UploadFile = File(...)):
                 detail=f"Tipo de archivo no soportado: {extension}"
             )
         
-        # Leer y validar contenido del archivo
-        content = await file.read()
-        if len(content) == 0:
+        # Validar el tamaño sin leer el contenido en memoria
+        size = file.size if file.size is not None else len(await file.read())
+        if size == 0:
             raise HTTPException(status_code=400, detail="El archivo está vacío")
         
         # Verificar tamaño del archivo
-        if len(content) > Config.MAX_FILE_SIZE:
+        if size > Config.MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400, 
                 detail=f"El archivo es demasiado grande. Máximo: {Config.MAX_FILE_SIZE / 1024 / 1024:.1f} MB"
             )
         
-        # Intentar leer el archivo para verificar que sea válido
-        df = comparator.read_file(content, file.filename)
+        if full:
+            # Leer el archivo completo para verificar que sea válido
+            await file.seek(0)
+            df = runtime.get_comparator().read_file(await file.read(), file.filename)
+            inspection = {
+                "rows": len(df),
+                "columns": len(df.columns),
+                "column_names": [str(col).strip() for col in df.columns],
+                "dtypes": {str(col).strip(): str(dtype) for col, dtype in df.dtypes.items()}
+            }
+        else:
+            # Encabezado, muestra y conteo de registros directamente sobre el archivo temporal
+            inspection = runtime.get_inspector().inspect(file.file, file.filename)
         
-        return {
+        validation = {
             "valid": True,
             "filename": file.filename,
-            "rows": len(df),
-            "columns": len(df.columns),
-            "column_names": df.columns.tolist()[:10],  # Mostrar solo las primeras 10 columnas
-            "size_bytes": len(content)
+            "rows": inspection["rows"],
+            "columns": inspection["columns"],
+            "column_names": inspection["column_names"][:10],  # Mostrar solo las primeras 10 columnas
+            "size_bytes": size,
+            "validation_mode": "full" if full else "header"
         }
         
+        if reference_id is not None:
+            reference = runtime.get_database_manager().get_reference_file(reference_id)
+            if not reference or not reference.get("profile"):
+                raise ValueError(f"No hay perfil disponible para el archivo de referencia {reference_id}")
+            
+            profiler = runtime.get_profiler()
+            profile = reference["profile"]
+            validation["reference_check"] = profiler.check_structure(
+                profile, inspection["column_names"], inspection["dtypes"]
+            )
+            validation["reference_check"]["estimated_memory_bytes"] = profiler.estimate_comparison_memory(
+                profile, other_file_size=size
+            )
+        
+        return validation
+        
     except Exception as e:
         logger.error(f"Error validando archivo {file.filename}: {str(e)}")
         return {
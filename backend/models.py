@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, LargeBinary, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import json
+import os
 
 Base = declarative_base()
 
@@ -22,8 +23,15 @@ class ReferenceFile(Base):
     upload_date = Column(DateTime, default=datetime.utcnow)
     last_used = Column(DateTime)
     usage_count = Column(Integer, default=0)
-    checksum = Column(String(32))
+    checksum = Column(String(64), index=True)  # SHA-256 del contenido (MD5 en registros antiguos)
     is_active = Column(Boolean, default=True)
+    profile_data = Column(Text)  # JSON
+    schema_fingerprint = Column(String(64))
+    # Preprocesamiento en segundo plano: pending, processing, ready o error
+    status = Column(String(20), default='pending')
+    status_message = Column(Text)
+    processed_date = Column(DateTime)
+    processing_started = Column(DateTime)  # Inicio del preprocesamiento en curso (para detectar uno interrumpido)
     
     # Relación con comparaciones
     comparisons = relationship("Comparison", back_populates="reference_file")
@@ -44,7 +52,13 @@ class ReferenceFile(Base):
             'last_used': self.last_used.isoformat() if self.last_used else None,
             'usage_count': self.usage_count,
             'checksum': self.checksum,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'schema_fingerprint': self.schema_fingerprint,
+            'status': self.status or 'pending',
+            'status_message': self.status_message,
+            'processed_date': self.processed_date.isoformat() if self.processed_date else None,
+            'processing_started': self.processing_started.isoformat() if self.processing_started else None,
+            'profile': json.loads(self.profile_data) if self.profile_data else None
         }
 
 class Comparison(Base):
@@ -54,6 +68,7 @@ class Comparison(Base):
     reference_file_id = Column(Integer, ForeignKey('reference_files.id'))
     compare_file_name = Column(String(255), nullable=False)
     compare_file_path = Column(Text)
+    reference_file_path = Column(Text)  # Referencia subida con la comparación (sin archivo de la biblioteca)
     compare_file_size = Column(Integer)
     comparison_date = Column(DateTime, default=datetime.utcnow)
     processing_time = Column(Float, nullable=False)
@@ -68,6 +83,8 @@ class Comparison(Base):
     identical = Column(Boolean, default=False)
     result_data = Column(Text)  # JSON
     summary_data = Column(Text)  # JSON
+    changes_recorded = Column(Integer)  # Filas en comparison_changes (None: sin 'record_changes')
+    changes_total = Column(Integer)  # Cambios de la comparación; si supera changes_recorded, el registro está truncado
     exported = Column(Boolean, default=False)
     export_format = Column(String(50))
     export_date = Column(DateTime)
@@ -93,6 +110,9 @@ class Comparison(Base):
             'unique_in_reference': self.unique_in_reference,
             'unique_in_compare': self.unique_in_compare,
             'identical': self.identical,
+            'changes_recorded': self.changes_recorded,
+            'changes_total': self.changes_total,
+            'changes_truncated': (self.changes_recorded or 0) < (self.changes_total or 0),
             'exported': self.exported,
             'export_format': self.export_format,
             'export_date': self.export_date.isoformat() if self.export_date else None,
@@ -105,6 +125,27 @@ class Comparison(Base):
         
         return result
 
+class ChangeValue(Base):
+    __tablename__ = 'change_values'
+    
+    # Cada valor de celda del registro de cambios se guarda una sola vez
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    value = Column(Text, nullable=False, unique=True)
+
+class ComparisonChange(Base):
+    __tablename__ = 'comparison_changes'
+    # Búsquedas en todo el historial por columna y clave de fila ("quién cambió IP_Address de PC-HR-001")
+    __table_args__ = (Index('ix_comparison_changes_column_key', 'column_name', 'row_key'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    comparison_id = Column(Integer, ForeignKey('comparisons.id'), nullable=False, index=True)
+    sheet = Column(String(255))  # Hoja, en las comparaciones de libros de Excel
+    column_name = Column(String(255))
+    row_key = Column(String(255), index=True)
+    change_type = Column(String(30), nullable=False)
+    old_value_id = Column(Integer, ForeignKey('change_values.id'))
+    new_value_id = Column(Integer, ForeignKey('change_values.id'))
+
 class AppSetting(Base):
     __tablename__ = 'app_settings'
     
@@ -145,14 +186,57 @@ class ActivityLog(Base):
             'error_message': self.error_message
         }
 
+class ComparisonCache(Base):
+    __tablename__ = 'comparison_cache'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Huella de (contenido de ambos archivos, opciones, versión del motor)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    result_data = Column(LargeBinary, nullable=False)  # Resultado ya codificado en JSON
+    size_bytes = Column(Integer, nullable=False)
+    engine_version = Column(String(20))
+    created_date = Column(DateTime, default=datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'cache_key': self.cache_key,
+            'size_bytes': self.size_bytes,
+            'engine_version': self.engine_version,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'last_accessed': self.last_accessed.isoformat() if self.last_accessed else None,
+            'hit_count': self.hit_count
+        }
+
 # Configuración de la base de datos
 class DatabaseConfig:
     def __init__(self, db_path="altice_comparator.db"):
+        self.db_path = db_path
         self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
     def create_tables(self):
         Base.metadata.create_all(bind=self.engine)
+        self.add_missing_columns()
+        
+    def add_missing_columns(self):
+        """
+        Agrega a las tablas existentes las columnas nuevas de los modelos
+        create_all no modifica tablas ya creadas (por ejemplo, por la aplicación Electron)
+        """
+        inspector = inspect(self.engine)
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing = {col['name'] for col in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        
+    def get_reference_files_dir(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), 'reference_files')
         
     def get_session(self):
         return self.SessionLocal()
\ No newline at end of file
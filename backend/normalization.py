@@ -0,0 +1,184 @@
+import pandas as pd
+from typing import Dict, List, Any, Callable, Union
+
+# Perfiles de normalización con nombre, reutilizables desde las opciones de comparación
+# Las reglas de '*' se aplican a todas las columnas, antes que las reglas propias de cada columna
+NORMALIZATION_PROFILES = {
+    'basico': {
+        '*': ['strip']
+    },
+    'inventario': {
+        '*': ['strip', 'nulls'],
+        'Nombre_Maquina': ['upper'],
+        'IP_Address': ['ip'],
+        'Departamento': ['casefold'],
+        'Estado': ['casefold'],
+        'Ultimo_Acceso': ['datetime:dayfirst'],
+        'Usuario_Responsable': ['collapse_spaces', 'casefold']
+    }
+}
+
+# Valores que la regla 'nulls' considera vacíos (incluye el texto que deja astype(str))
+NULL_VALUES = ['', 'nan', 'NaN', 'None', 'NULL', 'null', 'NaT', '<NA>', 'N/A']
+
+IPV4_PATTERN = r'^\s*(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})\s*$'
+
+def _strip(values: pd.Series) -> pd.Series:
+    return values.str.strip()
+
+def _casefold(values: pd.Series) -> pd.Series:
+    return values.str.casefold()
+
+def _upper(values: pd.Series) -> pd.Series:
+    return values.str.upper()
+
+def _collapse_spaces(values: pd.Series) -> pd.Series:
+    return values.str.replace(r'\s+', ' ', regex=True)
+
+def _nulls(values: pd.Series) -> pd.Series:
+    return values.mask(values.isin(NULL_VALUES), '')
+
+def _ip(values: pd.Series) -> pd.Series:
+    """192.168.001.010 -> 192.168.1.10; los valores que no son IPv4 no se modifican"""
+    octets = values.str.extract(IPV4_PATTERN)
+    matched = octets[0].notna()
+    if not matched.any():
+        return values
+    canonical = octets[matched].astype(int).astype(str).agg('.'.join, axis=1)
+    result = values.copy()
+    result[matched] = canonical
+    return result
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _datetime(values: pd.Series, order: str = '') -> pd.Series:
+    """
+    Convierte fechas en cualquier formato reconocible a un formato canónico
+    Con 'datetime:dayfirst', 05/01/2024 se interpreta como 5 de enero
+    """
+    # Las fechas ISO se leen aparte: con dayfirst, pandas invertiría también 2024-01-05
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    pending = parsed.isna()
+    if pending.any():
+        parsed[pending] = pd.to_datetime(
+            values[pending], errors='coerce', format='mixed', dayfirst=order == 'dayfirst'
+        )
+    valid = parsed.notna()
+    if not valid.any():
+        return values
+    result = values.copy()
+    result[valid] = parsed[valid].dt.strftime(DATETIME_FORMAT)
+    return result
+
+def _round(values: pd.Series, decimals: str = '0') -> pd.Series:
+    """Redondea los valores numéricos; 1.50, 1.5 y 1.499 (con 2 decimales) quedan iguales"""
+    digits = int(decimals)
+    numbers = pd.to_numeric(values, errors='coerce')
+    valid = numbers.notna()
+    if not valid.any():
+        return values
+    result = values.copy()
+    result[valid] = numbers[valid].round(digits).map(lambda number: f'{number:.{digits}f}')
+    return result
+
+RULES: Dict[str, Callable[..., pd.Series]] = {
+    'strip': _strip,
+    'casefold': _casefold,
+    'lower': _casefold,
+    'upper': _upper,
+    'collapse_spaces': _collapse_spaces,
+    'nulls': _nulls,
+    'ip': _ip,
+    'datetime': _datetime,
+    'round': _round
+}
+
+class NormalizationPipeline:
+    """
+    Conjunto de reglas de normalización por columna
+    Se declara una vez y se compila en una lista de operaciones vectorizadas por columna
+    """
+
+    def __init__(self, spec: Dict[str, List[str]], name: str = 'personalizado'):
+        self.name = name
+        self.spec = spec
+        self.default_rules = self._compile_rules(spec.get('*', []))
+        self.column_rules = {
+            str(col).strip(): self._compile_rules(rules)
+            for col, rules in spec.items() if col != '*'
+        }
+
+    def _compile_rules(self, rules: List[str]) -> List[Callable[[pd.Series], pd.Series]]:
+        """Convierte 'regla' o 'regla:argumento' en funciones listas para aplicar"""
+        if isinstance(rules, str):
+            rules = [rules]
+
+        compiled = []
+        for rule in rules:
+            rule_name, _, argument = str(rule).partition(':')
+            function = RULES.get(rule_name.strip())
+            if function is None:
+                raise ValueError(
+                    f"Regla de normalización desconocida: {rule_name}. "
+                    f"Reglas disponibles: {', '.join(RULES)}"
+                )
+            if argument:
+                compiled.append(lambda values, f=function, a=argument: f(values, a))
+            else:
+                compiled.append(function)
+        return compiled
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normaliza un DataFrame de cadenas (resultado de astype(str))
+        Solo se reemplazan las columnas afectadas por alguna regla
+        """
+        normalized = {}
+        for col in df.columns:
+            rules = self.default_rules + self.column_rules.get(col, [])
+            if not rules:
+                continue
+            values = df[col]
+            for rule in rules:
+                values = rule(values)
+            normalized[col] = values
+
+        if not normalized:
+            return df
+
+        # Copia superficial: las columnas no normalizadas no se duplican en memoria
+        result = df.copy(deep=False)
+        for col, values in normalized.items():
+            result[col] = values
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        return {'name': self.name, 'rules': self.spec}
+
+_compiled_profiles: Dict[str, NormalizationPipeline] = {}
+
+def get_pipeline(normalization: Union[str, Dict[str, List[str]], None]):
+    """
+    Retorna el pipeline para un perfil con nombre o una especificación propia
+    Los perfiles con nombre se compilan una sola vez por proceso
+    """
+    if not normalization:
+        return None
+
+    if isinstance(normalization, dict):
+        return NormalizationPipeline(normalization)
+
+    if normalization not in NORMALIZATION_PROFILES:
+        raise ValueError(
+            f"Perfil de normalización desconocido: {normalization}. "
+            f"Perfiles disponibles: {', '.join(NORMALIZATION_PROFILES)}"
+        )
+    if normalization not in _compiled_profiles:
+        _compiled_profiles[normalization] = NormalizationPipeline(NORMALIZATION_PROFILES[normalization], normalization)
+    return _compiled_profiles[normalization]
+
+def list_profiles() -> Dict[str, Any]:
+    return {
+        'profiles': NORMALIZATION_PROFILES,
+        'rules': sorted(RULES)
+    }
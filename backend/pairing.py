@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+from sketches import mix64 as _mix
+
+# Firma MinHash: BANDS bandas de ROWS_PER_BAND hashes cada una
+# Dos filas con la mitad de sus columnas iguales comparten alguna banda con probabilidad ~0.99
+BANDS = 16
+ROWS_PER_BAND = 2
+
+# Las cubetas con más filas que esto (valores muy repetidos) no generan candidatos
+MAX_BUCKET_SIZE = 32
+
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def column_tokens(column_hashes: np.ndarray) -> np.ndarray:
+    """
+    Convierte la matriz (filas, columnas) de hashes de valor en tokens 'columna=valor'
+    El mismo valor en columnas distintas produce tokens distintos
+    """
+    salts = _mix(np.arange(1, column_hashes.shape[1] + 1, dtype=np.uint64) * _MULTIPLIER)
+    return _mix(column_hashes ^ salts)
+
+def minhash_signatures(tokens: np.ndarray) -> np.ndarray:
+    """Firma MinHash (filas, BANDS * ROWS_PER_BAND) del conjunto de tokens de cada fila"""
+    size = BANDS * ROWS_PER_BAND
+    signatures = np.empty((tokens.shape[0], size), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(size):
+            seed = _mix(np.uint64(k + 1) * _MULTIPLIER)
+            signatures[:, k] = _mix(tokens ^ seed).min(axis=1)
+    return signatures
+
+def _band_keys(signatures: np.ndarray, band: int) -> np.ndarray:
+    columns = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+    keys = np.zeros(len(signatures), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(ROWS_PER_BAND):
+            keys = _mix(keys ^ columns[:, k])
+    return keys
+
+def _candidates(signatures1: np.ndarray, signatures2: np.ndarray) -> pd.DataFrame:
+    """Pares (left, right) que coinciden en al menos una banda (índice LSH por bandas)"""
+    candidates = []
+    for band in range(BANDS):
+        left = pd.DataFrame({'key': _band_keys(signatures1, band), 'left': np.arange(len(signatures1))})
+        right = pd.DataFrame({'key': _band_keys(signatures2, band), 'right': np.arange(len(signatures2))})
+        left = left[left.groupby('key')['key'].transform('size') <= MAX_BUCKET_SIZE]
+        right = right[right.groupby('key')['key'].transform('size') <= MAX_BUCKET_SIZE]
+        candidates.append(left.merge(right, on='key')[['left', 'right']])
+    return pd.concat(candidates, ignore_index=True).drop_duplicates()
+
+def pair_similar_rows(column_hashes1: np.ndarray, column_hashes2: np.ndarray,
+                      min_similarity: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Empareja filas de ambos lados que probablemente son el mismo registro con cambios
+    Los candidatos salen del índice LSH (sin comparar todos contra todos) y se puntúan por la
+    fracción de columnas iguales; cada fila se empareja como máximo una vez, mejores pares primero
+    Retorna (posiciones izquierda, posiciones derecha, similitud)
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if not len(column_hashes1) or not len(column_hashes2):
+        return empty
+
+    with np.errstate(over='ignore'):
+        signatures1 = minhash_signatures(column_tokens(column_hashes1))
+        signatures2 = minhash_signatures(column_tokens(column_hashes2))
+
+    candidates = _candidates(signatures1, signatures2)
+    if candidates.empty:
+        return empty
+
+    left = candidates['left'].to_numpy()
+    right = candidates['right'].to_numpy()
+    similarity = (column_hashes1[left] == column_hashes2[right]).mean(axis=1)
+
+    keep = similarity >= min_similarity
+    order = np.argsort(-similarity[keep], kind='stable')
+    left, right, similarity = left[keep][order], right[keep][order], similarity[keep][order]
+
+    # Asignación voraz uno a uno: solo se recorren los candidatos que superan el umbral
+    used_left, used_right = set(), set()
+    chosen = []
+    for k, (i, j) in enumerate(zip(left.tolist(), right.tolist())):
+        if i not in used_left and j not in used_right:
+            used_left.add(i)
+            used_right.add(j)
+            chosen.append(k)
+
+    chosen = np.array(chosen, dtype=np.int64)
+    return left[chosen], right[chosen], similarity[chosen]
@@ -0,0 +1,172 @@
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional, MutableMapping
+
+logger = logging.getLogger(__name__)
+
+# Errores de un almacén compartido cuyo proceso ya no responde (p. ej. el supervisor se está deteniendo)
+STORE_ERRORS = (OSError, EOFError)
+
+class ComparisonProgress:
+    """
+    Progreso de una comparación, publicado como instantáneas
+    El motor informa de cada fase y de las filas procesadas en cada bloque; la instantánea solo se
+    reconstruye cada PUBLISH_INTERVAL segundos, así el coste por bloque es una resta de tiempos
+    Los lectores (el canal SSE) comparan version para saber si hay una instantánea nueva
+    Con un almacén compartido (store) cada instantánea se publica también allí, así un lector en
+    otro proceso trabajador la ve con refresh()
+    """
+
+    # Segundos mínimos entre dos instantáneas dentro de una misma fase
+    PUBLISH_INTERVAL = 0.25
+
+    # Estados finales: el canal se cierra después de enviarlos
+    # ('incomplete': resultado parcial porque se agotó el plazo o se canceló durante el contenido)
+    FINISHED = ('completed', 'incomplete', 'cancelled', 'error')
+
+    def __init__(self, progress_id: Optional[str] = None, store: Optional[MutableMapping] = None):
+        self.progress_id = progress_id
+        self._store = store if progress_id else None
+        self.version = 0
+        self.updated = time.monotonic()
+        self._started = None
+        self._phase = None
+        self._phase_started = None
+        self._total = None
+        self._done = 0
+        self._tally = None
+        self._last_publish = 0.0
+        self.snapshot: Dict[str, Any] = {}
+        self._publish(self.updated, 'waiting', shared=False)
+        if self._store is not None:
+            # Si otro proceso ya abrió este identificador se continúa desde su versión
+            self._adopt(self._shared(lambda: self._store.setdefault(self.progress_id, self._entry())))
+
+    def start_phase(self, phase: str, total: Optional[int] = None):
+        """Cambio de fase; total son las filas que la fase recorrerá, si se conocen"""
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        self._phase, self._phase_started, self._total, self._done = phase, now, total, 0
+        self._publish(now)
+
+    def advance(self, rows: int):
+        """Filas procesadas en la fase actual; llamado por bloque desde el bucle del motor"""
+        self._done += rows
+        now = time.monotonic()
+        if now - self._last_publish >= self.PUBLISH_INTERVAL:
+            self._publish(now)
+
+    def track(self, tally):
+        """Cuenta de diferencias por tipo que se incluye, tal como va, en cada instantánea"""
+        self._tally = tally
+
+    def finish(self, status: str, detail: Optional[str] = None):
+        """Publica el estado final; solo cuenta el primero"""
+        if self.snapshot['status'] not in self.FINISHED:
+            self._publish(time.monotonic(), status, detail)
+
+    def refresh(self):
+        """Trae la última instantánea del almacén compartido, publicada quizá por otro proceso"""
+        if self._store is not None:
+            self._adopt(self._shared(lambda: self._store.get(self.progress_id)))
+
+    def _adopt(self, entry: Optional[Dict[str, Any]]):
+        if entry and entry['version'] > self.version:
+            self.snapshot = entry['snapshot']
+            self.version = entry['version']
+            self.updated = time.monotonic()
+
+    def _entry(self) -> Dict[str, Any]:
+        # En el almacén la hora es de reloj de pared: el monotónico no se compara entre procesos
+        return {'version': self.version, 'updated': time.time(), 'snapshot': self.snapshot}
+
+    def _shared(self, operation):
+        """Operación sobre el almacén compartido; si falla, el progreso sigue solo en este proceso"""
+        try:
+            return operation()
+        except STORE_ERRORS as e:
+            logger.debug(f"Almacén de progreso no disponible: {e}")
+            return None
+
+    def _publish(self, now: float, status: str = 'running', detail: Optional[str] = None, shared: bool = True):
+        elapsed = now - self._phase_started if self._phase_started is not None else 0.0
+        throughput = self._done / elapsed if elapsed > 0 else None
+        eta = None
+        if throughput and self._total is not None:
+            eta = round(max(self._total - self._done, 0) / throughput, 1)
+
+        snapshot = {
+            'status': status,
+            'phase': self._phase,
+            'rows_processed': self._done,
+            'rows_total': self._total,
+            'rows_per_second': round(throughput) if throughput else None,
+            'eta_seconds': eta,
+            'elapsed_seconds': round(now - self._started, 3) if self._started is not None else 0.0,
+            'differences': dict(self._tally.counts) if self._tally is not None else {},
+            'total_differences': self._tally.total if self._tally is not None else 0
+        }
+        if detail:
+            snapshot['detail'] = detail
+
+        # Asignar la instantánea antes de la versión: un lector que ve la versión nueva ve sus datos
+        self.snapshot = snapshot
+        self.version += 1
+        self.updated = now
+        self._last_publish = now
+        if shared and self._store is not None:
+            entry = self._entry()
+            self._shared(lambda: self._store.__setitem__(self.progress_id, entry))
+
+class ProgressRegistry:
+    """
+    Progreso de las comparaciones por identificador
+    El cliente elige el identificador y puede abrir el canal antes o después de lanzar la comparación
+    Con varios trabajadores (start_production.py) el canal y la comparación pueden caer en procesos
+    distintos: store es entonces el diccionario compartido que crea el supervisor
+    """
+
+    # Segundos que se conserva un progreso terminado o que nunca empezó
+    RETENTION_SECONDS = 300
+
+    def __init__(self, store: Optional[MutableMapping] = None):
+        self._entries: Dict[str, ComparisonProgress] = {}
+        self._store = store
+        self._lock = threading.Lock()
+
+    def open(self, progress_id: Optional[str] = None) -> ComparisonProgress:
+        """Progreso con ese identificador, creado si no existe; sin identificador no se registra"""
+        if not progress_id:
+            return ComparisonProgress()
+        with self._lock:
+            self._purge()
+            progress = self._entries.get(progress_id)
+            if progress is None:
+                progress = self._entries[progress_id] = ComparisonProgress(progress_id, self._store)
+            return progress
+
+    def _purge(self):
+        limit = time.monotonic() - self.RETENTION_SECONDS
+        # Las comparaciones en curso se conservan aunque una fase larga no publique nada
+        expired = [
+            key for key, progress in self._entries.items()
+            if progress.updated < limit and progress.snapshot['status'] != 'running'
+        ]
+        for progress_id in expired:
+            del self._entries[progress_id]
+        if self._store is not None:
+            self._purge_store()
+
+    def _purge_store(self):
+        limit = time.time() - self.RETENTION_SECONDS
+        try:
+            expired = [
+                key for key, entry in self._store.items()
+                if entry['updated'] < limit and entry['snapshot']['status'] != 'running'
+            ]
+            for progress_id in expired:
+                self._store.pop(progress_id, None)
+        except STORE_ERRORS as e:
+            logger.debug(f"Almacén de progreso no disponible: {e}")
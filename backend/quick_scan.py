@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any
+
+from sketches import KMVSketch, mix64
+
+# Valor z para intervalos de confianza del 95 %
+Z_95 = 1.96
+
+class ScanSide:
+    """
+    Estado acumulado de un archivo durante el escaneo rápido
+    Sketch KMV de los hashes de fila y muestra de reserva por prioridad de posición
+    """
+
+    def __init__(self, sketch_size: int, sample_size: int):
+        self.rows = 0
+        self.sketch = KMVSketch(sketch_size)
+        self.sample_size = sample_size
+        self.sample_priorities = np.empty(0, dtype=np.uint64)
+        self.sample_positions = np.empty(0, dtype=np.int64)
+        self.sample_values = np.empty((0, 0), dtype=object)
+
+    def update(self, row_hashes: np.ndarray, frame: pd.DataFrame):
+        """
+        Agrega un bloque de filas (hashes de fila y columnas comunes)
+        Solo se copian los valores de las filas que entran en la muestra
+        """
+        positions = np.arange(self.rows, self.rows + len(row_hashes), dtype=np.int64)
+        self.rows += len(row_hashes)
+        self.sketch.update(row_hashes)
+
+        # Muestra de reserva por prioridad: se conservan las posiciones con menor hash de posición
+        # Ambos archivos usan la misma función, así que las posiciones muestreadas coinciden
+        priorities = mix64(positions.astype(np.uint64) + np.uint64(1))
+        if len(priorities) > self.sample_size:
+            # Dentro del bloque basta con los sample_size de menor prioridad
+            keep = np.argpartition(priorities, self.sample_size - 1)[:self.sample_size]
+        else:
+            keep = np.arange(len(priorities))
+        if len(self.sample_priorities) >= self.sample_size:
+            keep = keep[priorities[keep] < self.sample_priorities.max()]
+            if not len(keep):
+                return
+        priorities, positions = priorities[keep], positions[keep]
+        values = frame.iloc[keep].to_numpy(dtype=object)
+
+        if self.sample_values.shape[0] == 0:
+            self.sample_values = np.empty((0, values.shape[1]), dtype=object)
+        priorities = np.concatenate([self.sample_priorities, priorities])
+        positions = np.concatenate([self.sample_positions, positions])
+        values = np.concatenate([self.sample_values, values])
+        if len(priorities) > self.sample_size:
+            selected = np.argpartition(priorities, self.sample_size - 1)[:self.sample_size]
+            priorities, positions, values = priorities[selected], positions[selected], values[selected]
+
+        self.sample_priorities, self.sample_positions, self.sample_values = priorities, positions, values
+
+    def distinct_rows(self) -> Dict[str, Any]:
+        return _estimate(self.sketch.estimate(), self.sketch.estimate() * self.sketch.relative_error() * Z_95)
+
+def _estimate(value: float, error: float) -> Dict[str, Any]:
+    return {'estimate': int(round(value)), 'error': int(round(error))}
+
+def summarize(reference: ScanSide, compare: ScanSide, common_cols: List[str],
+              columns_only_in_reference: List[str], columns_only_in_compare: List[str]) -> Dict[str, Any]:
+    """
+    Combina los sketches y las muestras de ambos archivos en estimaciones con márgenes de error (95 %)
+    Las filas comunes y únicas se cuentan como filas distintas
+    """
+    union = reference.sketch.merge(compare.sketch)
+    union_estimate = union.estimate()
+    jaccard = reference.sketch.jaccard(compare.sketch)
+    exact = reference.sketch.is_exact() and compare.sketch.is_exact()
+
+    # Error del Jaccard estimado con los k mínimos de la unión (proporción binomial)
+    jaccard_error = 0.0 if exact else Z_95 * np.sqrt(jaccard * (1 - jaccard) / max(len(union.values), 1))
+    union_error = union_estimate * union.relative_error() * Z_95
+    common = jaccard * union_estimate
+    common_error = jaccard_error * union_estimate + jaccard * union_error
+
+    distinct1 = reference.sketch.estimate()
+    distinct2 = compare.sketch.estimate()
+
+    # Tasa de cambio por columna sobre las posiciones muestreadas en ambos archivos
+    shared, in_reference, in_compare = np.intersect1d(
+        reference.sample_positions, compare.sample_positions, return_indices=True
+    )
+    sampled = len(shared)
+    column_rates = []
+    if sampled and common_cols:
+        changed = reference.sample_values[in_reference] != compare.sample_values[in_compare]
+        for position, col in enumerate(common_cols):
+            rate = float(changed[:, position].mean())
+            column_rates.append({
+                'column': col,
+                'change_rate': round(rate, 4),
+                'error': round(Z_95 * float(np.sqrt(rate * (1 - rate) / sampled)), 4),
+                'sampled_rows': sampled
+            })
+
+    likely_identical = (
+        reference.rows == compare.rows
+        and not columns_only_in_reference and not columns_only_in_compare
+        and (jaccard == 1.0 or len(union.values) == 0)
+        and all(rate['change_rate'] == 0 for rate in column_rates)
+    )
+
+    return {
+        'likely_identical': likely_identical,
+        'exact': exact,
+        'reference': {'rows': reference.rows, 'distinct_rows': reference.distinct_rows()},
+        'compare': {'rows': compare.rows, 'distinct_rows': compare.distinct_rows()},
+        'row_overlap': {
+            'jaccard': {'estimate': round(jaccard, 4), 'error': round(float(jaccard_error), 4)},
+            'common_rows': _estimate(common, common_error),
+            'unique_in_reference': _estimate(max(distinct1 - common, 0), common_error),
+            'unique_in_compare': _estimate(max(distinct2 - common, 0), common_error)
+        },
+        'column_change_rates': column_rates,
+        'columns_only_in_reference': columns_only_in_reference,
+        'columns_only_in_compare': columns_only_in_compare,
+        'sketch_size': reference.sketch.k,
+        'sampled_rows': sampled
+    }
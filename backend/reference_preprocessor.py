@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import logging
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class RowHashIndex:
+    """
+    Hashes de fila precalculados para un DataFrame de referencia preparado
+    Se guarda en df.attrs y solo se usa si se comparan exactamente las mismas columnas
+    """
+
+    def __init__(self, columns: List[str], hashes: np.ndarray):
+        self.columns = list(columns)
+        self.hashes = hashes
+
+    def matches(self, df, columns: List[str]) -> bool:
+        return list(columns) == self.columns and len(df) == len(self.hashes)
+
+    def __deepcopy__(self, memo):
+        # pandas puede copiar attrs en cada operación: el índice es inmutable y se comparte
+        return self
+
+class ReferencePreprocessor:
+    """
+    Cola de preprocesamiento de los archivos de referencia
+    Un hilo de fondo lee cada archivo subido, calcula su perfil y guarda en caché el DataFrame
+    preparado (Parquet) y sus hashes de fila; al terminar el archivo queda en estado 'ready'
+    """
+
+    def __init__(self, database_manager, comparator, profiler, store):
+        self.database_manager = database_manager
+        self.comparator = comparator
+        self.profiler = profiler
+        self.store = store
+        self.cache_dir = os.path.join(store.root_dir, 'cache')
+        self._queue: 'queue.Queue[int]' = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, file_id: int):
+        """Encola un archivo de referencia; el hilo de trabajo se crea con el primer envío"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='reference-preprocessor', daemon=True)
+                self._thread.start()
+        self._queue.put(file_id)
+
+    def submit_pending(self) -> int:
+        """Encola los archivos que quedaron pendientes (subidos antes de reiniciar el servidor)"""
+        pending = self.database_manager.get_pending_reference_ids()
+        for file_id in pending:
+            self.submit(file_id)
+        return len(pending)
+
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            file_id = self._queue.get()
+            try:
+                self.process(file_id)
+            finally:
+                self._queue.task_done()
+
+    def cache_paths(self, checksum: str) -> Dict[str, str]:
+        # La versión del motor forma parte del nombre: un cambio de motor invalida la caché
+        base = os.path.join(self.cache_dir, f"{checksum}.{self.comparator.ENGINE_VERSION}")
+        return {'frame': f"{base}.parquet", 'hashes': f"{base}.hashes.npy"}
+
+    def has_cache(self, reference: Dict[str, Any]) -> bool:
+        if not reference.get('checksum'):
+            return False
+        paths = self.cache_paths(reference['checksum'])
+        return os.path.exists(paths['frame']) and os.path.exists(paths['hashes'])
+
+    def process(self, file_id: int) -> bool:
+        """Preprocesa un archivo de referencia; retorna False si otro proceso ya lo tomó"""
+        reference = self.database_manager.claim_reference_processing(file_id)
+        if reference is None:
+            return False
+
+        try:
+            # Solo se construye la caché a partir de un archivo que coincide con su huella
+            self.store.verify(reference['file_path'], reference['checksum'])
+            df = self.comparator.read_path(reference['file_path'])
+            profile = self.profiler.profile(df)
+            self.database_manager.update_reference_profile(file_id, profile)
+
+            if reference.get('checksum') and not self.has_cache(reference):
+                self._write_cache(reference['checksum'], *self.comparator.prepare_reference(df))
+
+            self.database_manager.set_reference_status(file_id, 'ready')
+            logger.info(f"Archivo de referencia {file_id} preprocesado ({profile['row_count']} filas)")
+        except Exception as e:
+            logger.error(f"Error al preprocesar el archivo de referencia {file_id}: {e}")
+            self.database_manager.set_reference_status(file_id, 'error', str(e))
+        return True
+
+    def _write_cache(self, checksum: str, df, hashes: np.ndarray):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        paths = self.cache_paths(checksum)
+        # Escribir en temporales y renombrar: un lector nunca ve una caché a medias
+        for key, write in (
+            ('hashes', lambda target: np.save(target, hashes, allow_pickle=False)),
+            ('frame', lambda target: pq.write_table(pa.Table.from_pandas(df, preserve_index=False), target))
+        ):
+            temp_path = f"{paths[key]}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as target:
+                write(target)
+            os.replace(temp_path, paths[key])
+
+    def load(self, reference: Dict[str, Any], columns: Optional[List[str]] = None,
+             ignore_columns: Optional[List[str]] = None):
+        """
+        Carga un archivo de referencia para compararlo
+        Desde la caché si existe (DataFrame ya preparado y, con todas las columnas, su índice de hashes);
+        si no, se verifica la huella y se lee el archivo original
+        """
+        if self.has_cache(reference):
+            paths = self.cache_paths(reference['checksum'])
+            df = self.comparator.read_path(paths['frame'], columns, ignore_columns)
+            df.attrs['prepared_by'] = self.comparator.ENGINE_VERSION
+            if not columns and not ignore_columns:
+                df.attrs['row_hash_index'] = RowHashIndex(df.columns, np.load(paths['hashes']))
+            return df
+
+        self.store.verify(reference['file_path'], reference.get('checksum'))
+        return self.comparator.read_path(reference['file_path'], columns, ignore_columns)
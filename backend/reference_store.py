@@ -0,0 +1,80 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Dict, Any, Optional
+
+class ReferenceStore:
+    """
+    Almacén de archivos de referencia direccionado por contenido
+    Cada archivo se guarda como <raíz>/<2 primeros caracteres>/<sha256>.<extensión>,
+    así dos subidas idénticas comparten el mismo archivo y los nombres nunca colisionan
+    """
+
+    # Tamaño de los bloques copiados y resumidos a la vez
+    BLOCK_BYTES = 1024 * 1024
+
+    # Algoritmo según la longitud de la huella (los registros antiguos pueden usar MD5)
+    ALGORITHMS = {64: 'sha256', 32: 'md5'}
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def path_for(self, checksum: str, extension: str) -> str:
+        return os.path.join(self.root_dir, checksum[:2], f"{checksum}.{extension.lower().lstrip('.')}")
+
+    def ingest(self, source: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Copia el archivo al almacén calculando su SHA-256 en la misma pasada
+        Se escribe en un temporal junto a la raíz; si el contenido ya estaba guardado,
+        el temporal se descarta y el archivo existente no se vuelve a escribir
+        """
+        os.makedirs(self.root_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=self.root_dir, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as target:
+                while True:
+                    block = source.read(self.BLOCK_BYTES)
+                    if not block:
+                        break
+                    digest.update(block)
+                    target.write(block)
+                    size += len(block)
+
+            checksum = digest.hexdigest()
+            path = self.path_for(checksum, filename.split('.')[-1])
+            stored = not os.path.exists(path)
+            if stored:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return {'checksum': checksum, 'file_path': path, 'file_size': size, 'stored': stored}
+
+    def checksum(self, path: str, algorithm: str = 'sha256') -> str:
+        """Huella del archivo leída por bloques"""
+        digest = hashlib.new(algorithm)
+        with open(path, 'rb') as source:
+            while True:
+                block = source.read(self.BLOCK_BYTES)
+                if not block:
+                    break
+                digest.update(block)
+        return digest.hexdigest()
+
+    def verify(self, path: str, checksum: Optional[str]) -> bool:
+        """
+        Comprueba que el archivo en disco sigue siendo el que se registró
+        Retorna False si no hay huella registrada con la que comparar
+        """
+        algorithm = self.ALGORITHMS.get(len(checksum or ''))
+        if algorithm is None:
+            return False
+        if not os.path.exists(path):
+            raise ValueError(f"El archivo de referencia no existe en disco: {os.path.basename(path)}")
+        if self.checksum(path, algorithm) != checksum.lower():
+            raise ValueError(f"El archivo de referencia fue modificado en disco: {os.path.basename(path)}")
+        return True
@@ -0,0 +1,275 @@
+import csv
+import io
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+class ReportExporter:
+    """
+    Motor de exportación de reportes de diferencias
+    Escribe el conjunto completo de diferencias en CSV o Excel sin mantenerlo en memoria
+    """
+
+    # Tamaño de cada bloque enviado al cliente en la descarga
+    CHUNK_SIZE = 64 * 1024
+
+    # Filas acumuladas antes de vaciar el buffer CSV
+    CSV_FLUSH_ROWS = 1000
+
+    # Límite de filas de una hoja de Excel (incluye el encabezado)
+    EXCEL_MAX_ROWS = 1048576
+
+    SUPPORTED_FORMATS = {
+        'csv': {
+            'media_type': 'text/csv; charset=utf-8',
+            'extension': 'csv'
+        },
+        'xlsx': {
+            'media_type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'extension': 'xlsx'
+        }
+    }
+
+    COLUMNS = [
+        ('type', 'Tipo'),
+        ('position', 'Posición'),
+        ('row', 'Fila'),
+        ('column', 'Columna'),
+        ('referenceValue', 'Valor referencia'),
+        ('compareValue', 'Valor comparado'),
+        ('description', 'Descripción')
+    ]
+
+    # Columna que se antepone en los reportes de libros de Excel (metadata['workbook']): hoja de cada diferencia
+    SHEET_COLUMN = ('sheet', 'Hoja')
+
+    TYPE_LABELS = {
+        'cell_modified': 'Celdas modificadas',
+        'row_added': 'Filas agregadas',
+        'row_removed': 'Filas eliminadas',
+        'column_added': 'Columnas agregadas',
+        'column_missing': 'Columnas eliminadas',
+        'column_renamed': 'Columnas renombradas',
+        'row_moved': 'Bloques de filas movidas',
+        'structure_difference': 'Diferencias de estructura'
+    }
+
+    def get_media_type(self, export_format: str) -> str:
+        return self.SUPPORTED_FORMATS[self._validate_format(export_format)]['media_type']
+
+    def get_filename(self, ref_filename: str, comp_filename: str, export_format: str) -> str:
+        """Construye el nombre del archivo de descarga"""
+        extension = self.SUPPORTED_FORMATS[self._validate_format(export_format)]['extension']
+        ref_base = os.path.splitext(os.path.basename(ref_filename))[0]
+        comp_base = os.path.splitext(os.path.basename(comp_filename))[0]
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"diferencias_{ref_base}_vs_{comp_base}_{timestamp}.{extension}"
+
+    def stream(self, differences: Iterable[Dict[str, Any]], export_format: str,
+               metadata: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        Punto de entrada principal de la exportación
+        Retorna un generador de bloques de bytes listo para una respuesta por partes
+        """
+        export_format = self._validate_format(export_format)
+        columns = self._columns(metadata)
+
+        if export_format == 'csv':
+            return self.stream_csv(differences, columns)
+        return self.stream_xlsx(differences, metadata, columns)
+
+    def stream_csv(self, differences: Iterable[Dict[str, Any]],
+                   columns: Optional[List[Tuple[str, str]]] = None) -> Iterator[bytes]:
+        """
+        Escribe las diferencias en CSV y las entrega por bloques
+        Solo se mantiene en memoria un buffer de CSV_FLUSH_ROWS filas
+        """
+        columns = columns or self.COLUMNS
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        # BOM para que Excel detecte correctamente la codificación UTF-8
+        buffer.write('\ufeff')
+        writer.writerow([label for _, label in columns])
+
+        pending = 0
+        for difference in differences:
+            writer.writerow(self._row_values(difference, columns))
+            pending += 1
+
+            if pending >= self.CSV_FLUSH_ROWS:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+
+        remaining = buffer.getvalue()
+        if remaining:
+            yield remaining.encode('utf-8')
+
+    def stream_xlsx(self, differences: Iterable[Dict[str, Any]], metadata: Dict[str, Any],
+                    columns: Optional[List[Tuple[str, str]]] = None) -> Iterator[bytes]:
+        """
+        Escribe las diferencias en un libro de Excel en modo de memoria constante
+        Las celdas modificadas se resaltan y se agrega una hoja de resumen
+        """
+        try:
+            import xlsxwriter
+        except ImportError:
+            raise ValueError("La exportación a Excel requiere el paquete 'xlsxwriter'")
+
+        temp_file = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        temp_file.close()
+
+        try:
+            self._write_workbook(xlsxwriter, temp_file.name, differences, metadata, columns or self.COLUMNS)
+
+            with open(temp_file.name, 'rb') as report:
+                while True:
+                    chunk = report.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(temp_file.name)
+
+    def _write_workbook(self, xlsxwriter, path: str, differences: Iterable[Dict[str, Any]],
+                        metadata: Dict[str, Any], columns: List[Tuple[str, str]]):
+        """Genera el libro de Excel fila por fila en disco"""
+        keys = [key for key, _ in columns]
+        reference_col, compare_col = keys.index('referenceValue'), keys.index('compareValue')
+        # constant_memory vacía cada fila a disco en cuanto se pasa a la siguiente
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_numbers': False})
+
+        try:
+            header_format = workbook.add_format({'bold': True, 'bg_color': '#1F4E78', 'font_color': '#FFFFFF'})
+            reference_format = workbook.add_format({'bg_color': '#F8CBAD'})
+            compare_format = workbook.add_format({'bg_color': '#C6EFCE'})
+            added_format = workbook.add_format({'font_color': '#006100'})
+            removed_format = workbook.add_format({'font_color': '#9C0006'})
+
+            # La hoja de resumen se crea primero para que aparezca al abrir el libro
+            summary_sheet = workbook.add_worksheet('Resumen')
+            counts = Counter()
+
+            sheet_number = 0
+            sheet = None
+            row = 0
+
+            for difference in differences:
+                if sheet is None or row >= self.EXCEL_MAX_ROWS:
+                    sheet_number += 1
+                    name = 'Diferencias' if sheet_number == 1 else f'Diferencias {sheet_number}'
+                    sheet = self._add_differences_sheet(workbook, name, header_format, columns)
+                    row = 1
+
+                diff_type = difference.get('type')
+                counts[diff_type] += 1
+
+                values = self._row_values(difference, columns)
+                for col, value in enumerate(values):
+                    cell_format = None
+                    if diff_type == 'cell_modified' and col == reference_col:
+                        cell_format = reference_format
+                    elif diff_type == 'cell_modified' and col == compare_col:
+                        cell_format = compare_format
+                    elif diff_type in ('row_added', 'column_added'):
+                        cell_format = added_format
+                    elif diff_type in ('row_removed', 'column_missing'):
+                        cell_format = removed_format
+
+                    if value == '':
+                        continue
+                    if isinstance(value, int):
+                        sheet.write_number(row, col, value, cell_format)
+                    else:
+                        sheet.write_string(row, col, value, cell_format)
+
+                row += 1
+
+            if sheet is None:
+                self._add_differences_sheet(workbook, 'Diferencias', header_format, columns)
+
+            self._write_summary(summary_sheet, header_format, counts, metadata)
+        finally:
+            workbook.close()
+
+    def _add_differences_sheet(self, workbook, name: str, header_format, columns: List[Tuple[str, str]]):
+        sheet = workbook.add_worksheet(name)
+        sheet.freeze_panes(1, 0)
+        # Con la columna de la hoja delante, las demás se desplazan una posición
+        offset = len(columns) - len(self.COLUMNS)
+        if offset:
+            sheet.set_column(0, offset - 1, 24)
+        sheet.set_column(offset, offset, 18)
+        sheet.set_column(offset + 1, offset + 1, 30)
+        sheet.set_column(offset + 2, offset + 3, 14)
+        sheet.set_column(offset + 4, offset + 5, 28)
+        sheet.set_column(offset + 6, offset + 6, 45)
+        for col, (_, label) in enumerate(columns):
+            sheet.write_string(0, col, label, header_format)
+        return sheet
+
+    def _write_summary(self, sheet, header_format, counts: Counter, metadata: Dict[str, Any]):
+        """Escribe la hoja de resumen con los totales calculados durante la exportación"""
+        sheet.set_column(0, 0, 32)
+        sheet.set_column(1, 1, 40)
+
+        rows = [
+            ('Archivo de referencia', metadata.get('referenceFileName', '')),
+            ('Archivo a comparar', metadata.get('compareFileName', '')),
+            ('Fecha de exportación', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+            ('Filas en referencia', metadata.get('referenceRows', '')),
+            ('Columnas en referencia', metadata.get('referenceColumns', '')),
+            ('Filas a comparar', metadata.get('compareRows', '')),
+            ('Columnas a comparar', metadata.get('compareColumns', '')),
+            ('Total de diferencias', sum(counts.values()))
+        ]
+        if metadata.get('totalDifferences'):
+            # Reporte parcial: los archivos ya no estaban disponibles para repetir la comparación
+            rows.append(('Diferencias en la comparación (reporte parcial)', metadata['totalDifferences']))
+        for diff_type, label in self.TYPE_LABELS.items():
+            rows.append((label, counts.get(diff_type, 0)))
+
+        sheet.write_string(0, 0, 'Concepto', header_format)
+        sheet.write_string(0, 1, 'Valor', header_format)
+        for index, (label, value) in enumerate(rows, start=1):
+            sheet.write_string(index, 0, label)
+            if isinstance(value, int):
+                sheet.write_number(index, 1, value)
+            else:
+                sheet.write_string(index, 1, str(value))
+
+    def _columns(self, metadata: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """Columnas del reporte: las de un libro de Excel llevan primero la hoja"""
+        return [self.SHEET_COLUMN] + self.COLUMNS if metadata.get('workbook') else self.COLUMNS
+
+    def _row_values(self, difference: Dict[str, Any],
+                    columns: Optional[List[Tuple[str, str]]] = None) -> List[Any]:
+        """Convierte una diferencia en la lista de valores de una fila del reporte"""
+        values = []
+        for key, _ in columns or self.COLUMNS:
+            value = difference.get(key)
+            if key == 'description' and difference.get('data'):
+                row_data = ', '.join(f"{k}={v}" for k, v in difference['data'].items())
+                value = f"{value}: {row_data}" if value else row_data
+            if value is None:
+                values.append('')
+            elif isinstance(value, int) and not isinstance(value, bool):
+                values.append(value)
+            else:
+                values.append(str(value))
+        return values
+
+    def _validate_format(self, export_format: Optional[str]) -> str:
+        export_format = (export_format or '').lower()
+        if export_format == 'excel':
+            export_format = 'xlsx'
+        if export_format not in self.SUPPORTED_FORMATS:
+            raise ValueError(
+                f"Formato de exportación no soportado: {export_format}. "
+                f"Formatos permitidos: {', '.join(self.SUPPORTED_FORMATS)}"
+            )
+        return export_format
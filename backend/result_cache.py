@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+def content_checksum(content: bytes) -> str:
+    """Huella SHA-256 del contenido de un archivo"""
+    return hashlib.sha256(content).hexdigest()
+
+class ResultCache:
+    """
+    Caché de resultados de comparación direccionada por contenido
+    La clave combina las huellas de ambos archivos, las opciones resueltas y la versión del motor;
+    delante de la tabla SQLite hay una LRU en memoria acotada en bytes
+    """
+
+    def __init__(self, database_manager, engine_version: str,
+                 memory_bytes: int, database_bytes: int):
+        self.database_manager = database_manager
+        self.engine_version = engine_version
+        self.memory_bytes = memory_bytes
+        self.database_bytes = database_bytes
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'database_hits': 0, 'misses': 0, 'stores': 0, 'memory_evictions': 0}
+
+    def make_key(self, checksum1: str, filename1: str, checksum2: str, filename2: str,
+                 options: Dict[str, Any]) -> str:
+        """
+        Clave de un par de archivos con unas opciones ya resueltas
+        Se incluye la extensión porque el mismo contenido se interpreta distinto según el formato
+        """
+        payload = json.dumps({
+            'reference': [checksum1, filename1.lower().split('.')[-1]],
+            'compare': [checksum2, filename2.lower().split('.')[-1]],
+            'options': options,
+            'engine': self.engine_version
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Retorna el resultado codificado o None; los aciertos de la base de datos pasan a memoria"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return data
+
+        data = self.database_manager.get_cached_result(key)
+        with self._lock:
+            if data is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['database_hits'] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Guarda un resultado codificado en memoria y en la base de datos"""
+        with self._lock:
+            self._stats['stores'] += 1
+            self._remember(key, data)
+        self.database_manager.store_cached_result(key, data, self.engine_version, self.database_bytes)
+
+    def _remember(self, key: str, data: bytes):
+        # Los resultados que no caben en la memoria solo se guardan en la base de datos
+        if len(data) > self.memory_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous)
+        self._entries[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self._stats['memory_evictions'] += 1
+
+    def clear(self) -> int:
+        """Vacía la memoria y la tabla; retorna las entradas eliminadas de la base de datos"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_used = 0
+        return self.database_manager.clear_result_cache()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos y fallos de este proceso junto con el estado de la tabla persistente"""
+        with self._lock:
+            stats = dict(self._stats)
+            hits = stats['memory_hits'] + stats['database_hits']
+            lookups = hits + stats['misses']
+            stats.update({
+                'hits': hits,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory': {
+                    'entries': len(self._entries),
+                    'size_bytes': self._memory_used,
+                    'max_bytes': self.memory_bytes
+                }
+            })
+        stats['database'] = dict(self.database_manager.get_result_cache_statistics(), max_bytes=self.database_bytes)
+        stats['engine_version'] = self.engine_version
+        return stats
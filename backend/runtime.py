@@ -0,0 +1,244 @@
+import threading
+import time
+import logging
+from typing import Dict, Any
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Los módulos pesados (pandas, numpy, SQLAlchemy) se importan solo dentro de las funciones,
+# así el servidor puede responder a /health antes de que terminen de cargarse
+
+_lock = threading.RLock()
+_database_manager = None
+_comparator = None
+_exporter = None
+_profiler = None
+_inspector = None
+_result_cache = None
+_reference_store = None
+_reference_preprocessor = None
+_admission_controller = None
+_engine_planner = None
+_progress_registry = None
+_workbook_comparator = None
+
+# Presupuesto de admisión compartido entre los trabajadores del supervisor (None: un solo proceso)
+_shared_budget = None
+
+# Progreso de las comparaciones compartido entre los trabajadores del supervisor (None: un solo proceso)
+_progress_store = None
+
+_state = {
+    'started_at': time.time(),
+    'database_ready': False,
+    'engine_ready': False,
+    'ready_at': None,
+    'error': None,
+    'timings': {}
+}
+
+def get_database_manager():
+    """Retorna el DatabaseManager compartido, creándolo una sola vez por proceso"""
+    global _database_manager
+    if _database_manager is None:
+        with _lock:
+            if _database_manager is None:
+                start = time.perf_counter()
+                from database_manager import DatabaseManager
+                _database_manager = DatabaseManager(init_schema=not Config.DB_SCHEMA_READY)
+                _state['timings']['database'] = round(time.perf_counter() - start, 4)
+                _state['database_ready'] = True
+    return _database_manager
+
+def get_comparator():
+    """Retorna el FileComparator compartido, importando pandas la primera vez"""
+    global _comparator
+    if _comparator is None:
+        with _lock:
+            if _comparator is None:
+                start = time.perf_counter()
+                from file_comparator import FileComparator
+                _comparator = FileComparator()
+                _state['timings']['engine'] = round(time.perf_counter() - start, 4)
+                _state['engine_ready'] = True
+    return _comparator
+
+def get_exporter():
+    """Retorna el ReportExporter compartido"""
+    global _exporter
+    if _exporter is None:
+        with _lock:
+            if _exporter is None:
+                from report_exporter import ReportExporter
+                _exporter = ReportExporter()
+    return _exporter
+
+def get_profiler():
+    """Retorna el DataProfiler compartido"""
+    global _profiler
+    if _profiler is None:
+        with _lock:
+            if _profiler is None:
+                from data_profiler import DataProfiler
+                _profiler = DataProfiler()
+    return _profiler
+
+def get_inspector():
+    """Retorna el FileInspector compartido, usado para la validación rápida de archivos"""
+    global _inspector
+    if _inspector is None:
+        with _lock:
+            if _inspector is None:
+                from file_inspector import FileInspector
+                _inspector = FileInspector()
+    return _inspector
+
+def get_result_cache():
+    """Retorna la caché de resultados compartida, o None si está desactivada en la configuración"""
+    global _result_cache
+    if _result_cache is None and Config.RESULT_CACHE_ENABLED:
+        with _lock:
+            if _result_cache is None:
+                from result_cache import ResultCache
+                _result_cache = ResultCache(
+                    get_database_manager(),
+                    get_comparator().ENGINE_VERSION,
+                    Config.RESULT_CACHE_MEMORY_BYTES,
+                    Config.RESULT_CACHE_DB_BYTES
+                )
+    return _result_cache
+
+def get_reference_store():
+    """Retorna el almacén de archivos de referencia, ubicado junto a la base de datos"""
+    global _reference_store
+    if _reference_store is None:
+        with _lock:
+            if _reference_store is None:
+                from reference_store import ReferenceStore
+                _reference_store = ReferenceStore(get_database_manager().config.get_reference_files_dir())
+    return _reference_store
+
+def get_reference_preprocessor():
+    """Retorna la cola de preprocesamiento de archivos de referencia"""
+    global _reference_preprocessor
+    if _reference_preprocessor is None:
+        with _lock:
+            if _reference_preprocessor is None:
+                from reference_preprocessor import ReferencePreprocessor
+                _reference_preprocessor = ReferencePreprocessor(
+                    get_database_manager(), get_comparator(), get_profiler(), get_reference_store()
+                )
+    return _reference_preprocessor
+
+def use_shared_admission(ledger, slot: int):
+    """
+    Usa el presupuesto de admisión de todo el servidor (trabajadores de start_production.py)
+    ledger es el Array compartido creado por el supervisor y slot la ranura de este proceso
+    """
+    global _shared_budget
+    from admission import SharedBudget
+    _shared_budget = SharedBudget(ledger, slot)
+
+def use_shared_progress(store):
+    """
+    Publica el progreso en el diccionario compartido por los trabajadores de start_production.py
+    Así /progress/{id} lo sigue aunque la comparación se ejecute en otro trabajador
+    """
+    global _progress_store
+    _progress_store = store
+
+def get_admission_controller():
+    """Retorna el control de admisión de comparaciones, con el presupuesto compartido si lo hay"""
+    global _admission_controller
+    if _admission_controller is None:
+        with _lock:
+            if _admission_controller is None:
+                from admission import AdmissionController
+                _admission_controller = AdmissionController(
+                    Config.COMPARISON_MEMORY_BUDGET,
+                    Config.MAX_CONCURRENT_COMPARISONS,
+                    Config.COMPARISON_QUEUE_SIZE,
+                    Config.COMPARISON_QUEUE_TIMEOUT,
+                    _shared_budget
+                )
+    return _admission_controller
+
+def get_engine_planner():
+    """Retorna el planificador que elige el motor de cada comparación según la memoria estimada"""
+    global _engine_planner
+    if _engine_planner is None:
+        with _lock:
+            if _engine_planner is None:
+                from engine_planner import EnginePlanner
+                _engine_planner = EnginePlanner(get_inspector(), get_comparator(), Config.get_engine_budget())
+    return _engine_planner
+
+def get_progress_registry():
+    """Retorna el registro del progreso de las comparaciones, sobre el almacén compartido si lo hay"""
+    global _progress_registry
+    if _progress_registry is None:
+        with _lock:
+            if _progress_registry is None:
+                from progress import ProgressRegistry
+                _progress_registry = ProgressRegistry(_progress_store)
+    return _progress_registry
+
+def get_workbook_comparator():
+    """Retorna el comparador de libros de Excel; su pool de procesos se crea con la primera comparación"""
+    global _workbook_comparator
+    if _workbook_comparator is None:
+        with _lock:
+            if _workbook_comparator is None:
+                from workbook import WorkbookComparator
+                _workbook_comparator = WorkbookComparator(get_comparator(), Config.get_workbook_workers())
+    return _workbook_comparator
+
+def warm_up():
+    """
+    Inicializa la base de datos y precarga el motor de comparación
+    Se ejecuta una sola vez en segundo plano desde el lifespan de la aplicación
+    """
+    try:
+        get_database_manager()
+        get_comparator()
+        _state['ready_at'] = time.time()
+        logger.info(
+            f"Backend listo en {_state['ready_at'] - _state['started_at']:.2f} segundos "
+            f"(base de datos: {_state['timings'].get('database')}s, motor: {_state['timings'].get('engine')}s)"
+        )
+    except Exception as e:
+        _state['error'] = str(e)
+        logger.error(f"Error durante el precalentamiento del backend: {e}")
+        return
+    
+    # Retomar los archivos de referencia que quedaron sin preprocesar (no afecta a /ready)
+    # y los que se quedaron a medias en un proceso que terminó hace tiempo
+    try:
+        get_database_manager().reset_interrupted_references(Config.REFERENCE_PROCESSING_TIMEOUT)
+        pending = get_reference_preprocessor().submit_pending()
+        if pending:
+            logger.info(f"{pending} archivos de referencia pendientes de preprocesar")
+    except Exception as e:
+        logger.error(f"Error al encolar los archivos de referencia pendientes: {e}")
+
+def start_warm_up() -> threading.Thread:
+    """Lanza warm_up en un hilo de fondo para no bloquear el arranque del servidor"""
+    thread = threading.Thread(target=warm_up, name='backend-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def is_ready() -> bool:
+    return _state['database_ready'] and _state['engine_ready'] and _state['error'] is None
+
+def get_status() -> Dict[str, Any]:
+    """Estado de preparación del proceso, usado por el endpoint /ready"""
+    return {
+        'ready': is_ready(),
+        'database_ready': _state['database_ready'],
+        'engine_ready': _state['engine_ready'],
+        'uptime_seconds': round(time.time() - _state['started_at'], 3),
+        'startup_seconds': round(_state['ready_at'] - _state['started_at'], 3) if _state['ready_at'] else None,
+        'timings': dict(_state['timings']),
+        'error': _state['error']
+    }
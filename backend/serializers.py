@@ -0,0 +1,106 @@
+import json
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Union
+
+from fastapi.responses import Response
+
+# orjson es opcional: si no está instalado se usa el codificador estándar con limpieza previa
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _is_missing(value: Any) -> bool:
+    """Detecta NaN, NaT y valores nulos de pandas sin importar pandas"""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    return type(value).__name__ in ('NaTType', 'NAType')
+
+def _default(value: Any) -> Any:
+    """
+    Convierte los tipos de numpy y pandas que el codificador no entiende directamente
+    Se invoca solo para los valores no nativos, nunca para str/int/float/dict/list
+    """
+    if _is_missing(value):
+        return None
+
+    # Escalares de numpy (np.int64, np.float32, np.bool_...) y arreglos
+    if hasattr(value, 'dtype'):
+        if hasattr(value, 'tolist'):
+            result = value.tolist()
+            if isinstance(result, float) and math.isnan(result):
+                return None
+            return result
+
+    # pd.Timestamp y pd.Timedelta tienen isoformat()/total_seconds() como datetime
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+def _to_builtin(value: Any) -> Any:
+    """Recorre la estructura y deja solo tipos nativos de JSON (NaN -> null)"""
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, str) else str(_to_builtin(key)): _to_builtin(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int) and type(value) is int:
+        return value
+    if isinstance(value, float) and type(value) is float:
+        return None if math.isnan(value) or math.isinf(value) else value
+    return _to_builtin(_default(value))
+
+def dumps(data: Any) -> bytes:
+    """
+    Codifica un resultado a JSON (UTF-8) en una sola pasada
+    Los bytes devueltos se pueden usar tanto para la respuesta HTTP como para la base de datos
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            # Claves de diccionario no nativas (p. ej. np.int64): limpiar y reintentar
+            return orjson.dumps(_to_builtin(data))
+
+    return json.dumps(
+        _to_builtin(data), ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class JSONBytesResponse(Response):
+    """
+    Respuesta JSON que acepta bytes ya codificados
+    Evita volver a pasar el resultado por el codificador estándar de Starlette
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# Escala para convertir un hash de 64 bits en un valor uniforme entre 0 y 1
+HASH_SPACE = float(2 ** 64)
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """Mezcla de bits (splitmix64): convierte enteros consecutivos o semillas en hashes independientes"""
+    with np.errstate(over='ignore'):
+        values = np.asarray(values, dtype=np.uint64)
+        values = values ^ (values >> np.uint64(30))
+        values = values * np.uint64(0xBF58476D1CE4E5B9)
+        values = values ^ (values >> np.uint64(27))
+        values = values * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Calcula un hash de 64 bits por valor de forma vectorizada
+    Los valores nulos deben descartarse antes si no deben contarse
+    """
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+class KMVSketch:
+    """
+    Sketch de los k valores mínimos (KMV) para estimar cardinalidades
+    Guarda solo los k hashes distintos más pequeños; es exacto mientras haya menos de k valores
+    """
+
+    def __init__(self, k: int = 1024, values: Optional[np.ndarray] = None):
+        self.k = k
+        self.values = values if values is not None else np.empty(0, dtype=np.uint64)
+
+    def update(self, hashes: np.ndarray) -> 'KMVSketch':
+        """Agrega un bloque de hashes al sketch (vectorizado, sin recorrer valor por valor)"""
+        if len(hashes) == 0:
+            return self
+
+        if len(self.values) >= self.k:
+            # Solo interesan los hashes menores que el k-ésimo actual
+            hashes = hashes[hashes < self.values[-1]]
+        elif len(hashes) > 8 * self.k:
+            # Preseleccionar los candidatos más pequeños sin ordenar todo el bloque
+            cut = np.partition(hashes, 8 * self.k)[8 * self.k]
+            merged = np.unique(np.concatenate([self.values, hashes[hashes <= cut]]))
+            # Solo es válido si los k mínimos quedan por debajo del corte
+            if np.count_nonzero(merged <= cut) >= self.k:
+                self.values = merged[:self.k]
+                return self
+
+        if len(hashes):
+            self.values = np.unique(np.concatenate([self.values, hashes]))[:self.k]
+        return self
+
+    def is_exact(self) -> bool:
+        return len(self.values) < self.k
+
+    def estimate(self) -> int:
+        """Número estimado de valores distintos"""
+        if self.is_exact():
+            return int(len(self.values))
+        return int(round((self.k - 1) * HASH_SPACE / float(self.values[-1])))
+
+    def relative_error(self) -> float:
+        """Error relativo típico (una desviación estándar) de la estimación"""
+        return 0.0 if self.is_exact() else 1.0 / np.sqrt(self.k - 2)
+
+    def merge(self, other: 'KMVSketch') -> 'KMVSketch':
+        """Sketch de la unión de ambos conjuntos"""
+        k = min(self.k, other.k)
+        return KMVSketch(k, np.unique(np.concatenate([self.values, other.values]))[:k])
+
+    def jaccard(self, other: 'KMVSketch') -> float:
+        """
+        Estima |A ∩ B| / |A ∪ B| a partir de los k mínimos de la unión
+        Un conjunto vacío no se parece a ningún otro, ni siquiera a otro vacío (0.0)
+        """
+        if len(self.values) == 0 or len(other.values) == 0:
+            return 0.0
+        union = self.merge(other)
+        in_both = np.isin(union.values, self.values) & np.isin(union.values, other.values)
+        return float(in_both.sum()) / len(union.values)
@@ -0,0 +1,67 @@
+"""
+Pruebas del backend; se ejecutan desde la raíz del proyecto con: python -m pytest backend/tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# Los módulos del backend se importan por nombre, como en main.py
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# El log de main.py va a un archivo temporal y no a app.log del directorio de trabajo
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'file_comparator_tests.log'))
+
+import runtime
+from database_manager import DatabaseManager
+from file_comparator import FileComparator
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """Contenido CSV de un DataFrame, como lo subiría el frontend"""
+    return df.to_csv(index=False).encode('utf-8')
+
+def xlsx_bytes(sheets: dict) -> bytes:
+    """Libro de Excel con una hoja por entrada {nombre: DataFrame}"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+def inventory(rows: int, start: int = 0) -> pd.DataFrame:
+    """Inventario de máquinas con una clave única por fila"""
+    return pd.DataFrame({
+        'Nombre_Maquina': [f'PC-{i:05d}' for i in range(start, start + rows)],
+        'IP_Address': [f'10.0.{i // 250}.{i % 250}' for i in range(start, start + rows)],
+        'OS': ['W10' if i % 3 else 'W11' for i in range(start, start + rows)]
+    })
+
+@pytest.fixture
+def comparator():
+    return FileComparator()
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(db_path=str(tmp_path / 'test.db'))
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """
+    Cliente de la API con una base de datos temporal
+    Los objetos compartidos de runtime se crean de nuevo en cada prueba; sin el bloque with,
+    el lifespan (precalentamiento en segundo plano) no se ejecuta
+    """
+    from fastapi.testclient import TestClient
+    import main
+
+    for name in ('_result_cache', '_reference_store', '_reference_preprocessor', '_admission_controller',
+                 '_engine_planner', '_progress_registry', '_workbook_comparator'):
+        monkeypatch.setattr(runtime, name, None)
+    monkeypatch.setattr(runtime, '_database_manager', db)
+    return TestClient(main.app)
@@ -0,0 +1,241 @@
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+
+import runtime
+from admission import AdmissionController, AdmissionRejected, SharedBudget
+from conftest import csv_bytes, inventory
+
+MB = 1024 * 1024
+
+def controller(shared=None, memory_budget=100 * MB, max_concurrent=2, max_queue=1, max_wait=0.5):
+    return AdmissionController(memory_budget, max_concurrent, max_queue, max_wait, shared)
+
+def hold_reservation(ledger, cost, reserved, done):
+    """Otro trabajador: reserva en su ranura del presupuesto compartido hasta que se le indique"""
+    SharedBudget(ledger, 1).try_reserve(cost, 2, 100 * MB)
+    reserved.set()
+    done.wait(10)
+    SharedBudget(ledger, 1).release(cost)
+
+def test_a_request_over_budget_is_queued_then_rejected():
+    async def scenario():
+        admission = controller(max_queue=1, max_wait=0.2)
+        await admission.acquire(80 * MB)
+        # No cabe junto a la primera: espera en la cola y se rechaza al agotar la espera
+        waiting = asyncio.create_task(admission.acquire(40 * MB))
+        await asyncio.sleep(0.05)
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await admission.acquire(1 * MB)
+        with pytest.raises(AdmissionRejected) as timeout:
+            await waiting
+        return admission, queue_full.value, timeout.value
+
+    admission, queue_full, timeout = asyncio.run(scenario())
+
+    assert queue_full.status_code == 429
+    assert timeout.status_code == 503
+    assert queue_full.retry_after >= 1
+    metrics = admission.metrics()
+    assert (metrics['admitted'], metrics['rejected_queue_full'], metrics['rejected_timeout']) == (1, 1, 1)
+
+def test_a_release_admits_the_next_request_in_order():
+    async def scenario():
+        admission = controller(max_concurrent=1, max_queue=2, max_wait=5)
+        order = []
+
+        async def run(name, cost):
+            async with admission.admit(cost):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(run('a', MB), run('b', MB), run('c', MB))
+        return admission, order
+
+    admission, order = asyncio.run(scenario())
+
+    assert order == ['a', 'b', 'c']
+    assert (admission.active, admission.reserved_bytes) == (0, 0)
+
+def test_a_waiter_leaving_the_head_of_the_queue_admits_the_next():
+    async def scenario():
+        admission = controller(max_concurrent=3, max_queue=2, max_wait=0.3)
+        await admission.acquire(80 * MB)
+        # La primera no cabe; la segunda sí cabría, pero espera su turno detrás de ella
+        first = asyncio.create_task(admission.acquire(50 * MB))
+        await asyncio.sleep(0.02)
+        second = asyncio.create_task(admission.acquire(10 * MB))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        # Sin ninguna liberación: la salida de la primera basta para admitir a la segunda
+        await asyncio.wait_for(second, 0.1)
+
+        third = asyncio.create_task(admission.acquire(50 * MB))
+        await asyncio.sleep(0.1)
+        fourth = asyncio.create_task(admission.acquire(5 * MB))
+        with pytest.raises(AdmissionRejected):
+            await third
+        await asyncio.wait_for(fourth, 0.1)
+        return admission
+
+    assert asyncio.run(scenario()).active == 3
+
+def test_a_request_larger_than_the_budget_runs_alone():
+    async def scenario():
+        admission = controller(memory_budget=10 * MB)
+        await admission.acquire(50 * MB)
+        return admission
+
+    assert asyncio.run(scenario()).active == 1
+
+def test_a_reservation_is_released_once():
+    async def scenario():
+        admission = controller(max_concurrent=1)
+        reservation = await admission.reserve(10 * MB)
+        waiting = asyncio.create_task(admission.acquire(10 * MB))
+        await asyncio.sleep(0.05)
+        # El generador del reporte y la tarea de fondo de la respuesta la liberan los dos
+        await reservation.release()
+        await reservation.release()
+        await waiting
+        return admission
+
+    admission = asyncio.run(scenario())
+
+    assert (admission.active, admission.reserved_bytes) == (1, 10 * MB)
+
+def test_workers_sharing_a_ledger_share_one_budget():
+    ledger = SharedBudget.create_ledger(multiprocessing.get_context('spawn'), 2)
+    first = controller(SharedBudget(ledger, 0), max_queue=1, max_wait=0.2)
+    second = controller(SharedBudget(ledger, 1), max_queue=1, max_wait=0.2)
+
+    async def scenario():
+        await first.acquire(80 * MB)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await second.acquire(40 * MB)
+        # El segundo trabajador vuelve a intentarlo mientras espera y entra cuando el primero libera
+        waiting = asyncio.create_task(second.acquire(40 * MB))
+        await asyncio.sleep(0.05)
+        first.release(80 * MB)
+        await waiting
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert SharedBudget(ledger, 0).totals() == {'active': 1, 'reserved_bytes': 40 * MB}
+    metrics = first.metrics()
+    assert (metrics['active'], metrics['server_active'], metrics['server_reserved_bytes']) == (0, 1, 40 * MB)
+
+def test_the_budget_is_shared_with_other_processes():
+    context = multiprocessing.get_context('spawn')
+    ledger = SharedBudget.create_ledger(context, 2)
+    reserved, done = context.Event(), context.Event()
+    worker = context.Process(target=hold_reservation, args=(ledger, 90 * MB, reserved, done))
+    worker.start()
+    try:
+        assert reserved.wait(30)
+        admission = controller(SharedBudget(ledger, 0), max_queue=0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            asyncio.run(admission.acquire(20 * MB))
+        assert rejected.value.status_code == 429
+    finally:
+        done.set()
+        worker.join(10)
+
+    assert asyncio.run(admission.acquire(20 * MB)) == 0.0
+
+def test_clearing_a_slot_frees_what_a_dead_worker_reserved():
+    ledger = SharedBudget.create_ledger(multiprocessing.get_context('spawn'), 2)
+    SharedBudget(ledger, 1).try_reserve(60 * MB, 2, 100 * MB)
+
+    SharedBudget.clear_slot(ledger, 1)
+
+    assert SharedBudget(ledger, 0).totals() == {'active': 0, 'reserved_bytes': 0}
+
+def test_a_cache_hit_does_not_need_an_admission_slot(client, monkeypatch):
+    files = {
+        'file1': ('a.csv', csv_bytes(inventory(20)), 'text/csv'),
+        'file2': ('b.csv', csv_bytes(inventory(20, start=3)), 'text/csv')
+    }
+    assert client.post('/compare?save=false', files=files).headers['X-Cache'] == 'MISS'
+
+    # Servidor saturado y sin cola: cualquier solicitud que pida una plaza recibe 429
+    busy = controller(max_concurrent=1, max_queue=0)
+    asyncio.run(busy.acquire(MB))
+    monkeypatch.setattr(runtime, '_admission_controller', busy)
+
+    hit = client.post('/compare?save=false', files=files)
+    miss = client.post('/compare?save=false', files=dict(files, file2=('b.csv', csv_bytes(inventory(5)), 'text/csv')))
+
+    assert (hit.status_code, hit.headers['X-Cache']) == (200, 'HIT')
+    assert miss.status_code == 429
+    assert miss.headers['Retry-After']
+
+def test_export_of_a_cached_comparison_does_not_need_an_admission_slot(client, monkeypatch):
+    compare = inventory(20)
+    compare.loc[4, 'OS'] = 'Linux'
+    files = {'file1': ('a.csv', csv_bytes(inventory(20)), 'text/csv'), 'file2': ('b.csv', csv_bytes(compare), 'text/csv')}
+    client.post('/compare?save=false', files=files)
+
+    busy = controller(max_concurrent=1, max_queue=0)
+    asyncio.run(busy.acquire(MB))
+    monkeypatch.setattr(runtime, '_admission_controller', busy)
+
+    response = client.post('/export?format=csv', files=files)
+
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'HIT'
+    assert 'Linux' in response.text
+
+def test_export_releases_its_slot_when_the_response_is_never_sent(client):
+    import httpx
+    import main
+
+    request = httpx.Request('POST', 'http://testserver/export?format=csv', files={
+        'file1': ('a.csv', csv_bytes(inventory(20)), 'text/csv'),
+        'file2': ('b.csv', csv_bytes(inventory(20, start=1)), 'text/csv')
+    })
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+        'path': '/export', 'raw_path': b'/export', 'query_string': b'format=csv', 'root_path': '',
+        'headers': [(key.lower(), value) for key, value in request.headers.raw],
+        'client': ('testclient', 50000), 'server': ('testserver', 80)
+    }
+    messages = [{'type': 'http.request', 'body': request.read(), 'more_body': False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        # El cliente se desconectó: el envío falla antes de que el reporte empiece a generarse
+        raise ConnectionResetError('cliente desconectado')
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(main.app(scope, receive, send))
+
+    admission = runtime.get_admission_controller()
+    assert admission.metrics()['admitted'] == 1
+    assert (admission.active, admission.reserved_bytes) == (0, 0)
+
+def test_export_of_a_saved_comparison_needs_an_admission_slot(client, db, monkeypatch):
+    compare = inventory(20)
+    compare.loc[4, 'OS'] = 'Linux'
+    response = client.post('/compare?save=true', files={
+        'file1': ('a.csv', csv_bytes(inventory(20)), 'text/csv'), 'file2': ('b.csv', csv_bytes(compare), 'text/csv')
+    })
+    comparison_id = int(response.headers['X-Comparison-Id'])
+
+    # Repetir la comparación ocupa una plaza hasta terminar la descarga
+    export = client.get(f'/comparisons/{comparison_id}/export?format=csv')
+    assert 'Linux' in export.text
+    assert runtime.get_admission_controller().active == 0
+
+    busy = controller(max_concurrent=1, max_queue=0)
+    asyncio.run(busy.acquire(MB))
+    monkeypatch.setattr(runtime, '_admission_controller', busy)
+    assert client.get(f'/comparisons/{comparison_id}/export?format=csv').status_code == 429
+
+    # Sin los archivos se exportan las diferencias guardadas, sin pedir plaza
+    os.remove(db.get_comparison_details(comparison_id)['compare_file_path'])
+    assert client.get(f'/comparisons/{comparison_id}/export?format=csv').status_code == 200
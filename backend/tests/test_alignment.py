@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from alignment import align_rows, longest_increasing_subsequence, moved_blocks
+from conftest import inventory
+
+def test_longest_increasing_subsequence():
+    values = np.array([3, 1, 4, 2, 5, 9, 6])
+
+    positions = longest_increasing_subsequence(values)
+
+    assert len(positions) == 4
+    assert np.all(np.diff(values[positions]) > 0)
+
+def test_align_rows_classifies_every_row():
+    hashes1 = np.array([1, 2, 3, 4, 5, 6], dtype=np.uint64)
+    hashes2 = np.array([1, 4, 5, 2, 3, 7, 8], dtype=np.uint64)
+
+    alignment = align_rows(hashes1, hashes2)
+
+    assert alignment['moved'].tolist() == [[1, 3], [2, 4]]
+    assert alignment['modified'].tolist() == [[5, 5]]
+    assert alignment['inserted'].tolist() == [6]
+    assert alignment['deleted'].tolist() == []
+    assert len(alignment['unchanged']) + len(alignment['moved']) + len(alignment['modified']) == 6
+
+def test_moved_blocks_groups_contiguous_pairs():
+    moved = np.array([[2, 10], [3, 11], [4, 12], [8, 1]])
+
+    assert moved_blocks(moved) == [(2, 10, 3), (8, 1, 1)]
+
+def test_sequence_alignment_reports_a_moved_block_instead_of_modified_cells(comparator):
+    reference = inventory(10)
+    compare = pd.concat([reference.iloc[:2], reference.iloc[5:8], reference.iloc[2:5], reference.iloc[8:]],
+                        ignore_index=True)
+    compare.loc[9, 'OS'] = 'Linux'
+    compare = pd.concat([compare, inventory(1, start=50)], ignore_index=True)
+
+    positional = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+    aligned = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'alignment': 'sequence'})
+
+    assert positional['summary']['modifiedCells'] > 10
+    assert [d['type'] for d in aligned['differences']] == ['row_moved', 'cell_modified', 'row_added']
+    moved = aligned['differences'][0]
+    assert (moved['row'], moved['compareRow'], moved['rows']) == (3, 6, 3)
+    assert aligned['summary']['movedRows'] == 3
+    assert aligned['summary']['movedBlocks'] == 1
+    assert aligned['differences'][1]['compareValue'] == 'Linux'
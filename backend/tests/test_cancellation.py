@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import runtime
+from cancellation import CancellationToken, ComparisonCancelled
+from conftest import csv_bytes, inventory
+
+class CancelAfterChecks(CancellationToken):
+    """Token que se cancela solo tras un número de comprobaciones, en un punto fijo del motor"""
+
+    def __init__(self, checks: int, reason: str = 'deadline'):
+        super().__init__()
+        self.remaining = checks
+        self.cancel_reason = reason
+
+    def check(self):
+        if self.remaining == 0:
+            self.cancel(self.cancel_reason)
+        self.remaining -= 1
+        super().check()
+
+def different_inventories(rows: int = 300):
+    compare = inventory(rows)
+    compare['OS'] = 'Linux'
+    return inventory(rows), compare
+
+def test_token_reasons():
+    token = CancellationToken()
+    assert not token.cancelled
+    token.cancel('disconnected')
+    token.cancel('cancelled')
+    assert token.reason == 'disconnected'
+
+    expired = CancellationToken(time_budget=0.01)
+    time.sleep(0.02)
+    with pytest.raises(ComparisonCancelled) as stop:
+        expired.check()
+    assert (stop.value.reason, stop.value.time_budget) == ('deadline', 0.01)
+
+def test_cancelled_before_the_content_raises(comparator):
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(ComparisonCancelled):
+        comparator.compare_dataframes(*different_inventories(), 'a.csv', 'b.csv', cancel=token)
+
+def test_cancelled_during_the_content_returns_a_partial_result(comparator):
+    reference, compare = different_inventories()
+    complete = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+
+    partial = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', cancel=CancelAfterChecks(2))
+
+    assert partial['incomplete']
+    assert not partial['identical']
+    assert partial['metadata']['incompleteReason'] == 'deadline'
+    assert partial['summary']['differences'] < complete['summary']['differences'] == 300
+
+def test_an_expired_time_budget_is_a_504(client):
+    files = {'file1': ('a.csv', csv_bytes(inventory(50)), 'text/csv'),
+             'file2': ('b.csv', csv_bytes(inventory(50, start=1)), 'text/csv')}
+
+    response = client.post('/compare?save=false&time_budget=0.000001', files=files)
+
+    assert response.status_code == 504
+    assert 'tiempo máximo' in response.json()['detail']
+
+def test_partial_results_are_not_cached(client):
+    import main
+
+    partial = {'incomplete': True, 'summary': {'differences': 3}}
+    result, body, headers = main.run_comparison('clave', lambda: partial)
+
+    assert headers == {'X-Cache': 'SKIP'}
+    assert runtime.get_result_cache().get('clave') is None
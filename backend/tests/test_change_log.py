@@ -0,0 +1,132 @@
+import json
+
+from conftest import csv_bytes, inventory, xlsx_bytes
+from models import ChangeValue
+
+def changed_inventory() -> tuple:
+    """Referencia de 10 equipos; en la comparada cambian dos IP y llega PC-00010 al final"""
+    reference = inventory(10)
+    compare = inventory(10)
+    compare.loc[2, 'IP_Address'] = '192.168.1.2'
+    compare.loc[5, 'IP_Address'] = '192.168.1.2'
+    compare.loc[len(compare)] = ['PC-00010', '10.0.0.10', 'W10']
+    return reference, compare
+
+def record(comparator, reference, compare, options=None):
+    changes = comparator.new_change_log()
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', options, changes=changes)
+    return result, changes
+
+def save(db, comparator, reference, compare):
+    result, changes = record(comparator, reference, compare)
+    return db.save_comparison(db.build_comparison_record(
+        result, json.dumps(result, default=str).encode(), 'b.csv', 100, 0.1, changes=changes
+    ))
+
+def test_changes_are_keyed_by_the_first_common_column(comparator):
+    reference, compare = changed_inventory()
+
+    result, changes = record(comparator, reference, compare)
+
+    assert changes.key_column == 'Nombre_Maquina'
+    assert not changes.truncated
+    assert sorted(map(tuple, changes.rows), key=str) == sorted([
+        (None, 'IP_Address', 'PC-00002', 'cell_modified', '10.0.0.2', '192.168.1.2'),
+        (None, 'IP_Address', 'PC-00005', 'cell_modified', '10.0.0.5', '192.168.1.2'),
+        (None, None, 'PC-00010', 'row_added', None, None)
+    ], key=str)
+    # El registro no forma parte del resultado (respuesta, caché y resultado guardado)
+    assert 'changes' not in result
+
+def test_the_chunked_engine_records_the_same_changes(comparator, monkeypatch):
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 4)
+    reference, compare = (csv_bytes(df) for df in changed_inventory())
+    memory, chunked = comparator.new_change_log(), comparator.new_change_log()
+
+    comparator.compare_files(reference, 'a.csv', compare, 'b.csv', {'engine': 'memory'}, changes=memory)
+    comparator.compare_files(reference, 'a.csv', compare, 'b.csv', {'engine': 'chunked'}, changes=chunked)
+
+    assert chunked.rows == memory.rows
+
+def test_a_truncated_change_log_is_flagged_on_the_comparison(db, comparator, monkeypatch):
+    monkeypatch.setattr(comparator, 'CHANGE_LOG_LIMIT', 2)
+    comparison_id = save(db, comparator, *changed_inventory())
+
+    comparison = db.get_comparison_details(comparison_id)
+    found = db.find_changes(column='IP_Address')
+
+    assert (comparison['changes_recorded'], comparison['changes_total']) == (2, 3)
+    assert comparison['changes_truncated']
+    assert found and all(change['changes_truncated'] for change in found)
+
+def test_changes_are_found_across_comparisons(db, comparator):
+    reference, compare = changed_inventory()
+    first = save(db, comparator, reference, compare)
+    second = save(db, comparator, compare, reference)
+
+    history = {change['comparison_id']: change for change in db.find_changes(column='IP_Address', row_key='PC-00002')}
+
+    assert set(history) == {first, second}
+    assert (history[first]['old_value'], history[first]['new_value']) == ('10.0.0.2', '192.168.1.2')
+    assert (history[second]['old_value'], history[second]['new_value']) == ('192.168.1.2', '10.0.0.2')
+    assert not history[first]['changes_truncated']
+    # En la segunda comparación los archivos están intercambiados: el equipo nuevo figura como retirado
+    assert sorted(change['change_type'] for change in db.find_changes(row_key='PC-00010')) == ['row_added', 'row_removed']
+    assert [change['comparison_id'] for change in db.find_changes(row_key='PC-00010', change_type='row_added')] == [first]
+    # Cada valor se guarda una sola vez aunque aparezca en varios cambios y comparaciones
+    session = db.config.get_session()
+    try:
+        assert session.query(ChangeValue).filter(ChangeValue.value == '192.168.1.2').count() == 1
+    finally:
+        session.close()
+
+def test_comparisons_without_a_change_log_record_nothing(db, comparator):
+    reference, compare = changed_inventory()
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'record_changes': True})
+    comparison_id = db.save_comparison(db.build_comparison_record(result, b'{}', 'b.csv', 100, 0.1))
+
+    assert db.find_changes(column='IP_Address') == []
+    assert db.get_comparison_details(comparison_id)['changes_total'] is None
+
+def test_deleting_a_comparison_removes_its_changes(db, comparator):
+    reference, compare = changed_inventory()
+    kept = save(db, comparator, reference, compare)
+    deleted = save(db, comparator, reference, compare)
+
+    assert db.delete_comparison(deleted)
+    assert not db.delete_comparison(deleted)
+    assert {change['comparison_id'] for change in db.find_changes(column='IP_Address')} == {kept}
+
+def test_history_changes_endpoint(client):
+    reference, compare = changed_inventory()
+    files = {
+        'file1': ('a.csv', csv_bytes(reference), 'text/csv'),
+        'file2': ('b.csv', csv_bytes(compare), 'text/csv')
+    }
+    options = {'options': json.dumps({'record_changes': True})}
+    unsaved = client.post('/compare?save=false', files=files, data=options)
+
+    # Con el resultado ya en la caché, guardar vuelve a comparar para registrar los cambios
+    saved = client.post('/compare?save=true', files=files, data=options)
+    found = client.get('/history/changes?key=PC-00005').json()
+
+    assert 'changes' not in unsaved.json()
+    assert {**saved.json(), 'metadata': None} == {**unsaved.json(), 'metadata': None}
+    assert saved.headers['X-Cache'] != 'HIT'
+    assert client.get('/history/changes').status_code == 400
+    assert [(change['column'], change['new_value']) for change in found] == [('IP_Address', '192.168.1.2')]
+
+def test_workbook_changes_carry_their_sheet(client, monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'WORKBOOK_WORKERS', 1)
+    reference, compare = changed_inventory()
+    client.post('/compare/workbook?save=true', files={
+        'file1': ('a.xlsx', xlsx_bytes({'Equipos': reference, 'Red': inventory(3)})),
+        'file2': ('b.xlsx', xlsx_bytes({'Equipos': compare, 'Red': inventory(3)}))
+    }, data={'options': json.dumps({'record_changes': True})})
+
+    found = client.get('/history/changes?column=IP_Address').json()
+
+    assert sorted((change['sheet'], change['row_key']) for change in found) == [
+        ('Equipos', 'PC-00002'), ('Equipos', 'PC-00005')
+    ]
@@ -0,0 +1,40 @@
+import io
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import csv_bytes, inventory
+
+def parquet_bytes(df) -> bytes:
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue()
+
+def arrow_bytes(df) -> bytes:
+    buffer = io.BytesIO()
+    feather.write_feather(df, buffer, compression='uncompressed')
+    return buffer.getvalue()
+
+@pytest.mark.parametrize('filename, encode', [('datos.parquet', parquet_bytes), ('datos.arrow', arrow_bytes)])
+def test_read_file_projects_columns(comparator, filename, encode):
+    df = comparator.read_file(encode(inventory(20)), filename, columns=['Nombre_Maquina', 'OS'])
+
+    assert list(df.columns) == ['Nombre_Maquina', 'OS']
+    assert df.equals(inventory(20)[['Nombre_Maquina', 'OS']])
+
+@pytest.mark.parametrize('filename, encode', [('datos.parquet', parquet_bytes), ('datos.feather', arrow_bytes)])
+def test_read_path_memory_maps_and_ignores_columns(comparator, tmp_path, filename, encode):
+    path = tmp_path / filename
+    path.write_bytes(encode(inventory(20)))
+
+    df = comparator.read_path(str(path), ignore_columns=['IP_Address'])
+
+    assert df.equals(inventory(20).drop(columns='IP_Address'))
+
+def test_parquet_and_csv_of_the_same_data_are_identical(comparator):
+    result = comparator.compare_files(
+        csv_bytes(inventory(50)), 'referencia.csv', parquet_bytes(inventory(50)), 'nuevo.parquet'
+    )
+    assert result['identical']
@@ -0,0 +1,44 @@
+import pytest
+
+import runtime
+from conftest import csv_bytes, inventory
+
+@pytest.fixture
+def reference_id(client):
+    """Referencia de la biblioteca ya preprocesada (perfil y caché listos)"""
+    uploaded = client.post(
+        '/reference-files', files={'file': ('inventario.csv', csv_bytes(inventory(50)), 'text/csv')}
+    ).json()
+    runtime.get_reference_preprocessor()._queue.join()
+    return uploaded['file_id']
+
+def test_compare_with_a_stored_reference_matches_uploading_both_files(client, db, reference_id):
+    compare = inventory(50)
+    compare.loc[3, 'OS'] = 'Linux'
+    compare = csv_bytes(compare)
+
+    stored = client.post(f'/compare/reference/{reference_id}', files={'file': ('b.csv', compare, 'text/csv')})
+    uploaded = client.post('/compare?save=false', files={
+        'file1': ('inventario.csv', csv_bytes(inventory(50)), 'text/csv'),
+        'file2': ('b.csv', compare, 'text/csv')
+    })
+
+    assert stored.status_code == 200
+    assert stored.json()['differences'] == uploaded.json()['differences']
+    assert stored.json()['summary'] == uploaded.json()['summary']
+    comparison = db.get_comparison_details(int(stored.headers['X-Comparison-Id']))
+    assert comparison['reference_file_id'] == reference_id
+    assert db.get_reference_file(reference_id)['usage_count'] == 1
+
+def test_unsaved_comparisons_still_count_as_usage(client, db, reference_id):
+    response = client.post(f'/compare/reference/{reference_id}?save=false',
+                           files={'file': ('b.csv', csv_bytes(inventory(50)), 'text/csv')})
+
+    assert response.json()['identical']
+    assert 'X-Comparison-Id' not in response.headers
+    assert db.get_reference_file(reference_id)['usage_count'] == 1
+
+def test_unknown_reference_is_not_found(client):
+    response = client.post('/compare/reference/999', files={'file': ('b.csv', csv_bytes(inventory(5)), 'text/csv')})
+
+    assert response.status_code == 404
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from config import Config
+from conftest import BACKEND_DIR
+
+def test_single_worker_by_default():
+    # Config se lee al importar: se comprueba en un proceso nuevo sin WORKERS en el entorno
+    env = {key: value for key, value in os.environ.items() if key != 'WORKERS'}
+    output = subprocess.run(
+        [sys.executable, '-c', 'from config import Config; print(Config.get_worker_count())'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert output.stdout.strip() == '1', output.stderr
+
+def test_worker_count_is_configured_or_one_per_cpu(monkeypatch):
+    monkeypatch.setattr(Config, 'WORKERS', 3)
+    assert Config.get_worker_count() == 3
+
+    monkeypatch.setattr(Config, 'WORKERS', 0)
+    monkeypatch.setattr(Config, 'MAX_WORKERS', 2)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+    assert Config.get_worker_count() == 2
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from conftest import inventory
+from data_profiler import DataProfiler
+
+def reference_record(db, profile=None) -> int:
+    return db.add_reference_file({
+        'name': 'referencia.csv', 'original_name': 'referencia.csv', 'file_path': '/tmp/referencia.csv',
+        'file_size': 100, 'mime_type': 'text/csv', 'checksum': 'a' * 64, 'profile': profile
+    })
+
+def test_profile_counts_nulls_distinct_values_and_lengths():
+    df = pd.DataFrame({'Nombre': ['PC-1', 'PC-22', None, 'PC-1'], 'Ram': [8, 16, 16, np.nan]})
+
+    profile = DataProfiler().profile(df)
+
+    assert profile['row_count'] == 4
+    assert profile['column_count'] == 2
+    name, ram = profile['columns']
+    assert name['null_count'] == 1
+    assert name['distinct_estimate'] == 2 and name['distinct_exact']
+    assert (name['min_length'], name['max_length']) == (4, 5)
+    assert ram['null_count'] == 1
+    assert ram['distinct_estimate'] == 2
+    assert profile['memory_bytes'] == sum(col['memory_bytes'] for col in profile['columns'])
+
+def test_check_structure_uses_the_stored_profile_only():
+    profiler = DataProfiler()
+    profile = profiler.profile(inventory(10))
+
+    same = profiler.check_structure(profile, ['Nombre_Maquina', 'IP_Address', 'OS'])
+    assert same['same_schema'] and same['compatible']
+
+    other = profiler.check_structure(profile, ['Nombre_Maquina', 'OS', 'Ram'], {'OS': 'int64'})
+    assert not other['compatible']
+    assert other['missing_columns'] == ['IP_Address']
+    assert other['extra_columns'] == ['Ram']
+    assert other['dtype_mismatches'] == [{'column': 'OS', 'reference': 'object', 'compare': 'int64'}]
+
+def test_profile_is_persisted_with_the_reference_file(db):
+    profile = DataProfiler().profile(inventory(25))
+    file_id = reference_record(db)
+
+    assert db.update_reference_profile(file_id, profile)
+
+    stored = db.get_reference_file(file_id)
+    assert stored['profile'] == profile
+    assert stored['row_count'] == 25
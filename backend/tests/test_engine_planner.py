@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from conftest import csv_bytes, inventory, xlsx_bytes
+from engine_planner import EnginePlanner
+from file_inspector import FileInspector
+
+MB = 1024 * 1024
+
+def planner(comparator, memory_budget: int) -> EnginePlanner:
+    return EnginePlanner(FileInspector(), comparator, memory_budget)
+
+def upload(reference: pd.DataFrame, compare: pd.DataFrame):
+    return [{'content': csv_bytes(reference), 'filename': 'a.csv'},
+            {'content': csv_bytes(compare), 'filename': 'b.csv'}]
+
+def changed_inventory(rows: int) -> pd.DataFrame:
+    """Inventario con celdas modificadas, filas eliminadas, filas nuevas y una copia repetida"""
+    df = inventory(rows)
+    df.loc[df.index % 7 == 0, 'OS'] = 'Linux'
+    df = df.drop(index=range(10, 20))
+    return pd.concat([df, inventory(15, start=rows), df.iloc[[3]]], ignore_index=True)
+
+def test_small_files_use_the_memory_engine(comparator):
+    plan = planner(comparator, 512 * MB).plan(upload(inventory(100), inventory(100)))
+
+    assert (plan['engine'], plan['reason']) == ('memory', 'within_budget')
+    assert plan['estimated_bytes'] == plan['estimates']['memory']
+    assert [file['rows'] for file in plan['files']] == [100, 100]
+
+def test_files_over_the_budget_use_the_chunked_engine(comparator, monkeypatch):
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 100)
+    reference, compare = inventory(5000), inventory(5000)
+    estimates = planner(comparator, 512 * MB).plan(upload(reference, compare))['estimates']
+    budget = (estimates['memory'] + estimates['chunked']) // 2
+
+    plan = planner(comparator, budget).plan(upload(reference, compare))
+
+    assert (plan['engine'], plan['reason'], plan['chunk_rows']) == ('chunked', 'memory_over_budget', 100)
+    assert plan['estimates']['chunked'] < plan['estimates']['memory']
+
+def test_options_the_chunked_engine_cannot_run_keep_the_memory_engine(comparator):
+    plan = planner(comparator, 1).plan(upload(inventory(100), inventory(100)), {'alignment': 'sequence'})
+
+    assert plan['estimates']['chunked'] is None
+    assert (plan['engine'], plan['reason']) == ('memory', 'over_budget')
+
+def test_requesting_the_chunked_engine_for_excel_is_rejected(comparator):
+    files = [{'content': xlsx_bytes({'Hoja': inventory(5)}), 'filename': 'a.xlsx'},
+             {'content': csv_bytes(inventory(5)), 'filename': 'b.csv'}]
+
+    with pytest.raises(ValueError, match='motor por bloques'):
+        planner(comparator, 512 * MB).plan(files, {'engine': 'chunked'})
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'row_matching': 'multiset'},
+    {'columns': ['Nombre_Maquina', 'OS']},
+    {'ignore_columns': ['IP_Address']}
+])
+def test_chunked_engine_matches_the_memory_engine(comparator, monkeypatch, options):
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 64)
+    reference, compare = csv_bytes(inventory(500)), csv_bytes(changed_inventory(500))
+
+    memory = comparator.compare_files(reference, 'a.csv', compare, 'b.csv', dict(options, engine='memory'))
+    chunked = comparator.compare_files(reference, 'a.csv', compare, 'b.csv', dict(options, engine='chunked'))
+
+    assert chunked['metadata']['engine'] == 'chunked'
+    assert chunked['summary'] == memory['summary']
+    assert chunked['differences'] == memory['differences']
+    assert chunked['identical'] == memory['identical']
+
+def test_compare_endpoint_reports_the_plan(client):
+    files = {'file1': ('a.csv', csv_bytes(inventory(30)), 'text/csv'),
+             'file2': ('b.csv', csv_bytes(changed_inventory(30)), 'text/csv')}
+
+    plan = client.post('/compare?save=false', files=files).json()['metadata']['plan']
+
+    assert plan['engine'] == 'memory'
+    assert plan['files'][0]['rows'] == 30
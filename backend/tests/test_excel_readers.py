@@ -0,0 +1,66 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import excel_readers
+from conftest import inventory, xlsx_bytes
+
+def mixed_sheet() -> pd.DataFrame:
+    """Hoja con enteros, reales, textos, fechas y celdas vacías"""
+    return pd.DataFrame({
+        'Nombre_Maquina': ['PC-1', 'PC-2', None, 'PC-4'],
+        'Memoria': [8, 16, 32, None],
+        'Uso': [0.5, 1.25, None, 2.0],
+        'Alta': [datetime(2024, 1, 5), None, datetime(2023, 12, 31, 8, 30), datetime(2024, 2, 29)]
+    })
+
+def test_the_fastest_installed_engine_comes_first(monkeypatch):
+    monkeypatch.setattr(excel_readers, '_installed', {'calamine': True, 'openpyxl': True, 'xlrd': True})
+    assert excel_readers.available_engines('xlsx') == ['calamine', 'openpyxl']
+
+    monkeypatch.setattr(excel_readers, '_installed', {'calamine': False, 'openpyxl': True, 'xlrd': True})
+    assert excel_readers.available_engines('xls') == ['xlrd']
+    with pytest.raises(ValueError, match='no soportado'):
+        excel_readers.available_engines('ods')
+
+def test_a_failing_engine_falls_back_to_the_next(monkeypatch):
+    def broken(source, sheet_name, usecols):
+        raise RuntimeError('libro no soportado')
+
+    monkeypatch.setattr(excel_readers, '_installed', {'calamine': True, 'openpyxl': True})
+    monkeypatch.setitem(excel_readers.READERS, 'calamine', broken)
+
+    df, engine = excel_readers.read_excel(io.BytesIO(xlsx_bytes({'Hoja': inventory(5)})), 'xlsx')
+
+    assert engine == 'openpyxl'
+    pd.testing.assert_frame_equal(df, inventory(5))
+
+def test_the_last_engine_error_is_raised(monkeypatch):
+    monkeypatch.setattr(excel_readers, '_installed', {'calamine': False, 'openpyxl': True})
+
+    with pytest.raises(Exception):
+        excel_readers.read_excel(io.BytesIO(b'no es un libro'), 'xlsx')
+
+def test_an_engine_for_another_format_is_rejected():
+    with pytest.raises(ValueError, match='Motor de Excel no válido'):
+        excel_readers.read_excel(io.BytesIO(b''), 'xlsx', engine='xlrd')
+
+@pytest.mark.parametrize('usecols', [None, ['Nombre_Maquina', 'Alta']])
+def test_calamine_reads_the_same_frame_as_openpyxl(usecols):
+    pytest.importorskip('python_calamine')
+    content = xlsx_bytes({'Resumen': inventory(3), 'Equipos': mixed_sheet()})
+
+    fast, _ = excel_readers.read_excel(io.BytesIO(content), 'xlsx', 'Equipos', usecols, engine='calamine')
+    reference, _ = excel_readers.read_excel(io.BytesIO(content), 'xlsx', 'Equipos', usecols, engine='openpyxl')
+
+    pd.testing.assert_frame_equal(fast, reference)
+
+def test_the_engine_used_is_reported_in_the_metadata(comparator):
+    content = xlsx_bytes({'Hoja': inventory(10)})
+
+    result = comparator.compare_files(content, 'a.xlsx', content, 'b.xlsx')
+
+    engine = excel_readers.available_engines('xlsx')[0]
+    assert result['metadata']['excelEngines'] == {'reference': engine, 'compare': engine}
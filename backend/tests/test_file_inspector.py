@@ -0,0 +1,86 @@
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from conftest import csv_bytes, inventory, xlsx_bytes
+from file_inspector import FileInspector
+
+@pytest.fixture
+def inspector():
+    return FileInspector()
+
+def inspect(inspector, content: bytes, filename: str):
+    return inspector.inspect(io.BytesIO(content), filename)
+
+@pytest.mark.parametrize('content', [
+    b'a,b\n1,2\n\n3,4\n',
+    b'a,b\n1,2\n   \n3,4',
+    b'a,b\r\n1,2\r\n\r\n3,4\r\n',
+    b'\n\na\n1\n\n\n2\n \n',
+    b'a,b\n1,"x\n\ny"\n',
+    b'a,b\n1,"say ""hi""\n"\n2,3\n'
+])
+def test_csv_rows_match_pandas(inspector, content):
+    expected = pd.read_csv(io.BytesIO(content))
+
+    result = inspect(inspector, content, 'a.csv')
+
+    assert result['rows'] == len(expected)
+    assert result['column_names'] == expected.columns.tolist()
+
+def test_blank_lines_across_block_boundaries(inspector, monkeypatch):
+    monkeypatch.setattr(inspector, 'SCAN_BLOCK_BYTES', 3)
+    content = b'a,b\n1,2\n  \n\n"x\n\n",5\n \r\n3,4'
+
+    assert inspector.count_records(io.BytesIO(content)) - 1 == len(pd.read_csv(io.BytesIO(content)))
+
+def test_csv_is_read_with_the_same_delimiter_as_the_comparison(inspector, comparator):
+    content = b'Nombre;OS\nPC-1;W10\nPC-2;W11\n'
+
+    result = inspect(inspector, content, 'a.csv')
+
+    assert result['column_names'] == comparator.read_file(content, 'a.csv').columns.tolist() == ['Nombre;OS']
+    assert result['rows'] == 2
+
+def test_csv_inspection_agrees_with_read_file(inspector, comparator):
+    content = csv_bytes(inventory(500))
+
+    result = inspect(inspector, content, 'a.csv')
+    df = comparator.read_file(content, 'a.csv')
+
+    assert (result['rows'], result['columns']) == df.shape
+    assert result['column_names'] == df.columns.tolist()
+
+def test_xlsx_empty_header_cells_keep_their_position(inspector, comparator):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Nombre', None, 'OS'])
+    sheet.append(['PC-1', '10.0.0.1', 'W10'])
+    sheet.append(['PC-2', '10.0.0.2', 'W11'])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    result = inspect(inspector, buffer.getvalue(), 'a.xlsx')
+
+    assert result['column_names'] == comparator.read_file(buffer.getvalue(), 'a.xlsx').columns.tolist()
+    assert result['column_names'] == ['Nombre', 'Unnamed: 1', 'OS']
+    assert result['rows'] == 2
+
+def test_xlsx_inspection_agrees_with_read_file(inspector, comparator):
+    content = xlsx_bytes({'Inventario': inventory(40), 'Otra': inventory(5)})
+
+    result = inspect(inspector, content, 'a.xlsx')
+
+    assert (result['rows'], result['columns']) == comparator.read_file(content, 'a.xlsx').shape
+    assert (result['sheet'], result['sheets']) == ('Inventario', 2)
+
+def test_validate_file_header_mode_matches_full_mode(client):
+    content = b'Nombre,OS\nPC-1,W10\n\nPC-2,W11\n'
+
+    header = client.post('/validate-file', files={'file': ('a.csv', content, 'text/csv')}).json()
+    full = client.post('/validate-file?full=true', files={'file': ('a.csv', content, 'text/csv')}).json()
+
+    assert header['validation_mode'] == 'header'
+    assert (header['rows'], header['column_names']) == (full['rows'], full['column_names']) == (2, ['Nombre', 'OS'])
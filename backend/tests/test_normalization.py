@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from normalization import NormalizationPipeline, get_pipeline
+
+def test_rules_canonicalize_values():
+    pipeline = NormalizationPipeline({
+        '*': ['strip', 'nulls'],
+        'IP': ['ip'],
+        'Fecha': ['datetime:dayfirst'],
+        'Precio': ['round:2'],
+        'Usuario': ['collapse_spaces', 'casefold']
+    })
+    df = pd.DataFrame({
+        'IP': [' 192.168.001.010 ', 'sin-ip'],
+        'Fecha': ['05/01/2024', '2024-01-05 10:00'],
+        'Precio': ['1.499', 'nan'],
+        'Usuario': ['Juan   PÉREZ', 'None']
+    })
+
+    normalized = pipeline.apply(df)
+
+    assert normalized['IP'].tolist() == ['192.168.1.10', 'sin-ip']
+    assert normalized['Fecha'].tolist() == ['2024-01-05 00:00:00', '2024-01-05 10:00:00']
+    assert normalized['Precio'].tolist() == ['1.50', '']
+    assert normalized['Usuario'].tolist() == ['juan pérez', '']
+    # El DataFrame original no se modifica
+    assert df['IP'][0] == ' 192.168.001.010 '
+
+def test_named_profiles_are_compiled_once_and_unknown_rules_rejected():
+    assert get_pipeline('inventario') is get_pipeline('inventario')
+    assert get_pipeline(None) is None
+    with pytest.raises(ValueError, match='Perfil de normalización desconocido'):
+        get_pipeline('no-existe')
+    with pytest.raises(ValueError, match='Regla de normalización desconocida'):
+        NormalizationPipeline({'IP': ['trim']})
+
+def test_normalized_values_compare_as_identical(comparator):
+    reference = pd.DataFrame({'Nombre_Maquina': ['pc-001', 'pc-002'], 'IP_Address': ['10.0.0.1', '10.0.0.2']})
+    compare = pd.DataFrame({'Nombre_Maquina': ['PC-001 ', 'PC-002'], 'IP_Address': ['010.000.000.001', '10.0.0.2']})
+
+    plain = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+    normalized = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'normalization': 'inventario'})
+
+    assert not plain['identical']
+    assert normalized['identical']
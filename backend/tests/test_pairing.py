@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from conftest import inventory
+from pairing import pair_similar_rows
+
+def machines(rows: int) -> pd.DataFrame:
+    df = inventory(rows)
+    df['Departamento'] = [f'Dep-{i % 4}' for i in range(rows)]
+    df['Ram'] = 8
+    df['Disco'] = 'SSD'
+    return df
+
+def test_pair_similar_rows_matches_each_row_once():
+    hashes1 = np.array([[1, 2, 3, 4], [5, 6, 7, 8]], dtype=np.uint64)
+    hashes2 = np.array([[50, 60, 7, 8], [1, 2, 3, 40], [1, 2, 30, 40]], dtype=np.uint64)
+
+    left, right, similarity = pair_similar_rows(hashes1, hashes2, 0.5)
+
+    assert sorted(zip(left.tolist(), right.tolist())) == [(0, 1), (1, 0)]
+    assert sorted(similarity.tolist()) == [0.5, 0.75]
+
+def test_pair_similar_rows_ignores_rows_below_the_threshold():
+    hashes1 = np.array([[1, 2, 3, 4]], dtype=np.uint64)
+    hashes2 = np.array([[1, 20, 30, 40]], dtype=np.uint64)
+
+    left, _, _ = pair_similar_rows(hashes1, hashes2, 0.5)
+
+    assert len(left) == 0
+
+def test_fuzzy_pairing_reports_a_modified_row_with_its_changes(comparator):
+    reference = machines(20)
+    compare = machines(20)
+    compare.loc[7, ['IP_Address', 'Departamento']] = ['192.168.1.7', 'Dep-9']
+    # Una máquina distinta en todas sus columnas no se empareja con nada
+    compare.loc[12] = ['PC-99999', '172.16.0.1', 'Linux', 'Dep-X', 64, 'HDD']
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'fuzzy_pairing': True})
+    content = result['different_content']
+
+    assert content['total_modified_rows'] == 1
+    modified = content['modified_rows'][0]
+    assert (modified['reference_row_index'], modified['compare_row_index']) == (7, 7)
+    assert [change['column'] for change in modified['changes']] == ['IP_Address', 'Departamento']
+    assert modified['changes'][1] == {'column': 'Departamento', 'referenceValue': 'Dep-3', 'compareValue': 'Dep-9'}
+    assert content['total_unique_in_reference'] == content['total_unique_in_compare'] == 1
+    assert result['summary']['modifiedRows'] == 1
+
+def test_without_fuzzy_pairing_changed_rows_stay_unique(comparator):
+    reference = machines(5)
+    compare = machines(5)
+    compare.loc[2, 'IP_Address'] = '192.168.1.2'
+
+    content = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')['different_content']
+
+    assert content['total_modified_rows'] == 0
+    assert content['total_unique_in_reference'] == content['total_unique_in_compare'] == 1
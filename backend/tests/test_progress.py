@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+from multiprocessing.managers import SyncManager
+
+import runtime
+from progress import ProgressRegistry
+
+class DeadStore(dict):
+    """Almacén cuyo proceso ya terminó: toda operación falla como un proxy desconectado"""
+
+    def _fail(self, *args):
+        raise BrokenPipeError('gestor detenido')
+
+    __setitem__ = get = setdefault = items = pop = _fail
+
+def run_comparison_elsewhere(store, progress_id):
+    """Otro trabajador: ejecuta la comparación y publica su progreso en el almacén compartido"""
+    progress = ProgressRegistry(store).open(progress_id)
+    progress.start_phase('comparing', 100)
+    progress.advance(100)
+    progress.finish('completed')
+
+def test_progress_goes_through_phases_and_keeps_the_first_final_status():
+    progress = ProgressRegistry().open('local')
+    assert progress.snapshot['status'] == 'waiting'
+
+    progress.start_phase('comparing', 10)
+    progress.finish('incomplete', 'deadline')
+    progress.finish('completed')
+
+    assert progress.snapshot['status'] == 'incomplete'
+    assert progress.snapshot['detail'] == 'deadline'
+    assert progress.snapshot['phase'] == 'comparing'
+
+def test_a_reader_in_another_worker_sees_the_comparison():
+    store = {}
+    reader = ProgressRegistry(store).open('p1')
+    writer = ProgressRegistry(store).open('p1')
+
+    writer.start_phase('comparing', 50)
+    reader.refresh()
+    assert (reader.snapshot['status'], reader.snapshot['phase']) == ('running', 'comparing')
+
+    writer.finish('completed')
+    reader.refresh()
+    assert reader.snapshot['status'] == 'completed'
+    assert reader.version == writer.version
+
+def test_a_reader_opened_after_the_comparison_sees_the_final_status():
+    store = {}
+    writer = ProgressRegistry(store).open('p2')
+    writer.start_phase('comparing')
+    writer.finish('error', 'archivo dañado')
+
+    reader = ProgressRegistry(store).open('p2')
+
+    assert reader.snapshot['status'] == 'error'
+    assert reader.snapshot['detail'] == 'archivo dañado'
+
+def test_progress_is_shared_through_a_manager_across_processes():
+    context = multiprocessing.get_context('spawn')
+    manager = SyncManager(ctx=context)
+    manager.start()
+    try:
+        store = manager.dict()
+        reader = ProgressRegistry(store).open('p3')
+        worker = context.Process(target=run_comparison_elsewhere, args=(store, 'p3'))
+        worker.start()
+        worker.join(30)
+
+        reader.refresh()
+
+        assert reader.snapshot['status'] == 'completed'
+        assert reader.snapshot['rows_processed'] == 100
+    finally:
+        manager.shutdown()
+
+def test_expired_entries_are_removed_from_the_store(monkeypatch):
+    store = {}
+    registry = ProgressRegistry(store)
+    registry.open('old').finish('completed')
+    registry.open('running').start_phase('comparing')
+    monkeypatch.setattr(ProgressRegistry, 'RETENTION_SECONDS', -1)
+
+    registry.open('new')
+
+    assert sorted(store) == ['new', 'running']
+
+def test_a_store_that_stopped_responding_does_not_break_the_comparison():
+    progress = ProgressRegistry(DeadStore()).open('p4')
+
+    progress.start_phase('comparing')
+    progress.finish('completed')
+    progress.refresh()
+
+    assert progress.snapshot['status'] == 'completed'
+
+def test_the_progress_stream_reads_a_comparison_run_by_another_worker(client, monkeypatch):
+    store = {}
+    run_comparison_elsewhere(store, 'p5')
+    monkeypatch.setattr(runtime, '_progress_registry', ProgressRegistry(store))
+
+    response = client.get('/progress/p5')
+
+    data = [line[len('data: '):] for line in response.text.splitlines() if line.startswith('data: ')]
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert json.loads(data[-1])['status'] == 'completed'
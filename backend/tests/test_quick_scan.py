@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import csv_bytes, inventory
+
+def test_quick_scan_is_exact_for_small_files(comparator):
+    reference = inventory(100)
+    compare = inventory(100, start=20)
+    compare.loc[5, 'OS'] = 'Linux'
+
+    result = comparator.quick_scan(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv')
+
+    assert result['exact']
+    assert not result['likely_identical']
+    overlap = result['row_overlap']
+    # 80 máquinas en común, una de ellas con el sistema operativo cambiado
+    assert overlap['common_rows'] == {'estimate': 79, 'error': 0}
+    assert overlap['unique_in_reference']['estimate'] == 21
+    assert overlap['unique_in_compare']['estimate'] == 21
+
+def test_quick_scan_of_identical_files(comparator):
+    content = csv_bytes(inventory(50))
+
+    result = comparator.quick_scan(content, 'a.csv', content, 'b.csv')
+
+    assert result['likely_identical']
+    assert all(rate['change_rate'] == 0 for rate in result['column_change_rates'])
+
+def test_quick_scan_estimates_stay_within_their_error_bounds(comparator, monkeypatch):
+    # Sketch y muestra pequeños y bloques de 1000 filas: la estimación deja de ser exacta
+    monkeypatch.setattr(comparator, 'QUICK_SCAN_SKETCH_SIZE', 256)
+    monkeypatch.setattr(comparator, 'QUICK_SCAN_SAMPLE_ROWS', 200)
+    monkeypatch.setattr(comparator, 'QUICK_SCAN_CHUNK_ROWS', 1000)
+    reference = inventory(6000)
+    compare = inventory(6000, start=2000)
+
+    result = comparator.quick_scan(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv')
+
+    assert not result['exact']
+    common = result['row_overlap']['common_rows']
+    assert abs(common['estimate'] - 4000) <= 2 * common['error']
+    distinct = result['reference']['distinct_rows']
+    assert abs(distinct['estimate'] - 6000) <= 2 * distinct['error']
+    assert result['sampled_rows'] == 200
+    assert {rate['column'] for rate in result['column_change_rates']} == {'Nombre_Maquina', 'IP_Address', 'OS'}
+
+def test_quick_scan_rejects_an_empty_file(comparator):
+    with pytest.raises(ValueError, match='escaneo rápido'):
+        comparator.quick_scan(b'', 'a.csv', csv_bytes(inventory(5)), 'b.csv')
+
+def test_quick_scan_endpoint(client):
+    files = {
+        'file1': ('a.csv', csv_bytes(inventory(30)), 'text/csv'),
+        'file2': ('b.csv', csv_bytes(inventory(30, start=10)), 'text/csv')
+    }
+
+    response = client.post('/quick-scan', files=files)
+
+    assert response.status_code == 200
+    assert response.json()['row_overlap']['common_rows']['estimate'] == 20
@@ -0,0 +1,109 @@
+import io
+import os
+
+import pytest
+
+from conftest import csv_bytes, inventory
+from data_profiler import DataProfiler
+from reference_preprocessor import ReferencePreprocessor, RowHashIndex
+from reference_store import ReferenceStore
+
+@pytest.fixture
+def preprocessor(db, comparator):
+    store = ReferenceStore(db.config.get_reference_files_dir())
+    return ReferencePreprocessor(db, comparator, DataProfiler(), store)
+
+def add_reference(db, preprocessor, content: bytes, filename: str = 'a.csv') -> int:
+    stored = preprocessor.store.ingest(io.BytesIO(content), filename)
+    return db.add_reference_file({
+        'name': filename, 'original_name': filename, 'file_path': stored['file_path'],
+        'file_size': stored['file_size'], 'mime_type': 'text/csv', 'description': '', 'tags': '',
+        'checksum': stored['checksum']
+    })
+
+def test_process_profiles_the_file_and_writes_the_cache(db, preprocessor):
+    file_id = add_reference(db, preprocessor, csv_bytes(inventory(30)))
+
+    assert db.get_pending_reference_ids() == [file_id]
+    assert preprocessor.process(file_id)
+
+    reference = db.get_reference_file(file_id)
+    assert reference['status'] == 'ready'
+    assert reference['profile']['row_count'] == 30
+    assert preprocessor.has_cache(reference)
+    assert db.get_pending_reference_ids() == []
+    # Ya no está pendiente: otro proceso que lo reciba no lo vuelve a tomar
+    assert not preprocessor.process(file_id)
+
+def test_load_uses_the_cache_and_its_row_hash_index(db, preprocessor, comparator):
+    df = inventory(30)
+    file_id = add_reference(db, preprocessor, csv_bytes(df))
+    preprocessor.process(file_id)
+    reference = db.get_reference_file(file_id)
+    # Sin el archivo original solo la caché puede servir la referencia
+    os.remove(reference['file_path'])
+
+    loaded = preprocessor.load(reference)
+    projected = preprocessor.load(reference, columns=['Nombre_Maquina'])
+
+    assert isinstance(loaded.attrs['row_hash_index'], RowHashIndex)
+    assert len(loaded.attrs['row_hash_index'].hashes) == 30
+    assert projected.columns.tolist() == ['Nombre_Maquina']
+    assert 'row_hash_index' not in projected.attrs
+    result = comparator.compare_dataframes(loaded, df, 'a.csv', 'b.csv')
+    assert result['identical']
+
+def test_a_modified_file_ends_in_error(db, preprocessor):
+    file_id = add_reference(db, preprocessor, csv_bytes(inventory(10)))
+    with open(db.get_reference_file(file_id)['file_path'], 'ab') as target:
+        target.write(b'PC-99999,10.0.0.1,W10\n')
+
+    preprocessor.process(file_id)
+
+    reference = db.get_reference_file(file_id)
+    assert reference['status'] == 'error'
+    assert not preprocessor.has_cache(reference)
+
+def test_submitted_files_are_processed_in_the_background(db, preprocessor):
+    file_ids = [add_reference(db, preprocessor, csv_bytes(inventory(10, start=k * 10)), f'{k}.csv')
+                for k in range(3)]
+
+    assert preprocessor.submit_pending() == 3
+    preprocessor._queue.join()
+
+    assert [db.get_reference_file(file_id)['status'] for file_id in file_ids] == ['ready'] * 3
+
+def test_a_reference_interrupted_while_processing_is_resumed(db, preprocessor):
+    file_id = add_reference(db, preprocessor, csv_bytes(inventory(10)))
+    # El proceso que lo tomó terminó antes de acabar: queda en 'processing'
+    db.claim_reference_processing(file_id)
+
+    # Otro trabajador que arranca no se lo quita a uno que quizá sigue preprocesándolo
+    assert db.reset_interrupted_references(older_than=3600) == 0
+    assert db.get_pending_reference_ids() == []
+    assert db.reset_interrupted_references(older_than=-1) == 1
+    assert db.get_pending_reference_ids() == [file_id]
+
+    db.claim_reference_processing(file_id)
+    # El supervisor, antes de lanzar los trabajadores, los retoma todos
+    assert db.reset_interrupted_references() == 1
+    assert preprocessor.process(file_id)
+    assert db.get_reference_file(file_id)['status'] == 'ready'
+
+def test_the_preprocess_endpoint_reclaims_an_interrupted_reference(client, db, monkeypatch):
+    import runtime
+    from config import Config
+
+    uploaded = client.post('/reference-files', files={'file': ('a.csv', csv_bytes(inventory(10)), 'text/csv')}).json()
+    runtime.get_reference_preprocessor()._queue.join()
+    db.set_reference_status(uploaded['file_id'], 'pending')
+    db.claim_reference_processing(uploaded['file_id'])
+
+    assert client.post(f"/reference-files/{uploaded['file_id']}/preprocess").status_code == 409
+
+    monkeypatch.setattr(Config, 'REFERENCE_PROCESSING_TIMEOUT', -1)
+    response = client.post(f"/reference-files/{uploaded['file_id']}/preprocess")
+    runtime.get_reference_preprocessor()._queue.join()
+
+    assert response.status_code == 200
+    assert db.get_reference_file(uploaded['file_id'])['status'] == 'ready'
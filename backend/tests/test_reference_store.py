@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import runtime
+from conftest import csv_bytes, inventory
+from reference_store import ReferenceStore
+
+@pytest.fixture
+def store(tmp_path):
+    return ReferenceStore(str(tmp_path / 'references'))
+
+def test_ingest_stores_the_file_under_its_sha256(store):
+    content = csv_bytes(inventory(10))
+
+    stored = store.ingest(io.BytesIO(content), 'Inventario.CSV')
+
+    checksum = hashlib.sha256(content).hexdigest()
+    assert stored == {'checksum': checksum, 'file_path': store.path_for(checksum, 'csv'),
+                      'file_size': len(content), 'stored': True}
+    assert os.path.basename(os.path.dirname(stored['file_path'])) == checksum[:2]
+    with open(stored['file_path'], 'rb') as source:
+        assert source.read() == content
+
+def test_identical_content_is_stored_once(store, monkeypatch):
+    monkeypatch.setattr(store, 'BLOCK_BYTES', 7)
+    content = csv_bytes(inventory(10))
+
+    first = store.ingest(io.BytesIO(content), 'a.csv')
+    second = store.ingest(io.BytesIO(content), 'otro nombre.csv')
+
+    assert second['file_path'] == first['file_path']
+    assert not second['stored']
+    # No quedan temporales junto a la raíz
+    assert sorted(os.listdir(store.root_dir)) == [first['checksum'][:2]]
+
+def test_verify_detects_a_modified_or_missing_file(store):
+    stored = store.ingest(io.BytesIO(b'a,b\n1,2\n'), 'a.csv')
+
+    assert store.verify(stored['file_path'], stored['checksum'])
+    assert not store.verify(stored['file_path'], None)
+
+    with open(stored['file_path'], 'ab') as target:
+        target.write(b'3,4\n')
+    with pytest.raises(ValueError, match='modificado'):
+        store.verify(stored['file_path'], stored['checksum'])
+
+    os.remove(stored['file_path'])
+    with pytest.raises(ValueError, match='no existe'):
+        store.verify(stored['file_path'], stored['checksum'])
+
+def test_verify_accepts_legacy_md5_checksums(store):
+    content = b'a,b\n1,2\n'
+    stored = store.ingest(io.BytesIO(content), 'a.csv')
+
+    assert store.verify(stored['file_path'], hashlib.md5(content).hexdigest().upper())
+
+def test_uploading_the_same_reference_twice_returns_the_existing_file(client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(runtime.get_reference_preprocessor(), 'submit', submitted.append)
+    content = csv_bytes(inventory(10))
+
+    first = client.post('/reference-files', files={'file': ('a.csv', content, 'text/csv')}).json()
+    second = client.post('/reference-files', files={'file': ('b.csv', content, 'text/csv')}).json()
+
+    assert (first['duplicate'], first['status']) == (False, 'pending')
+    assert second['duplicate']
+    assert (second['file_id'], second['filename'], second['checksum']) == (
+        first['file_id'], 'a.csv', hashlib.sha256(content).hexdigest()
+    )
+    assert submitted == [first['file_id']]
+    assert len(client.get('/reference-files').json()) == 1
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from conftest import csv_bytes, inventory
+from sketches import KMVSketch, hash_values
+
+def test_kmv_sketch_is_exact_below_k():
+    sketch = KMVSketch(64).update(hash_values(pd.Series(range(40))))
+
+    assert sketch.is_exact()
+    assert sketch.estimate() == 40
+
+def test_kmv_sketch_estimates_cardinality_and_jaccard():
+    first = KMVSketch(512).update(hash_values(pd.Series(np.arange(20000))))
+    second = KMVSketch(512).update(hash_values(pd.Series(np.arange(10000, 30000))))
+
+    assert abs(first.estimate() - 20000) < 20000 * 4 * first.relative_error()
+    # Intersección 10000, unión 30000
+    assert abs(first.jaccard(second) - 1 / 3) < 0.1
+
+def test_an_empty_sketch_is_not_similar_to_anything():
+    empty = KMVSketch(64)
+
+    assert empty.jaccard(KMVSketch(64)) == 0.0
+    assert empty.jaccard(KMVSketch(64).update(hash_values(pd.Series(range(10))))) == 0.0
+
+def test_renamed_column_is_reported_and_content_is_still_compared(comparator):
+    reference = inventory(30)
+    compare = reference.rename(columns={'IP_Address': 'Direccion_IP'})
+    compare.loc[4, 'OS'] = 'Linux'
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+
+    assert [d['type'] for d in result['differences']] == ['column_renamed', 'cell_modified']
+    renamed = result['differences'][0]
+    assert renamed['column'] == 'IP_Address'
+    assert renamed['compareValue'] == "Columna 'Direccion_IP'"
+    assert result['summary']['renamedColumns'] == 1
+    assert result['differences'][1]['row'] == 5
+
+def test_unrelated_columns_are_not_renamed(comparator):
+    reference = inventory(30)
+    compare = reference.drop(columns=['IP_Address']).assign(Ubicacion=[f'Sala {i}' for i in range(30)])
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+
+    assert sorted(d['type'] for d in result['differences'] if d['type'].startswith('column')) == [
+        'column_added', 'column_missing'
+    ]
+    assert result['summary']['renamedColumns'] == 0
+
+def test_low_cardinality_and_empty_columns_are_not_renamed(comparator):
+    reference = inventory(30).assign(Activo=['S', 'N'] * 15, Notas=None)
+    # Otras columnas con los mismos indicadores S/N y también vacías, sin relación con las retiradas
+    compare = inventory(30).assign(Garantia=['N', 'S'] * 15, Comentarios=None)
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+
+    assert result['summary']['renamedColumns'] == 0
+    assert result['summary']['removedColumns'] == result['summary']['addedColumns'] == 2
+
+def test_columns_with_a_different_number_of_values_are_not_renamed(comparator):
+    # Los 60 códigos de Lote están entre los 100 de Codigo: Jaccard 0.6, pero no es la misma columna
+    reference = pd.DataFrame({'Nombre_Maquina': [f'PC-{i}' for i in range(100)], 'Codigo': range(100)})
+    compare = pd.DataFrame({'Nombre_Maquina': [f'PC-{i}' for i in range(100)], 'Lote': [i % 60 for i in range(100)]})
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')
+
+    assert result['summary']['renamedColumns'] == 0
+
+def test_rename_detection_can_be_disabled(comparator):
+    reference = inventory(30)
+    compare = reference.rename(columns={'IP_Address': 'Direccion_IP'})
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'detect_renames': False})
+
+    assert result['summary']['renamedColumns'] == 0
+    assert result['summary']['removedColumns'] == result['summary']['addedColumns'] == 1
+
+def test_chunked_engine_detects_the_same_rename(comparator, monkeypatch):
+    reference = inventory(30)
+    compare = reference.rename(columns={'IP_Address': 'Direccion_IP'})
+    compare.loc[17, 'OS'] = 'Linux'
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 8)
+
+    chunked = comparator.compare_chunked(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv')
+    memory = comparator.compare_files(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv')
+
+    assert chunked['summary'] == memory['summary']
+    assert chunked['summary']['renamedColumns'] == 1
@@ -0,0 +1,130 @@
+import csv
+import io
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from conftest import csv_bytes, inventory, xlsx_bytes
+from report_exporter import ReportExporter
+
+def read_csv_report(content: bytes):
+    return list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+
+def modified_inventory(rows: int, modified: int) -> pd.DataFrame:
+    df = inventory(rows)
+    df.loc[:modified - 1, 'OS'] = 'Linux'
+    return df
+
+def test_stream_csv_writes_every_difference_in_chunks():
+    exporter = ReportExporter()
+    differences = ({'type': 'cell_modified', 'row': i, 'column': 'OS', 'referenceValue': 'W10',
+                    'compareValue': 'W11'} for i in range(1, 2501))
+
+    chunks = list(exporter.stream(differences, 'csv', {}))
+
+    # Un bloque por cada CSV_FLUSH_ROWS filas más el resto
+    assert len(chunks) == 3
+    rows = read_csv_report(b''.join(chunks))
+    assert rows[0] == [label for _, label in ReportExporter.COLUMNS]
+    assert len(rows) == 2501
+    assert rows[-1][2] == '2500'
+
+def test_stream_xlsx_writes_differences_and_summary():
+    exporter = ReportExporter()
+    differences = [
+        {'type': 'cell_modified', 'row': 2, 'column': 'OS', 'referenceValue': 'W10', 'compareValue': 'W11'},
+        {'type': 'row_added', 'row': 5, 'data': {'Nombre_Maquina': 'PC-NEW'}}
+    ]
+
+    content = b''.join(exporter.stream(iter(differences), 'excel', {'referenceFileName': 'a.csv'}))
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True)
+    assert workbook.sheetnames == ['Resumen', 'Diferencias']
+    rows = list(workbook['Diferencias'].values)
+    assert len(rows) == 3
+    assert rows[2][6] == 'Nombre_Maquina=PC-NEW'
+    summary = dict(workbook['Resumen'].values)
+    assert summary['Archivo de referencia'] == 'a.csv'
+    assert summary['Total de diferencias'] == 2
+
+def test_export_of_saved_comparison_contains_every_difference(client):
+    reference = inventory(400)
+    compare = modified_inventory(400, 250)
+
+    response = client.post('/compare?save=true', files={
+        'file1': ('referencia.csv', csv_bytes(reference)),
+        'file2': ('nuevo.csv', csv_bytes(compare))
+    })
+    assert response.status_code == 200
+    # El resultado guardado solo conserva las primeras diferencias
+    assert response.json()['summary']['differences'] == 250
+    assert len(response.json()['differences']) < 250
+
+    export = client.get(f"/comparisons/{response.headers['X-Comparison-Id']}/export?format=csv")
+
+    assert export.status_code == 200
+    assert 'X-Report-Truncated' not in export.headers
+    rows = read_csv_report(export.content)
+    assert len(rows) == 251
+    assert {row[0] for row in rows[1:]} == {'cell_modified'}
+
+def test_export_reports_truncation_when_files_are_gone(client, db):
+    response = client.post('/compare?save=true', files={
+        'file1': ('referencia.csv', csv_bytes(inventory(400))),
+        'file2': ('nuevo.csv', csv_bytes(modified_inventory(400, 250)))
+    })
+    comparison_id = int(response.headers['X-Comparison-Id'])
+    os.remove(db.get_comparison_details(comparison_id)['compare_file_path'])
+
+    export = client.get(f'/comparisons/{comparison_id}/export?format=csv')
+
+    assert export.status_code == 200
+    stored = len(response.json()['differences'])
+    assert export.headers['X-Report-Truncated'] == f'{stored}/250'
+    assert len(read_csv_report(export.content)) == stored + 1
+
+def save_workbook_comparison(client, monkeypatch):
+    """Comparación de libros guardada: 250 celdas en 'Equipos', 2 filas en 'Red' y una hoja nueva"""
+    from config import Config
+    # Un solo proceso: las hojas se comparan en este hilo, sin arrancar el pool
+    monkeypatch.setattr(Config, 'WORKBOOK_WORKERS', 1)
+    reference = xlsx_bytes({'Equipos': inventory(400), 'Red': inventory(20)})
+    compare = xlsx_bytes({'Equipos': modified_inventory(400, 250), 'Red': inventory(18), 'Notas': inventory(1)})
+    response = client.post('/compare/workbook?save=true', files={
+        'file1': ('referencia.xlsx', reference), 'file2': ('nuevo.xlsx', compare)
+    })
+    assert response.status_code == 200
+    assert response.json()['summary']['differences'] == 253
+    return response
+
+def test_export_of_saved_workbook_comparison_contains_every_sheet(client, monkeypatch):
+    response = save_workbook_comparison(client, monkeypatch)
+    assert len(response.json()['sheets'][0]['differences']) < 250
+
+    export = client.get(f"/comparisons/{response.headers['X-Comparison-Id']}/export?format=csv")
+
+    assert export.status_code == 200
+    assert 'X-Report-Truncated' not in export.headers
+    rows = read_csv_report(export.content)
+    assert rows[0][:2] == ['Hoja', 'Tipo']
+    assert len(rows) == 254
+    by_sheet = {}
+    for row in rows[1:]:
+        by_sheet.setdefault(row[0], set()).add(row[1])
+    assert by_sheet == {'Equipos': {'cell_modified'}, 'Red': {'row_removed'}, 'Notas': {'structure_difference'}}
+
+def test_export_of_saved_workbook_comparison_without_its_files(client, db, monkeypatch):
+    response = save_workbook_comparison(client, monkeypatch)
+    comparison_id = int(response.headers['X-Comparison-Id'])
+    os.remove(db.get_comparison_details(comparison_id)['compare_file_path'])
+
+    export = client.get(f'/comparisons/{comparison_id}/export?format=xlsx')
+
+    stored = sum(len(sheet['differences']) for sheet in response.json()['sheets']) + 1
+    assert export.headers['X-Report-Truncated'] == f'{stored}/253'
+    sheet = load_workbook(io.BytesIO(export.content), read_only=True)['Diferencias']
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][0] == 'Hoja'
+    assert len(rows) == stored + 1
+    assert {row[0] for row in rows[1:]} == {'Equipos', 'Red', 'Notas'}
@@ -0,0 +1,66 @@
+from conftest import csv_bytes, inventory
+from result_cache import ResultCache, content_checksum
+
+def post_compare(client, reference: bytes, compare: bytes, names=('a.csv', 'b.csv'), **data):
+    files = {'file1': (names[0], reference, 'text/csv'), 'file2': (names[1], compare, 'text/csv')}
+    return client.post('/compare?save=false', files=files, data=data)
+
+def test_a_cache_hit_returns_the_same_result(client):
+    reference = csv_bytes(inventory(200))
+    compare = inventory(200)
+    compare.loc[10, 'OS'] = 'Linux'
+    compare = csv_bytes(compare)
+
+    miss = post_compare(client, reference, compare)
+    hit = post_compare(client, reference, compare)
+
+    assert miss.headers['X-Cache'] == 'MISS'
+    assert hit.headers['X-Cache'] == 'HIT'
+    expected = miss.json()
+    expected['metadata']['cached'] = True
+    assert hit.json() == expected
+
+def test_the_same_content_under_other_names_is_a_hit(client):
+    reference = csv_bytes(inventory(20))
+    compare = csv_bytes(inventory(20, start=5))
+
+    post_compare(client, reference, compare)
+    renamed = post_compare(client, reference, compare, names=('enero.csv', 'febrero.csv'))
+
+    assert renamed.headers['X-Cache'] == 'HIT'
+    metadata = renamed.json()['metadata']
+    assert (metadata['referenceFileName'], metadata['compareFileName']) == ('enero.csv', 'febrero.csv')
+
+def test_other_options_are_a_miss(client):
+    reference = csv_bytes(inventory(20))
+    compare = csv_bytes(inventory(20, start=5))
+
+    post_compare(client, reference, compare)
+    other = post_compare(client, reference, compare, options='{"row_matching": "multiset"}')
+
+    assert other.headers['X-Cache'] == 'MISS'
+
+def test_key_depends_on_content_format_options_and_engine_version(db):
+    cache = ResultCache(db, '2.1', 1024, 1024 * 1024)
+    checksum = content_checksum(b'a')
+    key = cache.make_key(checksum, 'a.csv', checksum, 'b.csv', {'columns': None})
+
+    assert key == cache.make_key(checksum, 'x.CSV', checksum, 'y.csv', {'columns': None})
+    assert key != cache.make_key(checksum, 'a.xlsx', checksum, 'b.csv', {'columns': None})
+    assert key != cache.make_key(content_checksum(b'b'), 'a.csv', checksum, 'b.csv', {'columns': None})
+    assert key != cache.make_key(checksum, 'a.csv', checksum, 'b.csv', {'columns': ['OS']})
+    assert key != ResultCache(db, '2.2', 1024, 1024 * 1024).make_key(
+        checksum, 'a.csv', checksum, 'b.csv', {'columns': None}
+    )
+
+def test_entries_evicted_from_memory_are_read_from_the_database(db):
+    cache = ResultCache(db, '2.1', 100, 1024 * 1024)
+    cache.put('first', b'x' * 60)
+    cache.put('second', b'y' * 60)
+
+    assert cache.get('first') == b'x' * 60
+    assert cache.get('missing') is None
+    stats = cache.stats()
+    # 'first' sale de la memoria al guardar 'second' y vuelve a entrar desde la base de datos
+    assert (stats['memory_evictions'], stats['database_hits'], stats['misses']) == (2, 1, 1)
+    assert stats['memory']['entries'] == 1
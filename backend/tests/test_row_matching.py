@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from conftest import csv_bytes, inventory
+
+def with_copies(df: pd.DataFrame, row: int, copies: int) -> pd.DataFrame:
+    """Inventario con copias adicionales de una fila al final"""
+    return pd.concat([df] + [df.iloc[[row]]] * copies, ignore_index=True)
+
+def test_set_mode_ignores_a_missing_copy(comparator):
+    reference = with_copies(inventory(5), 2, 1)
+    compare = inventory(5)
+
+    content = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv')['different_content']
+
+    assert content['total_unique_in_reference'] == 0
+    assert content['duplicates_in_reference'] == 1
+
+def test_multiset_mode_reports_surplus_copies_with_positions(comparator):
+    reference = with_copies(inventory(5), 2, 2)
+    compare = with_copies(inventory(5), 2, 1)
+
+    content = comparator.compare_dataframes(
+        reference, compare, 'a.csv', 'b.csv', {'row_matching': 'multiset'}
+    )['different_content']
+
+    assert content['row_matching'] == 'multiset'
+    assert content['total_unique_in_reference'] == 1
+    assert content['total_unique_in_compare'] == 0
+    surplus = content['unique_in_reference'][0]
+    # La copia sobrante es la última aparición de PC-00002
+    assert surplus['row_index'] == 6
+    assert surplus['data']['Nombre_Maquina'] == 'PC-00002'
+    assert (surplus['reference_count'], surplus['compare_count']) == (3, 2)
+
+def test_multiset_mode_counts_duplicates_on_both_sides(comparator):
+    reference = with_copies(inventory(4), 0, 1)
+    compare = with_copies(with_copies(inventory(4), 1, 2), 3, 1)
+
+    summary = comparator.compare_dataframes(
+        reference, compare, 'a.csv', 'b.csv', {'row_matching': 'multiset'}
+    )['summary']
+
+    assert summary['uniqueInReference'] == 1
+    assert summary['uniqueInCompare'] == 3
+    assert summary['duplicatesInReference'] == 1
+    assert summary['duplicatesInCompare'] == 3
+
+def test_chunked_engine_counts_copies_across_chunks(comparator, monkeypatch):
+    reference = with_copies(inventory(12), 1, 3)
+    compare = with_copies(inventory(12), 1, 1)
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 5)
+    options = {'row_matching': 'multiset'}
+
+    chunked = comparator.compare_chunked(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv', options)
+    memory = comparator.compare_files(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv', options)
+
+    assert chunked['summary'] == memory['summary']
+    assert chunked['summary']['uniqueInReference'] == 2
+
+def test_unknown_row_matching_mode_is_rejected(comparator):
+    with pytest.raises(ValueError, match='emparejamiento'):
+        comparator.resolve_options({'row_matching': 'bag'})
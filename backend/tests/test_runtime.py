@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import time
+
+import runtime
+from conftest import BACKEND_DIR
+
+def test_importing_main_does_not_load_heavy_modules(tmp_path):
+    # Un proceso nuevo: en este ya están cargados pandas y SQLAlchemy
+    code = "import sys, main; print(sorted(m for m in ('pandas', 'numpy', 'sqlalchemy') if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, LOG_FILE=str(tmp_path / 'app.log'))
+    )
+    assert output.returncode == 0, output.stderr
+    assert output.stdout.strip() == '[]'
+
+def test_ready_returns_503_until_warm_up_finishes(client, monkeypatch):
+    monkeypatch.setattr(runtime, '_state', {
+        'started_at': time.time(), 'database_ready': False, 'engine_ready': False,
+        'ready_at': None, 'error': None, 'timings': {}
+    })
+    monkeypatch.setattr(runtime, '_comparator', None)
+
+    assert client.get('/health').status_code == 200
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json()['ready'] is False
+
+    # La base de datos ya está creada por la prueba; warm_up carga el motor
+    runtime._state['database_ready'] = True
+    runtime.warm_up()
+
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json()['engine_ready'] is True
+    assert response.json()['startup_seconds'] is not None
+
+def test_shared_objects_are_created_once():
+    assert runtime.get_exporter() is runtime.get_exporter()
+    assert runtime.get_inspector() is runtime.get_inspector()
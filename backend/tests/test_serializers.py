@@ -0,0 +1,47 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import serializers
+from serializers import dumps, loads, JSONBytesResponse
+
+RESULT = {
+    'summary': {'differences': np.int64(3), 'ratio': np.float32(0.5), 'identical': np.bool_(False)},
+    'differences': [
+        {'row': np.int64(2), 'referenceValue': float('nan'), 'compareValue': pd.NaT},
+        {'row': 3, 'referenceValue': pd.Timestamp('2024-01-02 03:04:05'), 'compareValue': date(2024, 1, 3)},
+        {'row': 4, 'referenceValue': pd.NA, 'compareValue': pd.Timedelta(seconds=90)}
+    ],
+    'different_content': {np.int64(7): [np.int32(1), np.int32(2)]}
+}
+
+EXPECTED = {
+    'summary': {'differences': 3, 'ratio': 0.5, 'identical': False},
+    'differences': [
+        {'row': 2, 'referenceValue': None, 'compareValue': None},
+        {'row': 3, 'referenceValue': '2024-01-02T03:04:05', 'compareValue': '2024-01-03'},
+        {'row': 4, 'referenceValue': None, 'compareValue': 90.0}
+    ],
+    'different_content': {'7': [1, 2]}
+}
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_converts_numpy_and_pandas_values(monkeypatch, use_orjson):
+    if use_orjson and serializers.orjson is None:
+        pytest.skip('orjson no está instalado')
+    if not use_orjson:
+        monkeypatch.setattr(serializers, 'orjson', None)
+
+    encoded = dumps(RESULT)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == EXPECTED
+    assert loads(encoded) == EXPECTED
+
+def test_bytes_response_is_sent_without_reencoding():
+    body = dumps({'identical': True})
+    assert JSONBytesResponse(content=body).body == body
+    assert JSONBytesResponse(content={'identical': True}).body == body
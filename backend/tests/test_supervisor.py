@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from conftest import BACKEND_DIR
+
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+from start_production import BackendSupervisor
+
+def crashed_worker(served: bool = False):
+    """Trabajador que ya terminó con error; con served, después de haber publicado un latido"""
+    started = time.time()
+    return {
+        'process': SimpleNamespace(pid=1234, exitcode=1, is_alive=lambda: False),
+        'heartbeat': SimpleNamespace(value=started + 1 if served else started - 1),
+        'started': started,
+        'slot': 0
+    }
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    # El supervisor se sitúa en el directorio del backend: se restaura al terminar la prueba
+    monkeypatch.chdir(os.getcwd())
+    monkeypatch.setattr(Config, 'WORKER_RESTART_BACKOFF', 1)
+    monkeypatch.setattr(Config, 'WORKER_RESTART_BACKOFF_MAX', 3)
+    monkeypatch.setattr(Config, 'WORKER_MAX_STARTUP_FAILURES', 4)
+    supervisor = BackendSupervisor(workers=1)
+    monkeypatch.setattr(supervisor, 'release_slot', lambda worker: None)
+    return supervisor
+
+def test_a_crashing_worker_is_replaced_with_a_growing_delay(supervisor, monkeypatch):
+    spawned = []
+    monkeypatch.setattr(supervisor, 'spawn_worker', lambda: spawned.append(1) or crashed_worker())
+    supervisor.workers = [crashed_worker()]
+
+    delays = []
+    for _ in range(3):
+        supervisor.supervise()
+        delays.append(round(supervisor.restart_at[0] - time.time()))
+        # Mientras espera no se reemplaza; al cumplirse el plazo, sí
+        supervisor.supervise()
+        assert supervisor.workers == [None]
+        supervisor.restart_at[0] = 0
+        supervisor.supervise()
+
+    assert delays == [1, 2, 3]
+    assert len(spawned) == 3
+    assert supervisor.running
+
+def test_the_supervisor_stops_after_repeated_startup_crashes(supervisor, monkeypatch):
+    monkeypatch.setattr(supervisor, 'spawn_worker', crashed_worker)
+    supervisor.workers = [crashed_worker()]
+
+    for _ in range(4):
+        supervisor.supervise()
+        supervisor.restart_at = dict.fromkeys(supervisor.restart_at, 0)
+        supervisor.supervise()
+
+    assert not supervisor.running
+    assert supervisor.exit_code == 1
+
+def test_a_worker_that_served_starts_a_new_count(supervisor, monkeypatch):
+    supervisor.crashes = [3]
+    supervisor.workers = [crashed_worker(served=True)]
+
+    supervisor.supervise()
+
+    assert supervisor.crashes == [1]
+    assert supervisor.running
@@ -0,0 +1,84 @@
+import pandas as pd
+
+from conftest import csv_bytes
+
+def stock(values, names=('PC-1', 'PC-2', 'PC-3')):
+    return pd.DataFrame({'Nombre': list(names), 'Precio': values})
+
+def test_values_on_either_side_of_a_bucket_edge_match(comparator):
+    # 1.04 / 0.1 y 1.06 / 0.1 se redondean a múltiplos distintos (10 y 11), pero difieren en 0.02
+    reference = stock([1.04, 2.0, 3.0])
+    compare = stock([1.06, 2.0, 3.0])
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Precio': 0.1}})
+
+    assert result['identical']
+    assert result['summary']['uniqueInReference'] == 0
+    assert result['summary']['uniqueInCompare'] == 0
+
+def test_matching_within_tolerance_does_not_depend_on_row_order(comparator):
+    reference = stock([1.04, 2.0, 3.0])
+    compare = stock([3.0, 1.06, 2.0], names=('PC-3', 'PC-1', 'PC-2'))
+
+    result = comparator.compare_dataframes(
+        reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Precio': 0.1}, 'row_matching': 'multiset'}
+    )
+
+    assert result['summary']['uniqueInReference'] == 0
+    assert result['summary']['uniqueInCompare'] == 0
+
+def test_values_outside_the_tolerance_stay_unique(comparator):
+    reference = stock([1.04, 2.0, 3.0])
+    compare = stock([1.20, 2.0, 3.0])
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Precio': 0.1}})
+
+    assert result['summary']['uniqueInReference'] == 1
+    assert result['summary']['uniqueInCompare'] == 1
+    assert [d['type'] for d in result['differences']] == ['cell_modified']
+
+def test_other_columns_must_still_match_exactly(comparator):
+    reference = stock([1.04, 2.0, 3.0])
+    compare = stock([1.06, 2.0, 3.0], names=('PC-9', 'PC-2', 'PC-3'))
+
+    result = comparator.compare_dataframes(reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Precio': 0.1}})
+
+    assert result['summary']['uniqueInReference'] == 1
+    assert result['different_content']['unique_in_reference'][0]['data']['Nombre'] == 'PC-1'
+
+def test_time_tolerance_and_ignored_columns(comparator):
+    reference = pd.DataFrame({'Nombre': ['PC-1', 'PC-2'], 'Acceso': ['2024-01-01 10:00:00', '2024-01-01 11:00:00'],
+                              'Nota': ['a', 'b']})
+    compare = pd.DataFrame({'Nombre': ['PC-1', 'PC-2'], 'Acceso': ['2024-01-01 10:01:00', '2024-01-01 11:05:00'],
+                            'Nota': ['x', 'y']})
+
+    result = comparator.compare_dataframes(
+        reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Acceso': '90s'}, 'ignore_columns': ['Nota']}
+    )
+
+    assert [(d['row'], d['column']) for d in result['differences']] == [(2, 'Acceso')]
+
+def test_chunked_engine_matches_within_tolerance(comparator, monkeypatch):
+    reference = stock([1.04, 2.0, 3.0] * 4, names=[f'PC-{i}' for i in range(12)])
+    compare = stock([1.06, 2.0, 3.0] * 4, names=[f'PC-{i}' for i in range(12)])
+    # Bloques de 5 filas: los pares quedan en bloques distintos del archivo
+    monkeypatch.setattr(comparator, 'CHUNKED_ENGINE_ROWS', 5)
+    options = {'tolerances': {'Precio': 0.1}}
+
+    chunked = comparator.compare_chunked(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv', options)
+    memory = comparator.compare_files(csv_bytes(reference), 'a.csv', csv_bytes(compare), 'b.csv', options)
+
+    assert chunked['summary'] == memory['summary']
+    assert chunked['summary']['uniqueInReference'] == chunked['summary']['uniqueInCompare'] == 0
+
+def test_fuzzy_pairing_reports_only_changes_outside_the_tolerance(comparator):
+    reference = pd.DataFrame({'Nombre': ['PC-1'], 'Ram': [8], 'Disco': ['SSD'], 'Precio': [1.04]})
+    compare = pd.DataFrame({'Nombre': ['PC-1'], 'Ram': [16], 'Disco': ['SSD'], 'Precio': [1.06]})
+
+    result = comparator.compare_dataframes(
+        reference, compare, 'a.csv', 'b.csv', {'tolerances': {'Precio': 0.1}, 'fuzzy_pairing': True}
+    )
+
+    modified = result['different_content']['modified_rows']
+    assert len(modified) == 1
+    assert [change['column'] for change in modified[0]['changes']] == ['Ram']
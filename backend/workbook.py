@@ -0,0 +1,434 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from cancellation import CancellationToken, ComparisonCancelled
+from chunked import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+# FileComparator de cada proceso del pool, creado con el primer par de hojas que compara
+_worker_comparator = None
+
+def compare_sheet_pair(task: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Compara un par de hojas dentro de un proceso del pool
+    El token de cancelación no cruza procesos: el plazo llega como hora absoluta (time.time())
+    """
+    global _worker_comparator
+    if _worker_comparator is None:
+        from file_comparator import FileComparator
+        _worker_comparator = FileComparator()
+    cancel = CancellationToken(max(deadline - time.time(), 0.001)) if deadline is not None else None
+    return run_sheet_pair(_worker_comparator, task, cancel)
+
+def run_sheet_pair(comparator, task: Dict[str, Any], cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    Lee las dos hojas desde los libros en disco y las compara
+    Un error o una cancelación se devuelven como resultado de la hoja para no perder las demás
+    Con task['record_changes'] el resultado lleva además los cambios de la hoja en 'changeLog'
+    """
+    options = task['options']
+    try:
+        df1 = comparator.read_path(task['reference_path'], options['columns'], options['ignore_columns'],
+                                   task['reference_sheet'])
+        df2 = comparator.read_path(task['compare_path'], options['columns'], options['ignore_columns'],
+                                   task['compare_sheet'])
+        changes = None
+        if task['record_changes']:
+            # El registro se devuelve aparte del resultado de la hoja y compare lo pasa al del libro
+            changes = comparator.new_change_log()
+            changes.sheet = task['reference_sheet']
+        result = comparator.compare_dataframes(
+            df1, df2, task['reference_name'], task['compare_name'], options, cancel, changes
+        )
+        if changes is not None:
+            result['changeLog'] = {'rows': changes.rows, 'total': changes.total}
+        return result
+    except ComparisonCancelled as stop:
+        return {'cancelled': stop.reason}
+    except Exception as e:
+        return {'error': str(e)}
+
+class WorkbookComparator:
+    """
+    Compara dos libros de Excel hoja a hoja
+    Las hojas se emparejan por nombre y las restantes por similitud de encabezados; cada par se
+    compara con FileComparator en un pool de procesos (leer con openpyxl ocupa la CPU sin liberar
+    el GIL, así que los hilos no avanzarían en paralelo) y el reporte reúne el resultado de cada
+    hoja con un resumen agregado del libro
+    """
+
+    EXCEL_FORMATS = ['xlsx', 'xls']
+
+    # Similitud mínima de encabezados (Jaccard) para emparejar hojas de nombre distinto
+    STRUCTURE_MIN_SIMILARITY = 0.5
+
+    # Campos del resumen de cada hoja que se suman en el resumen del libro
+    SUMMARY_TOTALS = [
+        'totalRows', 'differences', 'addedRows', 'removedRows', 'modifiedCells', 'movedRows', 'movedBlocks',
+        'addedColumns', 'removedColumns', 'renamedColumns', 'referenceRows', 'compareRows',
+        'uniqueInReference', 'uniqueInCompare', 'modifiedRows', 'duplicatesInReference', 'duplicatesInCompare'
+    ]
+
+    # Segundos entre comprobaciones del token mientras el pool compara las hojas
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, comparator, max_workers: int):
+        self.comparator = comparator
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Pool de procesos compartido, creado con la primera comparación que lo necesita"""
+        with self._lock:
+            if self._pool is None:
+                # spawn, como el supervisor: el servidor tiene hilos y fork copiaría cerrojos ocupados
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        """Descarta un pool roto (un proceso terminó de forma abrupta); el siguiente uso crea otro"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def list_sheets(self, path: str) -> List[Dict[str, Any]]:
+        """
+        Nombre y encabezados de cada hoja de cálculo del libro
+        Solo se lee la primera fila de cada hoja (openpyxl en modo de solo lectura, xlrd bajo demanda)
+        """
+        if path.lower().endswith('.xls'):
+            import xlrd
+
+            workbook = xlrd.open_workbook(path, on_demand=True)
+            try:
+                sheets = []
+                for index, name in enumerate(workbook.sheet_names()):
+                    sheet = workbook.sheet_by_index(index)
+                    sheets.append({'name': name, 'columns': self._header(sheet.row_values(0) if sheet.nrows else [])})
+                    workbook.unload_sheet(index)
+                return sheets
+            finally:
+                workbook.release_resources()
+
+        from openpyxl import load_workbook
+
+        # worksheets excluye las hojas de gráficos, que no tienen celdas que comparar
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            return [
+                {'name': sheet.title, 'columns': self._header(next(sheet.iter_rows(max_row=1, values_only=True), ()))}
+                for sheet in workbook.worksheets
+            ]
+        finally:
+            workbook.close()
+
+    def _header(self, values) -> List[str]:
+        return [str(value).strip() for value in values if value is not None and str(value).strip()]
+
+    def _similarity(self, columns1: List[str], columns2: List[str]) -> float:
+        names1 = {column.casefold() for column in columns1}
+        names2 = {column.casefold() for column in columns2}
+        if not names1 or not names2:
+            return 0.0
+        return len(names1 & names2) / len(names1 | names2)
+
+    def pair_sheets(self, sheets1: List[Dict[str, Any]],
+                    sheets2: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+        """
+        Empareja las hojas de ambos libros: primero por nombre exacto, luego por nombre sin
+        mayúsculas ni espacios y, entre las restantes, por similitud de encabezados (de mayor a menor)
+        Retorna los pares en el orden del libro de referencia y las hojas sin pareja de cada libro
+        """
+        pairs = []
+        left, right = list(sheets1), list(sheets2)
+
+        for key in (lambda name: name, lambda name: name.strip().casefold()):
+            by_name = {}
+            for sheet in right:
+                by_name.setdefault(key(sheet['name']), sheet)
+            unmatched = []
+            for sheet in left:
+                match = by_name.pop(key(sheet['name']), None)
+                if match is None:
+                    unmatched.append(sheet)
+                    continue
+                right.remove(match)
+                pairs.append({'reference': sheet, 'compare': match, 'matched_by': 'name'})
+            left = unmatched
+
+        candidates = sorted(
+            (
+                (self._similarity(sheet1['columns'], sheet2['columns']), i, j)
+                for i, sheet1 in enumerate(left) for j, sheet2 in enumerate(right)
+            ),
+            key=lambda candidate: (-candidate[0], candidate[1], candidate[2])
+        )
+        used1, used2 = set(), set()
+        for similarity, i, j in candidates:
+            if similarity < self.STRUCTURE_MIN_SIMILARITY:
+                break
+            if i in used1 or j in used2:
+                continue
+            used1.add(i)
+            used2.add(j)
+            pairs.append({
+                'reference': left[i], 'compare': right[j],
+                'matched_by': 'structure', 'similarity': round(similarity, 4)
+            })
+
+        order = {sheet['name']: position for position, sheet in enumerate(sheets1)}
+        pairs.sort(key=lambda pair: order[pair['reference']['name']])
+        only_reference = [sheet['name'] for i, sheet in enumerate(left) if i not in used1]
+        only_compare = [sheet['name'] for j, sheet in enumerate(right) if j not in used2]
+        return pairs, only_reference, only_compare
+
+    def compare(self, file1_content: bytes, file1_name: str,
+                file2_content: bytes, file2_name: str,
+                options: Optional[Dict[str, Any]] = None,
+                cancel: Optional[CancellationToken] = None,
+                changes: Optional[ChangeLog] = None) -> Dict[str, Any]:
+        """
+        Compara todas las hojas de dos libros de Excel
+        Si se cancela (o vence el plazo) con alguna hoja ya comparada, retorna el reporte parcial
+        marcado como incompleto; si no se llegó a comparar ninguna, lanza ComparisonCancelled
+        Con changes (ChangeLog) se registran los cambios de todas las hojas, cada uno con la suya
+        """
+        start_time = datetime.now()
+        options = self.comparator.resolve_options(options)
+        for filename in (file1_name, file2_name):
+            extension = filename.lower().split('.')[-1]
+            if extension not in self.EXCEL_FORMATS:
+                raise ValueError(
+                    f"La comparación de libros solo admite {', '.join(self.EXCEL_FORMATS)}: {filename}"
+                )
+
+        # Los procesos del pool abren los libros desde el disco en lugar de recibir su contenido
+        with tempfile.TemporaryDirectory(prefix='workbook-', ignore_cleanup_errors=True) as directory:
+            path1 = self._write(directory, 'reference', file1_name, file1_content)
+            path2 = self._write(directory, 'compare', file2_name, file2_content)
+
+            self._phase(cancel, 'reading')
+            try:
+                sheets1, sheets2 = self.list_sheets(path1), self.list_sheets(path2)
+            except Exception as e:
+                raise ValueError(f"No se pudieron leer las hojas de los libros: {str(e)}")
+            pairs, only_reference, only_compare = self.pair_sheets(sheets1, sheets2)
+            if cancel is not None:
+                cancel.check()
+
+            tasks = [
+                {
+                    'reference_path': path1, 'reference_sheet': pair['reference']['name'], 'reference_name': file1_name,
+                    'compare_path': path2, 'compare_sheet': pair['compare']['name'], 'compare_name': file2_name,
+                    'options': options, 'record_changes': changes is not None
+                }
+                for pair in pairs
+            ]
+            results, workers = self._run(tasks, cancel)
+
+        # Motivo de la interrupción si alguna hoja quedó sin comparar
+        skipped = [result for result in results if result is None or 'cancelled' in result]
+        reason = next((result['cancelled'] for result in skipped if result is not None), None)
+        if skipped and reason is None and cancel is not None:
+            reason = cancel.reason
+        if skipped and not any(result is not None and 'summary' in result for result in results):
+            raise ComparisonCancelled(reason or 'cancelled', cancel.time_budget if cancel is not None else None)
+
+        return self._build_report(
+            pairs, results, only_reference, only_compare, file1_name, file2_name, options,
+            start_time, reason if skipped else None, workers, changes
+        )
+
+    def iter_differences(self, report: Dict[str, Any], reference_path: str,
+                         compare_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Todas las diferencias de un reporte de libro guardado, una por una y con la hoja de cada una
+        Las hojas que se compararon se vuelven a comparar desde los libros conservados; las que no
+        (omitidas o con error) tampoco aparecen en el reporte guardado
+        """
+        options = self.comparator.resolve_options(report['metadata'].get('options'))
+        for entry in report['sheets']:
+            if entry['status'] != 'compared':
+                continue
+            df1 = self.comparator.read_path(reference_path, options['columns'], options['ignore_columns'],
+                                            entry['referenceSheet'])
+            df2 = self.comparator.read_path(compare_path, options['columns'], options['ignore_columns'],
+                                            entry['compareSheet'])
+            df1, df2 = self.comparator.prepare_dataframes(df1, df2, options)
+            sheet = self._sheet_label(entry)
+            for difference in self.comparator.iter_differences(df1, df2, options):
+                yield dict(difference, sheet=sheet)
+        yield from self._unmatched_differences(report)
+
+    def stored_differences(self, report: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Diferencias guardadas con el reporte de cada hoja (solo las primeras de cada una)"""
+        for entry in report['sheets']:
+            sheet = self._sheet_label(entry)
+            for difference in entry.get('differences', []):
+                yield dict(difference, sheet=sheet)
+        yield from self._unmatched_differences(report)
+
+    def _sheet_label(self, entry: Dict[str, Any]) -> str:
+        # Hojas emparejadas por encabezados: se indican las dos
+        if entry['referenceSheet'] == entry['compareSheet']:
+            return entry['referenceSheet']
+        return f"{entry['referenceSheet']} / {entry['compareSheet']}"
+
+    def _unmatched_differences(self, report: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Una hoja presente en un solo libro, que el resumen cuenta como una diferencia"""
+        unmatched = report.get('unmatchedSheets', {})
+        for name in unmatched.get('reference', []):
+            yield {'type': 'structure_difference', 'position': 'Libro', 'sheet': name, 'referenceValue': name,
+                   'description': f"Hoja '{name}' solo en el libro de referencia"}
+        for name in unmatched.get('compare', []):
+            yield {'type': 'structure_difference', 'position': 'Libro', 'sheet': name, 'compareValue': name,
+                   'description': f"Hoja '{name}' solo en el libro a comparar"}
+
+    def _write(self, directory: str, role: str, filename: str, content: bytes) -> str:
+        # Se conserva la extensión: con ella se elige el lector (openpyxl o xlrd)
+        path = os.path.join(directory, f"{role}.{filename.lower().split('.')[-1]}")
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _run(self, tasks: List[Dict[str, Any]],
+             cancel: Optional[CancellationToken]) -> Tuple[List[Optional[Dict[str, Any]]], int]:
+        """
+        Compara los pares de hojas; retorna un resultado por par (None si no llegó a compararse)
+        y el número de procesos usados
+        Con un solo par o un solo proceso se compara en este hilo, con el token y el progreso completos
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        if len(tasks) <= 1 or self.max_workers <= 1:
+            for index, task in enumerate(tasks):
+                results[index] = run_sheet_pair(self.comparator, task, cancel)
+                if 'cancelled' in results[index]:
+                    break
+            return results, 1
+
+        deadline = None
+        if cancel is not None and cancel.deadline is not None:
+            deadline = time.time() + (cancel.deadline - time.monotonic())
+
+        pool = self._get_pool()
+        futures = {pool.submit(compare_sheet_pair, task, deadline): index for index, task in enumerate(tasks)}
+        self._phase(cancel, 'sheets', len(tasks))
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except BrokenProcessPool as e:
+                    self._reset_pool(pool)
+                    results[futures[future]] = {'error': f"El proceso que comparaba la hoja terminó inesperadamente: {e}"}
+                except Exception as e:
+                    results[futures[future]] = {'error': str(e)}
+                self._advance(cancel, 1)
+            if cancel is not None and cancel.cancelled:
+                # Las hojas en curso terminan en su proceso; las pendientes no llegan a empezar
+                for future in pending:
+                    future.cancel()
+                break
+        return results, min(self.max_workers, len(tasks))
+
+    def _phase(self, cancel: Optional[CancellationToken], phase: str, total: Optional[int] = None):
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.start_phase(phase, total)
+
+    def _advance(self, cancel: Optional[CancellationToken], count: int):
+        if cancel is not None and cancel.progress is not None:
+            cancel.progress.advance(count)
+
+    def _build_report(self, pairs: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]],
+                      only_reference: List[str], only_compare: List[str], file1_name: str, file2_name: str,
+                      options: Dict[str, Any], start_time: datetime, incomplete_reason: Optional[str],
+                      workers: int, changes: Optional[ChangeLog] = None) -> Dict[str, Any]:
+        """Reporte del libro: el resultado de cada par de hojas y el resumen agregado"""
+        sheets = []
+        totals = dict.fromkeys(self.SUMMARY_TOTALS, 0)
+        counts = {'identicalSheets': 0, 'differentSheets': 0, 'sheetsWithErrors': 0, 'skippedSheets': 0}
+        partial = False
+        excel_engines = None
+        for pair, result in zip(pairs, results):
+            entry = {
+                'referenceSheet': pair['reference']['name'],
+                'compareSheet': pair['compare']['name'],
+                'matchedBy': pair['matched_by']
+            }
+            if 'similarity' in pair:
+                entry['similarity'] = pair['similarity']
+
+            if result is None or 'cancelled' in result:
+                entry['status'] = 'skipped'
+                counts['skippedSheets'] += 1
+            elif 'error' in result:
+                entry.update(status='error', error=result['error'])
+                counts['sheetsWithErrors'] += 1
+            else:
+                entry.update(
+                    status='compared',
+                    identical=result['identical'],
+                    incomplete=result['incomplete'],
+                    summary=result['summary'],
+                    differences=result['differences'],
+                    different_content=result['different_content'],
+                    processingTime=result['metadata']['processingTime']
+                )
+                if changes is not None and 'changeLog' in result:
+                    changes.merge(result['changeLog']['rows'], result['changeLog']['total'])
+                if result['incomplete']:
+                    partial = True
+                    incomplete_reason = incomplete_reason or result['metadata'].get('incompleteReason')
+                excel_engines = excel_engines or result['metadata'].get('excelEngines')
+                counts['identicalSheets' if result['identical'] else 'differentSheets'] += 1
+                for key in self.SUMMARY_TOTALS:
+                    totals[key] += result['summary'].get(key, 0)
+            sheets.append(entry)
+
+        # Una hoja presente en un solo libro cuenta como una diferencia más
+        totals['differences'] += len(only_reference) + len(only_compare)
+        summary = dict(
+            totals,
+            sheetPairs=len(pairs),
+            sheetsOnlyInReference=len(only_reference),
+            sheetsOnlyInCompare=len(only_compare),
+            **counts
+        )
+
+        processing_time = (datetime.now() - start_time).total_seconds()
+        metadata = {
+            "comparisonDate": datetime.now().isoformat(),
+            "referenceFileName": file1_name,
+            "compareFileName": file2_name,
+            "processingTime": f"{processing_time:.2f} segundos",
+            "options": options,
+            "engine": "workbook",
+            "workers": workers
+        }
+        if excel_engines:
+            metadata["excelEngines"] = excel_engines
+        incomplete = incomplete_reason is not None or partial
+        if incomplete:
+            metadata["incompleteReason"] = incomplete_reason
+
+        return {
+            "identical": (totals['differences'] == 0 and not incomplete
+                          and counts['sheetsWithErrors'] == 0 and counts['skippedSheets'] == 0),
+            "incomplete": incomplete,
+            "summary": summary,
+            "sheets": sheets,
+            "unmatchedSheets": {"reference": only_reference, "compare": only_compare},
+            "metadata": metadata
+        }
@@ -2,6 +2,10 @@
 """
 Script de inicio para produccion
 Lanza el backend y frontend en paralelo para produccion
+
+Uso:
+    python start_production.py                            # Backend + frontend
+    python start_production.py --backend-only [--workers N]  # Solo el backend multiproceso
 """
 
 import subprocess
@@ -10,13 +14,289 @@ import os
 import time
 import signal
 import threading
+import json
+import random
+import argparse
+import multiprocessing
+import urllib.request
+import urllib.error
 from pathlib import Path
 
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+def ignore_interrupts():
+    """El gestor del progreso compartido se detiene con el supervisor, no con Ctrl+C"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def run_backend_worker(sock, heartbeat, max_requests, admission_ledger, slot, progress_store):
+    """
+    Proceso trabajador del backend
+    Sirve la API sobre el socket compartido y publica un latido desde su bucle de eventos
+    La admision de comparaciones usa la ranura slot del presupuesto compartido por todos los trabajadores
+    y el progreso se publica en el diccionario compartido, para que /progress/{id} funcione en cualquiera
+    """
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+    
+    # El supervisor ya creo las tablas: los trabajadores no compiten en create_tables
+    os.environ["DB_SCHEMA_READY"] = "true"
+    
+    import uvicorn
+    import runtime
+    from config import Config
+    
+    runtime.use_shared_admission(admission_ledger, slot)
+    runtime.use_shared_progress(progress_store)
+    
+    class HeartbeatServer(uvicorn.Server):
+        async def on_tick(self, counter):
+            # Si el bucle de eventos se bloquea, el latido se detiene y el supervisor lo detecta
+            heartbeat.value = time.time()
+            return await super().on_tick(counter)
+    
+    config = uvicorn.Config(
+        "main:app",
+        log_level=Config.LOG_LEVEL.lower(),
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=Config.WORKER_GRACEFUL_TIMEOUT
+    )
+    HeartbeatServer(config).run(sockets=[sock])
+
+class BackendSupervisor:
+    """
+    Supervisor del backend multiproceso
+    Comparte un socket entre N procesos uvicorn, los recicla tras un numero maximo de
+    peticiones, reinicia los que dejan de latir y permite reinicios graduales (SIGHUP)
+    El presupuesto de admision de comparaciones es uno para todo el servidor: cada trabajador
+    anota su uso en una ranura de un Array compartido, que se limpia cuando el trabajador termina
+    El progreso de las comparaciones vive en un diccionario de un Manager propiedad del supervisor
+    Un trabajador caido se reemplaza tras una espera que se duplica con cada caida seguida de su
+    puesto; si caen WORKER_MAX_STARTUP_FAILURES seguidos sin llegar a servir (configuracion rota,
+    puerto o base de datos inaccesibles), el supervisor se detiene con codigo de error
+    """
+    
+    def __init__(self, workers=None):
+        sys.path.insert(0, str(BACKEND_DIR))
+        os.chdir(BACKEND_DIR)
+        from config import Config
+        
+        self.config = Config
+        self.worker_count = workers or Config.get_worker_count()
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.socket = None
+        self.admission_ledger = None
+        self.free_slots = []
+        self.progress_manager = None
+        self.progress_store = None
+        self.running = True
+        self.restart_requested = False
+        self.exit_code = 0
+        # Por puesto de trabajador: caidas seguidas y, si esta esperando para reemplazarlo, cuando
+        self.crashes = [0] * self.worker_count
+        self.restart_at = {}
+    
+    def init_database(self):
+        """Crea las tablas una sola vez antes de lanzar los trabajadores y retoma los preprocesamientos interrumpidos"""
+        from database_manager import DatabaseManager
+        db = DatabaseManager(init_schema=True)
+        print("✅ Base de datos inicializada por el supervisor")
+        # Ningun trabajador esta en marcha: todo preprocesamiento en curso quedo interrumpido
+        interrupted = db.reset_interrupted_references()
+        if interrupted:
+            print(f"🔄 {interrupted} archivos de referencia interrumpidos vuelven a estar pendientes")
+    
+    def bind_socket(self):
+        import uvicorn
+        config = uvicorn.Config("main:app", host=self.config.API_HOST, port=self.config.API_PORT)
+        self.socket = config.bind_socket()
+    
+    def create_admission_ledger(self):
+        """Una ranura por trabajador y otra por cada reemplazo que arranca antes de detener al anterior"""
+        from admission import SharedBudget
+        slots = self.worker_count * 2
+        self.admission_ledger = SharedBudget.create_ledger(self.context, slots)
+        self.free_slots = list(range(slots))
+    
+    def start_progress_store(self):
+        """Diccionario compartido en el que los trabajadores publican y leen el progreso"""
+        from multiprocessing.managers import SyncManager
+        self.progress_manager = SyncManager(ctx=self.context)
+        self.progress_manager.start(ignore_interrupts)
+        self.progress_store = self.progress_manager.dict()
+    
+    def release_slot(self, worker):
+        """Lo que un trabajador detenido o caido no libero deja de contar en el presupuesto"""
+        from admission import SharedBudget
+        SharedBudget.clear_slot(self.admission_ledger, worker["slot"])
+        self.free_slots.append(worker["slot"])
+    
+    def spawn_worker(self):
+        """Lanza un trabajador con su propio limite de peticiones (con variacion aleatoria)"""
+        max_requests = self.config.WORKER_MAX_REQUESTS
+        if max_requests and self.config.WORKER_MAX_REQUESTS_JITTER:
+            max_requests += random.randint(0, self.config.WORKER_MAX_REQUESTS_JITTER)
+        
+        heartbeat = self.context.Value("d", time.time())
+        slot = self.free_slots.pop(0)
+        process = self.context.Process(
+            target=run_backend_worker,
+            args=(self.socket, heartbeat, max_requests, self.admission_ledger, slot, self.progress_store),
+            daemon=False
+        )
+        process.start()
+        
+        worker = {"process": process, "heartbeat": heartbeat, "started": time.time(), "slot": slot}
+        print(f"✅ Trabajador iniciado (PID: {process.pid}, max. peticiones: {max_requests or 'sin limite'})")
+        return worker
+    
+    def stop_worker(self, worker, graceful=True):
+        """Detiene un trabajador, esperando a que termine las peticiones en curso"""
+        process = worker["process"]
+        if process.is_alive():
+            process.terminate()
+            process.join(self.config.WORKER_GRACEFUL_TIMEOUT + 5 if graceful else 1)
+        if process.is_alive():
+            print(f"⚠️ Trabajador {process.pid} no se detuvo a tiempo, forzando cierre")
+            process.kill()
+            process.join()
+        self.release_slot(worker)
+    
+    def wait_until_serving(self, worker, timeout=60):
+        """Espera el primer latido de un trabajador nuevo"""
+        start = time.time()
+        while time.time() - start < timeout:
+            if not worker["process"].is_alive():
+                return False
+            if worker["heartbeat"].value > worker["started"]:
+                return True
+            time.sleep(0.1)
+        return False
+    
+    def has_served(self, worker):
+        """Un trabajador sirvio si llego a publicar un latido"""
+        return worker["heartbeat"].value > worker["started"]
+    
+    def schedule_restart(self, index, worker):
+        """Programa el reemplazo de un trabajador caido; retorna False si hay que detener el supervisor"""
+        self.crashes[index] = 1 if self.has_served(worker) else self.crashes[index] + 1
+        if self.crashes[index] >= self.config.WORKER_MAX_STARTUP_FAILURES:
+            print(f"❌ {self.crashes[index]} trabajadores seguidos terminaron sin llegar a servir, deteniendo el backend")
+            return False
+        delay = min(self.config.WORKER_RESTART_BACKOFF * 2 ** (self.crashes[index] - 1),
+                    self.config.WORKER_RESTART_BACKOFF_MAX)
+        print(f"⏳ Reemplazo del trabajador en {delay:g} s (caidas seguidas: {self.crashes[index]})")
+        self.workers[index] = None
+        self.restart_at[index] = time.time() + delay
+        return True
+    
+    def rolling_restart(self):
+        """Reemplaza los trabajadores uno por uno sin dejar de atender peticiones"""
+        print("🔄 Reinicio gradual de trabajadores...")
+        for index, old_worker in enumerate(list(self.workers)):
+            if old_worker is None:
+                # Caido y a la espera de su reemplazo, que ya sera un trabajador nuevo
+                continue
+            new_worker = self.spawn_worker()
+            if not self.wait_until_serving(new_worker):
+                print("❌ El nuevo trabajador no arranco, se conserva el anterior")
+                self.stop_worker(new_worker, graceful=False)
+                continue
+            self.workers[index] = new_worker
+            self.stop_worker(old_worker)
+        print("✅ Reinicio gradual completado")
+    
+    def supervise(self):
+        """Revisa el estado de los trabajadores y reemplaza los caidos o bloqueados"""
+        now = time.time()
+        for index, worker in enumerate(self.workers):
+            if worker is None:
+                if now >= self.restart_at[index]:
+                    del self.restart_at[index]
+                    self.workers[index] = self.spawn_worker()
+                continue
+            process = worker["process"]
+            
+            if not process.is_alive():
+                self.release_slot(worker)
+                if process.exitcode == 0:
+                    print(f"♻️ Trabajador {process.pid} reciclado tras alcanzar el maximo de peticiones")
+                    self.crashes[index] = 0
+                    self.workers[index] = self.spawn_worker()
+                    continue
+                print(f"❌ Trabajador {process.pid} termino inesperadamente (codigo {process.exitcode})")
+                if not self.schedule_restart(index, worker):
+                    self.running = False
+                    self.exit_code = 1
+                    return
+            
+            elif now - worker["heartbeat"].value > self.config.WORKER_TIMEOUT:
+                print(f"⚠️ Trabajador {process.pid} sin latido durante {self.config.WORKER_TIMEOUT} s, reiniciando")
+                self.stop_worker(worker, graceful=False)
+                self.workers[index] = self.spawn_worker()
+    
+    def shutdown(self):
+        print("\n🛑 Deteniendo trabajadores del backend...")
+        self.running = False
+        workers = [worker for worker in self.workers if worker is not None]
+        for worker in workers:
+            worker["process"].terminate()
+        for worker in workers:
+            self.stop_worker(worker)
+        if self.socket:
+            self.socket.close()
+        if self.progress_manager:
+            self.progress_manager.shutdown()
+        print("✅ Backend detenido")
+    
+    def signal_handler(self, signum, frame):
+        if hasattr(signal, "SIGHUP") and signum == signal.SIGHUP:
+            self.restart_requested = True
+        else:
+            self.running = False
+    
+    def run(self):
+        print("=" * 60)
+        print(f"🎯 BACKEND MULTIPROCESO - {self.worker_count} trabajadores")
+        print("=" * 60)
+        
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.signal_handler)
+        
+        self.init_database()
+        self.bind_socket()
+        self.create_admission_ledger()
+        self.start_progress_store()
+        print(f"📍 API disponible en: http://{self.config.API_HOST}:{self.config.API_PORT}")
+        
+        self.workers = [self.spawn_worker() for _ in range(self.worker_count)]
+        
+        try:
+            while self.running:
+                if self.restart_requested:
+                    self.restart_requested = False
+                    self.rolling_restart()
+                self.supervise()
+                time.sleep(1)
+        finally:
+            self.shutdown()
+        return self.exit_code
+
 class ProductionServer:
-    def __init__(self):
+    BACKEND_URL = "http://localhost:8000"
+    BACKEND_READY_TIMEOUT = 60
+    
+    # Salida del backend (y de sus trabajadores): un PIPE que nadie lee se llena y bloquea el proceso
+    BACKEND_LOG = BACKEND_DIR / "backend_output.log"
+    
+    def __init__(self, workers=None):
         self.backend_process = None
+        self.backend_log = None
         self.frontend_process = None
         self.running = True
+        self.workers = workers
         
     def find_npm(self):
         """Busca la ruta de npm en el sistema"""
@@ -58,17 +338,64 @@ class ProductionServer:
         os.chdir(backend_dir)
         
         try:
-            self.backend_process = subprocess.Popen([
-                sys.executable, "main.py"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            command = [sys.executable, "main.py"]
+            if self.get_worker_count() > 1:
+                # Modo multiproceso: este mismo script hace de supervisor del backend
+                command = [sys.executable, str(Path(__file__).resolve()), "--backend-only",
+                           "--workers", str(self.get_worker_count())]
             
-            print(f"✅ Backend iniciado (PID: {self.backend_process.pid})")
+            self.backend_log = open(self.BACKEND_LOG, "a", encoding="utf-8")
+            self.backend_process = subprocess.Popen(
+                command, stdout=self.backend_log, stderr=subprocess.STDOUT, text=True
+            )
+            
+            print(f"✅ Backend iniciado (PID: {self.backend_process.pid}, trabajadores: {self.get_worker_count()})")
             print("📍 API disponible en: http://localhost:8000")
+            print(f"📝 Logs del backend en: {self.BACKEND_LOG}")
             
         except Exception as e:
             print(f"❌ Error al iniciar el backend: {e}")
             sys.exit(1)
     
+    def get_worker_count(self):
+        """Numero de procesos del backend, tomado de los argumentos o de Config"""
+        if self.workers:
+            return self.workers
+        sys.path.insert(0, str(BACKEND_DIR))
+        from config import Config
+        return Config.get_worker_count()
+    
+    def wait_for_backend(self):
+        """
+        Espera a que el backend responda en /ready en lugar de una pausa fija
+        Retorna True cuando la base de datos y el motor de comparacion estan listos
+        """
+        start = time.time()
+        alive_at = None
+        
+        while time.time() - start < self.BACKEND_READY_TIMEOUT:
+            if self.backend_process and self.backend_process.poll() is not None:
+                print(f"❌ El backend termino inesperadamente (codigo {self.backend_process.returncode})")
+                return False
+            
+            try:
+                with urllib.request.urlopen(f"{self.BACKEND_URL}/ready", timeout=2) as response:
+                    status = json.loads(response.read().decode("utf-8"))
+                    print(f"✅ Backend listo en {time.time() - start:.2f} segundos "
+                          f"(proceso activo en {alive_at or time.time() - start:.2f} s)")
+                    return status.get("ready", False)
+            except urllib.error.HTTPError as e:
+                # 503: el proceso esta vivo pero sigue cargando la base de datos o el motor
+                if e.code == 503 and alive_at is None:
+                    alive_at = time.time() - start
+            except (urllib.error.URLError, OSError):
+                pass
+            
+            time.sleep(0.1)
+        
+        print(f"⚠️ El backend no estuvo listo despues de {self.BACKEND_READY_TIMEOUT} segundos")
+        return False
+    
     def start_frontend(self):
         """Inicia el servidor frontend"""
         print("🚀 Iniciando frontend...")
@@ -104,24 +431,15 @@ class ProductionServer:
             sys.exit(1)
     
     def monitor_processes(self):
-        """Monitorea los procesos y muestra los logs"""
-        def monitor_backend():
-            if self.backend_process:
-                for line in iter(self.backend_process.stdout.readline, ''):
-                    if line:
-                        print(f"[BACKEND] {line.strip()}")
-        
+        """Monitorea los procesos y muestra los logs (los del backend van a BACKEND_LOG)"""
         def monitor_frontend():
             if self.frontend_process:
                 for line in iter(self.frontend_process.stdout.readline, ''):
                     if line:
                         print(f"[FRONTEND] {line.strip()}")
         
-        # Inicia los hilos de monitoreo
-        backend_thread = threading.Thread(target=monitor_backend, daemon=True)
+        # Inicia el hilo de monitoreo
         frontend_thread = threading.Thread(target=monitor_frontend, daemon=True)
-        
-        backend_thread.start()
         frontend_thread.start()
     
     def stop_services(self):
@@ -133,6 +451,9 @@ class ProductionServer:
             self.backend_process.terminate()
             print("✅ Backend detenido")
         
+        if self.backend_log:
+            self.backend_log.close()
+        
         if self.frontend_process:
             self.frontend_process.terminate()
             print("✅ Frontend detenido")
@@ -156,7 +477,8 @@ class ProductionServer:
         try:
             
             self.start_backend()
-            time.sleep(3)  # Espera a que el backend este listo
+            if not self.wait_for_backend():
+                sys.exit(1)
             
             
             self.start_frontend()
@@ -187,5 +509,13 @@ class ProductionServer:
             self.stop_services()
 
 if __name__ == "__main__":
-    server = ProductionServer()
-    server.run() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Servidor de produccion de Altice File Comparator")
+    parser.add_argument("--backend-only", action="store_true", help="Lanza solo el backend multiproceso")
+    parser.add_argument("--workers", type=int, help="Numero de procesos del backend (por defecto WORKERS, 1)")
+    args = parser.parse_args()
+    
+    if args.backend_only:
+        sys.exit(BackendSupervisor(args.workers).run())
+    else:
+        server = ProductionServer(args.workers)
+        server.run() 
\ No newline at end of file